@@ -2,27 +2,34 @@ from datetime import datetime
 from libs.schemas.models import ForecastResult, ModelFeatures
 from libs.utils.config import settings
 import random
-import httpx
+from typing import Sequence, Tuple
+import numpy as np
+from libs.utils.http import post_json
 
 async def _remote_predict(symbol: str, as_of: datetime, features: dict, horizon: int):
-    async with httpx.AsyncClient(timeout=15) as client:
-        r = await client.post(
-            settings.price_model_url,
-            json={"symbol": symbol, "as_of": as_of.isoformat(), "features": features, "horizon_days": horizon}
-        )
-        r.raise_for_status()
-        return r.json()
+    return await post_json(
+        settings.price_model_url,
+        {"symbol": symbol, "as_of": as_of.isoformat(), "features": features, "horizon_days": horizon},
+        timeout=15,
+    )
+
+def _stub_quantiles(features_hash: str) -> Tuple[float, float, float]:
+    seed = int(features_hash, 16) % (2**32 - 1)
+    rnd = random.Random(seed)
+    p50 = rnd.uniform(-0.02, 0.02)
+    spread = rnd.uniform(0.01, 0.05)
+    return p50 - spread, p50, p50 + spread
+
+def price_model_scores(features_hashes: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    # Array form of the stub price_model_agent -> (exp_return, confidence)
+    q = np.array([_stub_quantiles(h) for h in features_hashes]).reshape(-1, 3)
+    return q[:, 1], np.minimum(1.0, np.maximum(0.1, 1 - (q[:, 2] - q[:, 0])))
 
 def price_model_agent(feats: ModelFeatures, horizon_days: int = 5) -> ForecastResult:
     # Keep sync for now; if use_remote_price_model is True, call async runner from orchestrator
     if settings.use_remote_price_model:
         raise RuntimeError("Remote price model requires async call usage in orchestrator")
-    seed = int(feats.features_hash, 16) % (2**32 - 1)
-    rnd = random.Random(seed)
-    p50 = rnd.uniform(-0.02, 0.02)
-    spread = rnd.uniform(0.01, 0.05)
-    p10 = p50 - spread
-    p90 = p50 + spread
+    p10, p50, p90 = _stub_quantiles(feats.features_hash)
     direction = "up" if p50 > 0.002 else "down" if p50 < -0.002 else "flat"
     conf = min(1.0, max(0.1, 1 - (p90 - p10)))
     return ForecastResult(
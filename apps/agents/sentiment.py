@@ -1,3 +1,5 @@
+from typing import Tuple
+import numpy as np
 from libs.schemas.models import SentimentFeatures, AgentResult
 
 def sentiment_agent(sent: SentimentFeatures) -> AgentResult:
@@ -14,4 +16,9 @@ def sentiment_agent(sent: SentimentFeatures) -> AgentResult:
         rationale="; ".join(reasons),
         features_used={"weighted_sentiment": score},
         agent_version="sent_v1"
-    )
\ No newline at end of file
+    )
+
+def sentiment_agent_scores(weighted_sentiment: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Array form of sentiment_agent over many dates -> (score, confidence)
+    score = np.nan_to_num(weighted_sentiment, nan=0.0)
+    return np.clip(score, -1.0, 1.0), np.minimum(1.0, np.abs(score))
@@ -1,6 +1,7 @@
 from datetime import datetime
 from libs.schemas.models import TechnicalFeatures, AgentResult
-from typing import Optional
+from typing import Optional, Tuple
+import numpy as np
 
 def technical_agent(tech: TechnicalFeatures) -> AgentResult:
     # Simple scoring: combine RSI/MACD/BB signals
@@ -26,4 +27,11 @@ def technical_agent(tech: TechnicalFeatures) -> AgentResult:
         rationale="; ".join(rationale_parts),
         features_used={"rsi": tech.rsi or 50.0, "macd": tech.macd or 0.0},
         agent_version="tech_v1"
-    )
\ No newline at end of file
+    )
+
+def technical_agent_scores(rsi: np.ndarray, macd: np.ndarray, macd_signal: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Array form of technical_agent over many dates -> (score, confidence); NaN is "not set"
+    score = np.where(rsi < 30, 0.3, np.where(rsi > 70, -0.3, 0.0))
+    has_macd = ~np.isnan(macd) & ~np.isnan(macd_signal)
+    score = score + np.where(has_macd, np.where(macd > macd_signal, 0.3, -0.1), 0.0)
+    return np.clip(score, -1.0, 1.0), np.minimum(1.0, np.abs(score))
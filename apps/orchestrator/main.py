@@ -1,14 +1,29 @@
 from __future__ import annotations
+import asyncio
+import json
 import sys
 import os
+import time
 from pathlib import Path
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
-from fastapi import FastAPI
-from typing import Dict
+from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, List
 from libs.utils.logging import setup_logger, ContextAdapter
 from libs.utils.cache import InMemoryTTLCache
 from libs.utils.config import settings
-from libs.data.adapters import get_timeseries, get_fundamentals, get_news
+from libs.utils.http import http_clients, post_json, provider_urls
+from libs.utils.limits import limiter_stats
+from libs.utils.redis_cache import RedisCache
+from libs.utils.singleflight import SingleFlight
+from libs.nlp.service import get_sentiment_service
+from libs.data.adapters import (
+    get_timeseries, get_fundamentals, get_news, ts_cache_stats,
+    warm_timeseries, get_fundamentals_many, get_news_many,
+)
+from libs.data import adapters
 from libs.features.engineering import (
     build_technical, build_fundamental, build_sentiment, build_model_features
 )
@@ -16,40 +31,117 @@ from apps.agents.technical import technical_agent
 from apps.agents.fundamental import fundamental_agent
 from apps.agents.sentiment import sentiment_agent
 from apps.agents.price_model import price_model_agent
-from libs.schemas.models import EnsembleInput, ForecastResult
-from libs.ensemble.meta import meta_ensemble
-import httpx
+from libs.features.incremental import IndicatorState
+from libs.schemas.models import (
+    BatchAnalyzeRequest, EnsembleDecision, EnsembleInput, ForecastResult, FundamentalsSnapshot, Interval,
+    ModelFeatures, NewsItem, TechnicalFeatures,
+)
+from libs.schemas.frame import CandleFrame
+from libs.ensemble import meta
+from libs.ensemble.meta import meta_ensemble, meta_ensemble_batch
 
 logger = ContextAdapter(setup_logger("orchestrator"), {"trace_id": "-"})
-cache = InMemoryTTLCache(ttl_seconds=settings.cache_ttl_s)
-app = FastAPI(title="Multi-Agent Orchestrator")
+cache = InMemoryTTLCache(
+    ttl_seconds=settings.cache_ttl_s,
+    max_entries=settings.cache_max_entries,
+    max_bytes=settings.cache_max_bytes,
+    stale_ttl_seconds=settings.cache_stale_s,
+    sweep_interval_s=settings.cache_sweep_interval_s,
+)
+flights = SingleFlight()
+
+async def warm_up():
+    # Heavy dependencies are imported lazily; this pays for them before traffic arrives:
+    # the sentiment model in every worker (only when news is configured) and the meta model.
+    log = ContextAdapter(logger.logger, {"trace_id": "warm-up"})
+    t0 = time.perf_counter()
+    if settings.news_api_key:
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in get_sentiment_service().start()))
+    has_meta = await asyncio.to_thread(meta.preload)
+    log.info(f"warm-up done in {time.perf_counter() - t0:.1f}s (meta model: {has_meta})")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the pooled provider clients up front and close them on shutdown
+    async with http_clients(*provider_urls()):
+        if settings.warm_up_on_start:
+            await warm_up()
+        try:
+            yield
+        finally:
+            get_sentiment_service().close()
+
+app = FastAPI(title="Multi-Agent Orchestrator", lifespan=lifespan)
+# Live per-symbol indicator state, persisted to Redis so it survives restarts; the
+# in-process copies are bounded like the analysis cache
+indicator_states = InMemoryTTLCache(
+    ttl_seconds=settings.indicator_state_ttl_s, max_entries=settings.indicator_state_max_entries,
+)
+state_cache = RedisCache(ttl=settings.indicator_state_ttl_s)
 
 async def _remote_price_predict(symbol: str, as_of, features: dict, horizon: int):
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.post(
-            settings.price_model_url,
-            json={"symbol": symbol, "as_of": as_of.isoformat(), "features": features, "horizon_days": horizon}
-        )
-        r.raise_for_status()
-        return r.json()
+    return await post_json(
+        settings.price_model_url,
+        {"symbol": symbol, "as_of": as_of.isoformat(), "features": features, "horizon_days": horizon},
+        timeout=10,
+    )
+
+async def _live_technical(symbol: str, candles: CandleFrame) -> TechnicalFeatures:
+    # one state per symbol and bar interval
+    key = RedisCache.make_key("indstate", {"symbol": symbol, "interval": candles.interval})
+    state = indicator_states.get(key)
+    if state is None:
+        try:
+            saved = await state_cache.get(key)
+            state = IndicatorState.from_dict(saved) if saved else None
+        except Exception as e:
+            logger.info(f"indicator state load failed: {e}")
+    if not len(candles):
+        # nothing to update from (new or delisted symbol, empty provider reply)
+        raise ValueError("No candles provided")
+    if state is None or state.last_ts < candles.first_ts or not state.matches(candles):
+        # no state yet, a gap in the history, data behind the state or a revised last
+        # bar: replay the window
+        state = IndicatorState.from_frame(candles)
+        applied = len(candles)
+    else:
+        applied = state.catch_up(candles)
+    indicator_states.set(key, state)
+    if applied:
+        try:
+            await state_cache.set(key, state.to_dict())
+        except Exception as e:
+            logger.info(f"indicator state save failed: {e}")
+    return state.snapshot()
+
+async def analyze_symbol(
+    symbol: str, horizon_days: int = 5, as_of: datetime | None = None, interval: Interval = "1d",
+) -> Dict:
+    # Historical requests are cached per as_of; live ones share one entry per TTL
+    cache_key = f"analysis:{symbol}:{horizon_days}"
+    if interval != "1d":
+        cache_key += f":{interval}"
+    if as_of:
+        cache_key += f":{as_of.isoformat()}"
+    # Concurrent cold requests for the same analysis run the pipeline once; with
+    # cache_stale_s set, a slightly stale result is returned while it is recomputed.
+    return await cache.get_or_load(
+        cache_key, lambda: flights.do(cache_key, lambda: _analyze_symbol(symbol, horizon_days, as_of, interval))
+    )
 
-async def analyze_symbol(symbol: str, horizon_days: int = 5, as_of: datetime | None = None) -> Dict:
+async def _analyze_symbol(symbol: str, horizon_days: int, as_of: datetime | None, interval: Interval = "1d") -> Dict:
     trace = f"{symbol}-{datetime.utcnow().timestamp()}"
     log = ContextAdapter(logger.logger, {"trace_id": trace})
+    live = as_of is None
     as_of = as_of or datetime.now(timezone.utc)
-    start = as_of - timedelta(days=400)
+    # intraday bars: indicators warm up within days, and every month back is a fetch
+    start = as_of - timedelta(days=400 if interval == "1d" else settings.intraday_lookback_days)
     end = as_of
 
-    cache_key = f"analysis:{symbol}:{horizon_days}"
-    cached = cache.get(cache_key)
-    if cached:
-        log.info("cache hit", extra={"trace_id": trace})
-        return cached
-
     log.info("begin analysis", extra={"trace_id": trace})
 
     # Create tasks for data fetching
-    candles_task = asyncio.create_task(get_timeseries(symbol, start, end, "1d"))
+    candles_task = asyncio.create_task(get_timeseries(symbol, start, end, interval))
     fund_task = asyncio.create_task(get_fundamentals(symbol, as_of))
     news_task = asyncio.create_task(get_news(symbol, as_of - timedelta(days=7), as_of))
 
@@ -63,14 +155,24 @@ async def analyze_symbol(symbol: str, horizon_days: int = 5, as_of: datetime | N
         try:
             fund = await fund_task
         except Exception:
-            from libs.schemas.models import FundamentalsSnapshot
             fund = FundamentalsSnapshot(symbol=symbol, as_of=as_of)
         try:
             news = await news_task
         except Exception:
             news = []
 
-    tech = build_technical(candles)
+    inp = (await _ensemble_inputs(symbol, [horizon_days], as_of, live, candles, fund, news))[0]
+    result = _result(inp, meta_ensemble(inp))
+    log.info("end analysis", extra={"trace_id": trace})
+    return result
+
+async def _ensemble_inputs(
+    symbol: str, horizons: List[int], as_of: datetime, live: bool,
+    candles: CandleFrame, fund: FundamentalsSnapshot, news: List[NewsItem],
+) -> List[EnsembleInput]:
+    # Live requests advance the streaming state by the new bars only; historical as_of
+    # requests (backtests) compute from their own window.
+    tech = await _live_technical(symbol, candles) if live else build_technical(candles)
     ffeat = build_fundamental(fund)
     sfeat = build_sentiment(news, as_of)
     mfeat = build_model_features(candles, tech, ffeat, sfeat)
@@ -78,11 +180,16 @@ async def analyze_symbol(symbol: str, horizon_days: int = 5, as_of: datetime | N
     t_res = technical_agent(tech)
     f_res = fundamental_agent(ffeat)
     s_res = sentiment_agent(sfeat)
-    
+    return [
+        EnsembleInput(technical=t_res, fundamental=f_res, sentiment=s_res, forecast=await _forecast(mfeat, h))
+        for h in horizons
+    ]
+
+async def _forecast(mfeat: ModelFeatures, horizon_days: int) -> ForecastResult:
     # Use remote price model if configured, otherwise use local stub
     if settings.use_remote_price_model:
         pm = await _remote_price_predict(mfeat.symbol, mfeat.as_of, {"features_hash": mfeat.features_hash}, horizon_days)
-        m_res = ForecastResult(
+        return ForecastResult(
             symbol=mfeat.symbol,
             as_of=mfeat.as_of,
             horizon_days=horizon_days,
@@ -92,25 +199,143 @@ async def analyze_symbol(symbol: str, horizon_days: int = 5, as_of: datetime | N
             confidence=pm["confidence"],
             model_version="external_stub_v1"
         )
-    else:
-        m_res = price_model_agent(mfeat, horizon_days=horizon_days)
+    return price_model_agent(mfeat, horizon_days=horizon_days)
 
-    ensemble_in = EnsembleInput(technical=t_res, fundamental=f_res, sentiment=s_res, forecast=m_res)
-    decision = meta_ensemble(ensemble_in)
-
-    result = {
+def _result(inp: EnsembleInput, decision: EnsembleDecision) -> Dict:
+    return {
         "decision": decision.dict(),
         "agents": {
-            "technical": t_res.dict(),
-            "fundamental": f_res.dict(),
-            "sentiment": s_res.dict(),
-            "forecast": m_res.dict()
+            "technical": inp.technical.dict(),
+            "fundamental": inp.fundamental.dict(),
+            "sentiment": inp.sentiment.dict(),
+            "forecast": inp.forecast.dict()
         }
     }
-    cache.set(cache_key, result)
-    log.info("end analysis", extra={"trace_id": trace})
-    return result
+
+async def analyze_batch_stream(symbols: List[str], horizons: List[int]) -> AsyncIterator[Dict]:
+    """Analyze many symbols, yielding one record per symbol as soon as it is done.
+
+    Symbols are processed in chunks of `batch_chunk_size`: each chunk's cached histories,
+    fundamentals and news are looked up with one MGET each and the news of the whole
+    chunk is scored in one FinBERT pass. Per-symbol work runs `batch_concurrency` at a
+    time, and whatever has finished is sent through the meta-ensemble together.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    as_of = datetime.now(timezone.utc)
+    log = ContextAdapter(logger.logger, {"trace_id": f"batch-{as_of.timestamp()}"})
+    log.info(f"begin batch analysis of {len(symbols)} symbols")
+
+    todo = []
+    for symbol in symbols:
+        hits = [cache.get(f"analysis:{symbol}:{h}") for h in horizons]
+        if all(hits):
+            yield {"symbol": symbol, "results": hits}
+        else:
+            todo.append(symbol)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    sem = asyncio.Semaphore(settings.batch_concurrency)
+    tasks: List[asyncio.Task] = []
+
+    async def one(symbol: str, fund: FundamentalsSnapshot, news: List[NewsItem]):
+        # a failed fundamentals or news fetch is the symbol's error line, not an empty input
+        for source, got in (("fundamentals", fund), ("news", news)):
+            if isinstance(got, BaseException):
+                await queue.put((symbol, None, RuntimeError(f"{source} fetch failed: {got}")))
+                return
+        async with sem:
+            try:
+                candles = await get_timeseries(symbol, as_of - timedelta(days=400), as_of, "1d")
+                await queue.put((symbol, await _ensemble_inputs(symbol, horizons, as_of, True, candles, fund, news), None))
+            except Exception as e:
+                await queue.put((symbol, None, e))
+
+    async def prefetch(part: List[str]):
+        # same fallbacks as the single-symbol path: no fundamentals or news is not fatal
+        try:
+            await warm_timeseries(part)
+            return await asyncio.gather(
+                get_fundamentals_many(part, as_of), get_news_many(part, as_of - timedelta(days=7), as_of)
+            )
+        except Exception as e:
+            log.info(f"batch prefetch failed: {e}")
+            return {}, {}
+
+    async def produce():
+        previous: List[asyncio.Task] = []
+        try:
+            for i in range(0, len(todo), settings.batch_chunk_size):
+                part = todo[i:i + settings.batch_chunk_size]
+                funds, news = await prefetch(part)
+                current = [
+                    asyncio.create_task(one(s, funds.get(s) or FundamentalsSnapshot(symbol=s, as_of=as_of), news.get(s, [])))
+                    for s in part
+                ]
+                tasks.extend(current)
+                # prefetch at most one chunk ahead of the symbols still being analyzed
+                await asyncio.gather(*previous)
+                previous = current
+            await asyncio.gather(*previous)
+        finally:
+            queue.put_nowait(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        done = False
+        while not done:
+            ready = [await queue.get()]
+            while not queue.empty():
+                ready.append(queue.get_nowait())
+            if ready[-1] is None:
+                done = True
+                ready.pop()
+            ok = [(symbol, inputs) for symbol, inputs, err in ready if err is None]
+            decisions = iter(meta_ensemble_batch([inp for _, inputs in ok for inp in inputs]))
+            for symbol, inputs, err in ready:
+                if err is not None:
+                    log.info(f"{symbol}: {err}")
+                    yield {"symbol": symbol, "error": str(err)}
+                    continue
+                results = []
+                for h, inp in zip(horizons, inputs):
+                    results.append(_result(inp, next(decisions)))
+                    cache.set(f"analysis:{symbol}:{h}", results[-1])
+                yield {"symbol": symbol, "results": results}
+        await producer
+    finally:
+        # client went away or something failed: stop the remaining work
+        for task in [producer, *tasks]:
+            task.cancel()
+    log.info("end batch analysis")
 
 @app.get("/analyze/{symbol}")
-async def analyze(symbol: str, horizon_days: int = 5):
-    return await analyze_symbol(symbol, horizon_days=horizon_days)
\ No newline at end of file
+async def analyze(symbol: str, horizon_days: int = 5, interval: Interval = "1d"):
+    return await analyze_symbol(symbol, horizon_days=horizon_days, interval=interval)
+
+@app.post("/analyze/batch")
+async def analyze_batch(req: BatchAnalyzeRequest):
+    # NDJSON, one line per symbol in completion order
+    if len(req.symbols) > settings.batch_max_symbols:
+        raise HTTPException(status_code=413, detail=f"at most {settings.batch_max_symbols} symbols per batch")
+
+    async def lines():
+        async for record in analyze_batch_stream(req.symbols, req.horizons):
+            yield json.dumps(jsonable_encoder(record)) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/stats/cache")
+async def cache_stats():
+    return {
+        "analysis": cache.stats(),
+        "timeseries": dict(ts_cache_stats),
+        "singleflight": {"analysis": dict(flights.stats), "providers": dict(adapters.flights.stats)},
+    }
+
+@app.get("/stats/limits")
+async def limits_stats():
+    return limiter_stats()
+
+@app.get("/stats/sentiment")
+async def sentiment_stats():
+    return get_sentiment_service().stats()
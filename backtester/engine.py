@@ -1,54 +1,355 @@
 from __future__ import annotations
 import sys
 import os
+from dataclasses import dataclass, fields
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict
+from typing import Dict, Optional, Tuple, Union
 import math
 import asyncio
 import argparse
 
-from libs.schemas.models import Candle
-from libs.data.adapters import get_timeseries
-from apps.orchestrator.main import analyze_symbol
-
-async def walk_forward_backtest(symbol: str, start: datetime, end: datetime, horizon_days: int = 5) -> Dict:
-    cursor = start
-    equity = 1.0
-    equity_curve = []
-    while cursor + timedelta(days=horizon_days + 7) < end:
-        res = await analyze_symbol(symbol, horizon_days=horizon_days, as_of=cursor)
-        dec = res["decision"]
-        signal = dec["signal"]
-        size = dec["size"]
-        candles = await get_timeseries(symbol, cursor, cursor + timedelta(days=horizon_days + 1))
-        if len(candles) < 2:
-            cursor += timedelta(days=7)
-            continue
-        entry = candles[1].open
-        exitp = candles[-1].close
-        ret = (exitp - entry) / entry
-        if signal == "buy":
-            equity *= (1.0 + size * ret)
-        elif signal == "sell":
-            equity *= (1.0 - size * ret)
-        equity_curve.append((cursor, equity))
-        cursor += timedelta(days=7)
-    return {"final_equity": equity, "equity_curve": equity_curve}
+import numpy as np
+
+from libs.features.incremental import IndicatorState
+from libs.schemas.frame import CandleFrame, from_ns, to_ns
+from libs.schemas.fundamentals import FundamentalsHistory
+from libs.schemas.models import FundamentalsSnapshot
+from libs.data.adapters import get_timeseries, get_fundamentals_history, get_news_history
+from libs.data.news_archive import NewsHistory
+from backtester.state import BacktestState, BacktestStateStore, inputs_fingerprint, state_key
+from libs.ensemble.meta import meta_probabilities, signal_arrays
+from libs.models.dataset import NEWS_WINDOW_DAYS, WARMUP_BARS, feature_matrix
+from libs.models.universe import read_universe
+from libs.utils.config import settings
+from libs.utils.http import http_clients, provider_urls
+from libs.utils.limits import Priority, priority
+
+# Vectorized walk-forward backtest.
+#
+# A symbol's prices, point-in-time fundamentals and archived news are loaded once. The
+# agent scores and the meta-ensemble decision for every rebalance bar are computed as
+# arrays (the same features the meta-learner is trained on); positions, fills, costs,
+# equity, drawdown, turnover and Sharpe then come out of NumPy.
+#
+# Timing: a decision sees data up to the close of its rebalance bar and trades at the
+# next bar's open. The position is held for horizon_days bars or until the next
+# decision, whichever is first, and marked open to open. Every change of position,
+# including the final exit, pays slippage_bps + fee_bps on the traded fraction.
+#
+# backtest_incremental persists each run (backtester/state.py), including the streaming
+# indicator state at its last bar. Rerunning it with a later end feeds only the new bars,
+# scores only the new decision bars and re-simulates from the last stored decision.
+
+REBALANCE_BARS = 5  # weekly
+TRADING_DAYS = 252
+_HISTORY_DAYS = 100  # calendar days before start, for the indicator warm-up
+
+@dataclass
+class BacktestResult:
+    symbol: str
+    ts: np.ndarray          # int64 ns bars from the first decision to the end
+    position: np.ndarray    # signed fraction held over each bar (open to next open)
+    returns: np.ndarray     # per-bar net return
+    equity: np.ndarray      # equity at the end of each bar, starting from 1.0
+    rebalance_ts: np.ndarray
+    prob_up: np.ndarray
+    signal: np.ndarray      # +1 buy, -1 sell, 0 hold
+    size: np.ndarray
+
+    def metrics(self) -> Dict[str, float]:
+        return performance(self.position, self.returns)
+
+def performance(position: np.ndarray, returns: np.ndarray) -> Dict[str, float]:
+    n = len(returns)
+    equity = np.cumprod(1.0 + returns)
+    final = float(equity[-1]) if n else 1.0
+    std = float(returns.std(ddof=1)) if n > 1 else 0.0
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0 if n else np.zeros(1)
+    traded = float(np.abs(np.diff(position, prepend=0.0, append=0.0)).sum())
+    years = n / TRADING_DAYS
+    return {
+        "final_equity": final,
+        "total_return": final - 1.0,
+        "cagr": final ** (1.0 / years) - 1.0 if years > 0 and final > 0 else 0.0,
+        "sharpe": float(returns.mean()) / std * math.sqrt(TRADING_DAYS) if std > 0 else 0.0,
+        "max_drawdown": float(drawdown.min()),
+        "turnover": traded,
+        "turnover_annual": traded / years if years > 0 else 0.0,
+        "exposure": float(np.mean(position != 0)) if n else 0.0,
+        "trades": int(np.count_nonzero(np.diff(position, prepend=0.0))),
+        "bars": n,
+    }
+
+def rebalance_indices(candles: CandleFrame, start: datetime, end: datetime, every: int = REBALANCE_BARS) -> np.ndarray:
+    # Decision bars in [start, end], every `every` bars, after the indicator warm-up
+    lo = max(int(np.searchsorted(candles.ts, to_ns(start), side="left")), WARMUP_BARS)
+    hi = int(np.searchsorted(candles.ts, to_ns(end), side="right"))
+    return np.arange(lo, hi, max(1, every))
+
+def last_index(candles: CandleFrame, end: datetime) -> int:
+    return int(np.searchsorted(candles.ts, to_ns(end), side="right")) - 1
+
+def decision_features(
+    candles: CandleFrame, fund: Union[FundamentalsSnapshot, FundamentalsHistory], news: NewsHistory, idx: np.ndarray,
+    indicators: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+) -> np.ndarray:
+    # meta-learner inputs at every decision bar
+    _, weighted, _ = news.sentiment_many(candles.ts[idx], NEWS_WINDOW_DAYS)
+    return feature_matrix(candles, fund, idx, weighted, indicators)
+
+def advance_indicators(
+    state: IndicatorState, candles: CandleFrame, lo: int, hi: int, idx: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Stream bars lo .. hi into `state`; -> (rsi, macd, macd_signal) at the bars in idx
+    want = set(idx.tolist())
+    out = []
+    for i, c, h, l in zip(range(lo, hi + 1), candles.close[lo:hi + 1].tolist(),
+                          candles.high[lo:hi + 1].tolist(), candles.low[lo:hi + 1].tolist()):
+        state.update_values(c, h, l)
+        if i in want:
+            v = state.values()
+            out.append([np.nan if v[k] is None else v[k] for k in ("rsi", "macd", "macd_signal")])
+    if hi >= lo:
+        state.last_ts = candles.ts_at(hi)
+    cols = np.array(out, dtype=np.float64).reshape(-1, 3)
+    return cols[:, 0], cols[:, 1], cols[:, 2]
+
+def simulate(
+    open_: np.ndarray, close: np.ndarray, idx: np.ndarray, target: np.ndarray, horizon_days: int, last: int,
+    slippage_bps: float, fee_bps: float, carry: float = 0.0, prev: float = 0.0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # -> (position, net return) per bar for bars idx[0] .. last. When resuming mid-run,
+    # `carry` is the position already held over bar idx[0] and `prev` the one before it.
+    first = int(idx[0])
+    n = last - first + 1
+    # decision k holds target[k] over bars idx[k]+1 .. idx[k]+hold[k], cut at the next
+    # decision; built as +/- steps and a cumulative sum
+    starts = idx - first + 1
+    hold = np.minimum(horizon_days, np.diff(idx, append=last + 1))
+    steps = np.zeros(n + 1)
+    steps[0], steps[1] = carry, -carry
+    np.add.at(steps, np.minimum(starts, n), target)
+    np.add.at(steps, np.minimum(starts + hold, n), -target)
+    position = np.cumsum(steps)[:n]
+
+    o, c = open_[first:last + 1], close[first:last + 1]
+    nxt = np.append(o[1:], c[-1])  # the last bar is marked to its close
+    gross = position * (nxt / o - 1.0)
+    trades = np.abs(np.diff(position, prepend=prev))
+    trades[-1] += abs(position[-1])  # exit at the end
+    cost = trades * (slippage_bps + fee_bps) / 1e4
+    return position, gross - cost
+
+def backtest_arrays(
+    candles: CandleFrame,
+    fund: Union[FundamentalsSnapshot, FundamentalsHistory],
+    news: NewsHistory,
+    start: datetime,
+    end: datetime,
+    horizon_days: int = 5,
+    rebalance_bars: int = REBALANCE_BARS,
+    slippage_bps: Optional[float] = None,
+    fee_bps: Optional[float] = None,
+    buy: Optional[float] = None,
+    sell: Optional[float] = None,
+) -> BacktestResult:
+    idx = rebalance_indices(candles, start, end, rebalance_bars)
+    slippage_bps = settings.slippage_bps if slippage_bps is None else slippage_bps
+    fee_bps = settings.fee_bps if fee_bps is None else fee_bps
+    if not len(idx):
+        return _empty_result(candles.symbol)
+    prob_up, _, _ = meta_probabilities(decision_features(candles, fund, news, idx))
+    signal, size = signal_arrays(prob_up, buy, sell)
+    last = last_index(candles, end)
+    position, returns = simulate(candles.open, candles.close, idx, signal * size, horizon_days, last, slippage_bps, fee_bps)
+    return BacktestResult(
+        candles.symbol, candles.ts[idx[0]:last + 1], position, returns, np.cumprod(1.0 + returns),
+        candles.ts[idx], prob_up, signal, size,
+    )
+
+def _empty_result(symbol: str) -> BacktestResult:
+    z = np.empty(0)
+    return BacktestResult(symbol, np.empty(0, np.int64), z, z, z, np.empty(0, np.int64), z, np.empty(0, np.int64), z)
+
+def backtest_incremental(
+    candles: CandleFrame,
+    fund: Union[FundamentalsSnapshot, FundamentalsHistory],
+    news: NewsHistory,
+    start: datetime,
+    end: datetime,
+    horizon_days: int = 5,
+    rebalance_bars: int = REBALANCE_BARS,
+    slippage_bps: Optional[float] = None,
+    fee_bps: Optional[float] = None,
+    buy: Optional[float] = None,
+    sell: Optional[float] = None,
+    store: Optional[BacktestStateStore] = None,
+) -> Tuple[BacktestResult, str]:
+    """backtest_arrays, resumed from the stored run of the same configuration.
+
+    Decisions up to the stored end are reused; features and model scores are computed
+    for the new decision bars only, and the simulation restarts at the last stored
+    decision, carrying its position and equity. Returns the result and a status:
+    "fresh", "resumed", "cached" (nothing new) or "invalidated" (the prices, filings or
+    news the stored decisions saw have changed since, and the run was recomputed).
+    """
+    store = store or BacktestStateStore()
+    slippage_bps = settings.slippage_bps if slippage_bps is None else slippage_bps
+    fee_bps = settings.fee_bps if fee_bps is None else fee_bps
+    buy = settings.ensemble_buy_threshold if buy is None else buy
+    sell = settings.ensemble_sell_threshold if sell is None else sell
+    config = {
+        "start": to_ns(start), "horizon": horizon_days, "rebalance": rebalance_bars,
+        "slippage_bps": slippage_bps, "fee_bps": fee_bps, "buy": buy, "sell": sell,
+    }
+    key = state_key(candles.symbol, config)
+    end_ns = to_ns(end)
+    idx = rebalance_indices(candles, start, end, rebalance_bars)
+    if not len(idx):
+        return _empty_result(candles.symbol), "fresh"
+    last = last_index(candles, end)
+
+    prior = store.load(candles.symbol, key)
+    if prior is not None and prior.end > end_ns:
+        # an earlier end than stored: answer without shrinking the stored run
+        return backtest_arrays(candles, fund, news, start, end, horizon_days, rebalance_bars, slippage_bps, fee_bps, buy, sell), "fresh"
+    status = "fresh" if prior is None else "invalidated"
+    if prior is not None and _resumable(prior, candles, fund, news, idx):
+        old = prior.arrays
+        n = len(old["rebalance_ts"])
+        indicators = prior.indicators
+        tech = advance_indicators(indicators, candles, prior.last + 1, last, idx[n:])
+        new_prob, _, _ = meta_probabilities(decision_features(candles, fund, news, idx[n:], tech))
+        prob_up = np.concatenate([old["prob_up"], new_prob])
+        signal, size = signal_arrays(prob_up, buy, sell)
+        # bars before the last stored decision are final; simulate from there on
+        cut = int(idx[n - 1] - idx[0])
+        pos_tail, ret_tail = simulate(
+            candles.open, candles.close, idx[n - 1:], (signal * size)[n - 1:], horizon_days, last,
+            slippage_bps, fee_bps, carry=float(old["position"][cut]), prev=float(old["position"][cut - 1]) if cut else 0.0,
+        )
+        position = np.concatenate([old["position"][:cut], pos_tail])
+        returns = np.concatenate([old["returns"][:cut], ret_tail])
+        base = float(old["equity"][cut - 1]) if cut else 1.0
+        equity = np.concatenate([old["equity"][:cut], base * np.cumprod(1.0 + ret_tail)])
+        res = BacktestResult(
+            candles.symbol, candles.ts[idx[0]:last + 1], position, returns, equity, candles.ts[idx], prob_up, signal, size,
+        )
+        status = "resumed" if last > prior.last else "cached"
+    else:
+        res = backtest_arrays(candles, fund, news, start, end, horizon_days, rebalance_bars, slippage_bps, fee_bps, buy, sell)
+        indicators = IndicatorState(candles.symbol)
+        advance_indicators(indicators, candles, 0, last, idx[:0])
+
+    arrays = {f.name: getattr(res, f.name) for f in fields(res) if f.name != "symbol"}
+    fingerprint = inputs_fingerprint(candles, fund, news, last)
+    store.save(candles.symbol, key, BacktestState(end_ns, last, fingerprint, indicators, arrays))
+    return res, status
+
+def _resumable(
+    prior: BacktestState, candles: CandleFrame, fund: Union[FundamentalsSnapshot, FundamentalsHistory],
+    news: NewsHistory, idx: np.ndarray,
+) -> bool:
+    # same inputs up to the stored end and the same leading decision bars
+    n = len(prior.arrays["rebalance_ts"])
+    if not n or prior.last >= len(candles) or len(idx) < n:
+        return False
+    if not np.array_equal(candles.ts[idx[:n]], prior.arrays["rebalance_ts"]):
+        return False
+    return inputs_fingerprint(candles, fund, news, prior.last) == prior.fingerprint
+
+async def load_history(symbol: str, start: datetime, end: datetime) -> Tuple[CandleFrame, FundamentalsHistory, NewsHistory]:
+    # Everything the backtest reads, fetched once
+    candles = await get_timeseries(symbol, start - timedelta(days=_HISTORY_DAYS), end)
+    if not len(candles):
+        raise ValueError(f"No candles for {symbol}")
+    fund, news = await asyncio.gather(
+        get_fundamentals_history(symbol),
+        get_news_history(symbol, candles.ts_at(0) - timedelta(days=NEWS_WINDOW_DAYS), candles.ts_at(-1)),
+    )
+    return candles, fund, news
+
+async def walk_forward_backtest(
+    symbol: str,
+    start: datetime,
+    end: datetime,
+    horizon_days: int = 5,
+    rebalance_bars: int = REBALANCE_BARS,
+    slippage_bps: Optional[float] = None,
+    fee_bps: Optional[float] = None,
+    buy: Optional[float] = None,
+    sell: Optional[float] = None,
+    store: Optional[BacktestStateStore] = None,
+) -> Dict:
+    # With a store, the run resumes from (and updates) the stored run of this configuration
+    candles, fund, news = await load_history(symbol, start, end)
+    args = (candles, fund, news, start, end, horizon_days, rebalance_bars, slippage_bps, fee_bps, buy, sell)
+    if store is None:
+        res, status = backtest_arrays(*args), "fresh"
+    else:
+        res, status = backtest_incremental(*args, store=store)
+    at_decision = np.searchsorted(res.ts, res.rebalance_ts)
+    return {
+        **res.metrics(),
+        "status": status,
+        "equity_curve": [(from_ns(t), float(res.equity[i])) for t, i in zip(res.rebalance_ts, at_decision)],
+    }
+
+async def _run(symbol: str, start: datetime, end: datetime, horizon_days: int, **kwargs) -> Dict:
+    # Backtest fetches queue behind interactive /analyze calls
+    with priority(Priority.BULK):
+        async with http_clients(*provider_urls()):
+            return await walk_forward_backtest(symbol, start, end, horizon_days, **kwargs)
+
+async def _run_universe(symbols, start: datetime, end: datetime, horizon_days: int, **kwargs) -> Dict[str, Union[Dict, BaseException]]:
+    # Nightly regression: every symbol resumes from its stored run; fetches are bounded
+    # by the provider limiters
+    with priority(Priority.BULK):
+        async with http_clients(*provider_urls()):
+            out = await asyncio.gather(
+                *(walk_forward_backtest(s, start, end, horizon_days, **kwargs) for s in symbols), return_exceptions=True,
+            )
+    return dict(zip(symbols, out))
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--symbol", type=str, default="AAPL")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--symbol", type=str, default="AAPL")
+    group.add_argument("--universe-file", type=str, help="one symbol per line, # comments")
     parser.add_argument("--start", type=str, default="2022-01-01")
     parser.add_argument("--end", type=str, default="2024-12-31")
     parser.add_argument("--horizon", type=int, default=5)
+    parser.add_argument("--rebalance", type=int, default=REBALANCE_BARS, help="bars between decisions")
+    parser.add_argument("--slippage-bps", type=float, default=None)
+    parser.add_argument("--fee-bps", type=float, default=None)
+    parser.add_argument("--buy", type=float, default=None, help="prob_up above this buys")
+    parser.add_argument("--sell", type=float, default=None, help="prob_up below this sells")
+    parser.add_argument("--state-dir", type=str, default=None, help="stored runs (default: settings.backtest_state_dir)")
+    parser.add_argument("--no-resume", action="store_true", help="recompute from the start, store nothing")
     args = parser.parse_args()
     start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc)
     end = datetime.fromisoformat(args.end).replace(tzinfo=timezone.utc)
+    kwargs = dict(
+        rebalance_bars=args.rebalance, slippage_bps=args.slippage_bps, fee_bps=args.fee_bps,
+        buy=args.buy, sell=args.sell, store=None if args.no_resume else BacktestStateStore(args.state_dir),
+    )
+
+    if args.universe_file:
+        results = asyncio.run(_run_universe(read_universe(args.universe_file), start, end, args.horizon, **kwargs))
+        for sym, res in results.items():
+            if isinstance(res, BaseException):
+                print(f"{sym:<8} error: {res}")
+            else:
+                print(f"{sym:<8} {res['status']:<11} equity={res['final_equity']:.3f}  sharpe={res['sharpe']:5.2f}  "
+                      f"max_dd={res['max_drawdown']:7.2%}  trades={res['trades']}")
+        return
 
-    res = asyncio.run(walk_forward_backtest(args.symbol, start, end, args.horizon))
-    print(f"Final equity: {res['final_equity']:.3f}")
+    res = asyncio.run(_run(args.symbol, start, end, args.horizon, **kwargs))
+    print(f"Final equity: {res['final_equity']:.3f}  ({res['status']})")
+    print(f"CAGR: {res['cagr']:.2%}  Sharpe: {res['sharpe']:.2f}  Max drawdown: {res['max_drawdown']:.2%}")
+    print(f"Turnover: {res['turnover']:.2f} ({res['turnover_annual']:.1f}/yr)  Trades: {res['trades']}  Exposure: {res['exposure']:.0%}")
     print(f"Points: {len(res['equity_curve'])}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
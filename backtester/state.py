@@ -0,0 +1,125 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+import numpy as np
+from libs.data.news_archive import NewsHistory
+from libs.features.incremental import IndicatorState
+from libs.schemas.frame import CandleFrame
+from libs.schemas.fundamentals import FundamentalsHistory
+from libs.models.dataset import feature_versions
+from libs.schemas.models import FundamentalsSnapshot
+from libs.utils.config import settings
+
+# Persisted backtest runs, so a rerun with a later end only computes the new decisions.
+#
+# The state holds the run's result columns (equity, positions, decisions), its cursor
+# (end and last bar) and the streaming indicator state at that bar. It is stored under a
+# key hashing the symbol, the configuration (start, horizon, rebalance spacing, costs,
+# thresholds) and every version that feeds the decisions: feature and agent versions,
+# the sentiment model and a digest of the meta-model file. Changing any of them changes
+# the key, so stale state is never read, and saving a run deletes the symbol's states
+# stored under other versions.
+#
+# The state also fingerprints every input its decisions saw: prices, filings and scored
+# news up to its last bar. A split adjustment, a revised bar, a late filing or an
+# article archived after the run makes the stored decisions stale, and the run starts
+# over.
+
+_STATE_VERSION = 3  # 3: exact Bollinger window in the indicator state
+_SCALARS = ("version", "end", "last", "fingerprint", "indicators")
+
+def meta_model_digest(path: Optional[str] = None) -> str:
+    p = Path(path or settings.meta_model_path)
+    if not p.exists():
+        return "meta_stub_v1"
+    return hashlib.sha1(p.read_bytes()).hexdigest()[:16]
+
+def model_versions() -> Dict[str, str]:
+    return {**feature_versions(), "meta": meta_model_digest()}
+
+def state_key(symbol: str, config: Dict[str, Any], versions: Optional[Dict[str, str]] = None) -> str:
+    # "<versions digest>_<configuration digest>"; the first part tells superseded states apart
+    digest = lambda payload: hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    versions = {"v": _STATE_VERSION, **(versions or model_versions())}
+    return f"{digest(versions)[:10]}_{digest({'symbol': symbol.upper(), 'config': config})[:12]}"
+
+def price_fingerprint(ts: np.ndarray, open_: np.ndarray, close: np.ndarray) -> str:
+    h = hashlib.sha1()
+    for a in (ts, open_, close):
+        h.update(np.ascontiguousarray(a).tobytes())
+    return h.hexdigest()
+
+def inputs_fingerprint(
+    candles: CandleFrame, fund: Union[FundamentalsSnapshot, FundamentalsHistory], news: NewsHistory, last: int,
+) -> str:
+    # Prices up to and including bar `last`, and the filings and news known by then
+    k = last + 1
+    h = hashlib.sha1(price_fingerprint(candles.ts[:k], candles.open[:k], candles.close[:k]).encode())
+    cutoff = candles.ts[last]
+    if isinstance(fund, FundamentalsHistory):
+        n = int(np.searchsorted(fund.filed, cutoff, side="right"))
+        for a in (fund.filed, fund.period, *fund.cols.values()):
+            h.update(np.ascontiguousarray(a[:n]).tobytes())
+    else:
+        h.update(fund.model_dump_json().encode())
+    n = int(np.searchsorted(news.pub, cutoff, side="right"))
+    h.update(news.pub[:n].tobytes())
+    h.update(news.score[:n].tobytes())
+    return h.hexdigest()
+
+@dataclass
+class BacktestState:
+    end: int                # int64 ns end of the stored run (the cursor)
+    last: int               # candle index of its last bar
+    fingerprint: str        # inputs_fingerprint at `last`
+    indicators: IndicatorState  # streaming indicators after bar `last`
+    arrays: Dict[str, np.ndarray]  # the BacktestResult columns: equity, positions, decisions
+
+class BacktestStateStore:
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.backtest_state_dir)
+
+    def path(self, symbol: str, key: str) -> Path:
+        return self.root / f"{symbol.upper()}_{key}.npz"
+
+    def prune(self, symbol: str, key: str) -> int:
+        # Delete the symbol's states stored under other versions than `key`'s; returns
+        # how many went
+        prefix, versions = f"{symbol.upper()}_", key.split("_")[0]
+        removed = 0
+        for p in self.root.glob(f"{prefix}*.npz"):
+            rest = p.stem[len(prefix):].split("_")
+            if len(rest) > 2:
+                continue  # another symbol sharing the prefix (BRK vs BRK_B)
+            if rest[0] != versions:
+                p.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def load(self, symbol: str, key: str) -> Optional[BacktestState]:
+        p = self.path(symbol, key)
+        if not p.exists():
+            return None
+        with np.load(p) as z:
+            if int(z["version"]) != _STATE_VERSION:
+                return None
+            arrays = {k: z[k] for k in z.files if k not in _SCALARS}
+            indicators = IndicatorState.from_dict(json.loads(str(z["indicators"])))
+            return BacktestState(int(z["end"]), int(z["last"]), str(z["fingerprint"]), indicators, arrays)
+
+    def save(self, symbol: str, key: str, state: BacktestState) -> None:
+        p = self.path(symbol, key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(p.name + f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f, version=np.int64(_STATE_VERSION), end=np.int64(state.end), last=np.int64(state.last),
+                fingerprint=np.array(state.fingerprint), indicators=np.array(json.dumps(state.indicators.to_dict())),
+                **state.arrays,
+            )
+        os.replace(tmp, p)
+        self.prune(symbol, key)
@@ -0,0 +1,211 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import csv
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backtester import engine
+from libs.ensemble.meta import meta_probabilities, signal_arrays
+from libs.models.universe import read_universe
+from libs.utils.config import settings
+from libs.utils.http import http_clients, provider_urls
+from libs.utils.limits import Priority, priority
+
+# Parameter sweeps over symbols x horizons x buy/sell thresholds on a process pool.
+#
+# The parent loads every symbol once and computes its decision-bar features. Each
+# symbol's arrays (open, close, decision bars, features) are saved as .npy files that
+# the workers memory-map read-only, so the pages are shared through the OS cache and
+# nothing but file names is pickled. A task is one symbol with the whole grid: the meta
+# model scores its features once, then every grid point is a threshold pass plus a
+# simulation.
+
+Thresholds = Tuple[float, float]  # (buy, sell)
+
+def threshold_grid(buys: Sequence[float], sells: Sequence[float]) -> List[Thresholds]:
+    return [(b, s) for b in buys for s in sells if s <= b]
+
+def stage(root: Path, symbol: str, candles, idx: np.ndarray, X: np.ndarray) -> None:
+    d = root / symbol
+    d.mkdir(parents=True, exist_ok=True)
+    np.save(d / "open.npy", candles.open)
+    np.save(d / "close.npy", candles.close)
+    np.save(d / "idx.npy", idx)
+    np.save(d / "X.npy", X)
+
+def _arrays(root: Path, symbol: str) -> Dict[str, np.ndarray]:
+    return {k: np.load(root / symbol / f"{k}.npy", mmap_mode="r") for k in ("open", "close", "idx", "X")}
+
+async def prepare(
+    symbols: Sequence[str], start: datetime, end: datetime, root: Path, rebalance_bars: int = engine.REBALANCE_BARS,
+) -> Tuple[Dict[str, int], Dict[str, str]]:
+    # -> ({symbol: last bar index}, {symbol: error}); loads run concurrently under the
+    # provider limiters
+    loaded = await asyncio.gather(*(engine.load_history(s, start, end) for s in symbols), return_exceptions=True)
+    ready, failed = {}, {}
+    for symbol, res in zip(symbols, loaded):
+        if isinstance(res, BaseException):
+            failed[symbol] = str(res)
+            continue
+        candles, fund, news = res
+        idx = engine.rebalance_indices(candles, start, end, rebalance_bars)
+        if not len(idx):
+            failed[symbol] = "no decision bars in range"
+            continue
+        stage(root, symbol, candles, idx, engine.decision_features(candles, fund, news, idx))
+        ready[symbol] = engine.last_index(candles, end)
+    return ready, failed
+
+def _run_symbol(
+    root: str, symbol: str, last: int, horizons: Sequence[int], thresholds: Sequence[Thresholds],
+    slippage_bps: float, fee_bps: float,
+) -> List[Dict]:
+    a = _arrays(Path(root), symbol)
+    idx = np.asarray(a["idx"])
+    prob_up, _, _ = meta_probabilities(a["X"])
+    rows = []
+    for buy, sell in thresholds:
+        signal, size = signal_arrays(prob_up, buy, sell)
+        for h in horizons:
+            position, returns = engine.simulate(a["open"], a["close"], idx, signal * size, h, last, slippage_bps, fee_bps)
+            rows.append({"symbol": symbol, "horizon": h, "buy": buy, "sell": sell, **engine.performance(position, returns)})
+    return rows
+
+def run_grid(
+    root: Path,
+    ready: Dict[str, int],
+    horizons: Sequence[int],
+    thresholds: Sequence[Thresholds],
+    workers: Optional[int] = None,
+    slippage_bps: Optional[float] = None,
+    fee_bps: Optional[float] = None,
+) -> List[Dict]:
+    slippage_bps = settings.slippage_bps if slippage_bps is None else slippage_bps
+    fee_bps = settings.fee_bps if fee_bps is None else fee_bps
+    workers = max(1, min(workers or os.cpu_count() or 1, len(ready) or 1))
+    symbols = list(ready)
+    args = (
+        [str(root)] * len(symbols), symbols, [ready[s] for s in symbols],
+        [list(horizons)] * len(symbols), [list(thresholds)] * len(symbols),
+        [slippage_bps] * len(symbols), [fee_bps] * len(symbols),
+    )
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        chunk = max(1, len(symbols) // (workers * 4))
+        return [row for rows in pool.map(_run_symbol, *args, chunksize=chunk) for row in rows]
+
+def summarize(rows: Sequence[Dict]) -> List[Dict]:
+    # One row per (horizon, buy, sell): mean metrics across symbols, best Sharpe first
+    groups: Dict[Tuple, List[Dict]] = {}
+    for r in rows:
+        groups.setdefault((r["horizon"], r["buy"], r["sell"]), []).append(r)
+    out = []
+    for (h, buy, sell), rs in groups.items():
+        mean = lambda k: float(np.mean([r[k] for r in rs]))
+        out.append({
+            "horizon": h, "buy": buy, "sell": sell, "symbols": len(rs),
+            "sharpe": mean("sharpe"), "cagr": mean("cagr"), "max_drawdown": mean("max_drawdown"),
+            "turnover_annual": mean("turnover_annual"), "exposure": mean("exposure"),
+        })
+    return sorted(out, key=lambda r: r["sharpe"], reverse=True)
+
+def write_csv(rows: Sequence[Dict], path: str) -> None:
+    if not rows:
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0]))
+        w.writeheader()
+        w.writerows(rows)
+
+def run_sweep(
+    symbols: Sequence[str],
+    start: datetime,
+    end: datetime,
+    horizons: Sequence[int],
+    thresholds: Sequence[Thresholds],
+    workers: Optional[int] = None,
+    rebalance_bars: int = engine.REBALANCE_BARS,
+    slippage_bps: Optional[float] = None,
+    fee_bps: Optional[float] = None,
+    log: Callable[[str], None] = print,
+) -> Tuple[List[Dict], Dict]:
+    with tempfile.TemporaryDirectory(prefix="sweep-") as tmp:
+        root = Path(tmp)
+        t0 = time.perf_counter()
+        ready, failed = asyncio.run(_prepare(symbols, start, end, root, rebalance_bars))
+        t1 = time.perf_counter()
+        log(f"prepared {len(ready)} symbols in {t1 - t0:.1f}s ({len(failed)} failed)")
+        rows = run_grid(root, ready, horizons, thresholds, workers, slippage_bps, fee_bps)
+        t2 = time.perf_counter()
+    report = {"symbols": len(ready), "failed": failed, "runs": len(rows), "prepare_s": t1 - t0, "grid_s": t2 - t1}
+    return rows, report
+
+async def _prepare(symbols, start, end, root, rebalance_bars):
+    # Sweep fetches queue behind interactive /analyze calls
+    with priority(Priority.BULK):
+        async with http_clients(*provider_urls()):
+            return await prepare(symbols, start, end, root, rebalance_bars)
+
+def _scaling(symbols, start, end, horizons, thresholds, rebalance_bars: int, max_workers: int) -> None:
+    # Prepare once, then run the grid at 1, 2, 4, ... workers and report the speedup
+    counts = sorted({min(2 ** i, max_workers) for i in range(max_workers.bit_length() + 1)})
+    with tempfile.TemporaryDirectory(prefix="sweep-") as tmp:
+        ready, _ = asyncio.run(_prepare(symbols, start, end, Path(tmp), rebalance_bars))
+        base = None
+        for n in counts:
+            t0 = time.perf_counter()
+            run_grid(Path(tmp), ready, horizons, thresholds, workers=n)
+            wall = time.perf_counter() - t0
+            base = base or wall
+            print(f"workers={n:>3}  wall={wall:8.2f}s  speedup={base / wall:5.2f}x")
+
+def _floats(s: str) -> List[float]:
+    return [float(x) for x in s.split(",") if x.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest parameter sweep")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--symbols", type=str, help="comma separated")
+    group.add_argument("--universe-file", type=str, help="one symbol per line, # comments")
+    parser.add_argument("--start", type=str, default="2022-01-01")
+    parser.add_argument("--end", type=str, default="2024-12-31")
+    parser.add_argument("--horizons", type=str, default="5,10,20")
+    parser.add_argument("--buy", type=str, default="0.52,0.55,0.6", help="buy thresholds")
+    parser.add_argument("--sell", type=str, default="0.4,0.45,0.48", help="sell thresholds")
+    parser.add_argument("--rebalance", type=int, default=engine.REBALANCE_BARS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", type=str, default="data/sweeps/sweep.csv")
+    parser.add_argument("--scaling", action="store_true", help="report grid time vs worker count and exit")
+    args = parser.parse_args()
+
+    symbols = read_universe(args.universe_file) if args.universe_file else [
+        s.strip().upper() for s in args.symbols.split(",") if s.strip()
+    ]
+    start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc)
+    end = datetime.fromisoformat(args.end).replace(tzinfo=timezone.utc)
+    horizons = [int(h) for h in args.horizons.split(",")]
+    thresholds = threshold_grid(_floats(args.buy), _floats(args.sell))
+
+    if args.scaling:
+        _scaling(symbols, start, end, horizons, thresholds, args.rebalance, args.workers)
+        return
+    rows, report = run_sweep(symbols, start, end, horizons, thresholds, args.workers, args.rebalance)
+    write_csv(rows, args.out)
+    print(f"{report['runs']} runs over {report['symbols']} symbols in {report['grid_s']:.1f}s -> {args.out}")
+    for sym, err in report["failed"].items():
+        print(f"  {sym}: {err}")
+    for r in summarize(rows)[:10]:
+        print(f"h={r['horizon']:>3} buy={r['buy']:.2f} sell={r['sell']:.2f}  sharpe={r['sharpe']:6.2f}  "
+              f"cagr={r['cagr']:7.2%}  max_dd={r['max_drawdown']:7.2%}  turnover={r['turnover_annual']:5.1f}/yr")
+
+if __name__ == "__main__":
+    main()
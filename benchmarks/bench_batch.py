@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Symbols per second: N x GET /analyze/{symbol} vs one POST /analyze/batch.
+
+Providers, Redis and FinBERT are replaced by in-process fakes with fixed latencies, so
+the numbers show the cost of the request pattern (per-symbol cache round trips and
+forward passes vs batched ones) rather than of any real service:
+
+    python benchmarks/bench_batch.py --symbols 500 --concurrency 16
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import httpx
+import numpy as np
+from libs.data import adapters
+from libs.data.news_archive import NewsArchive
+from libs.schemas.frame import CandleFrame, to_ns
+from libs.schemas.fundamentals import FundamentalsHistory
+from libs.nlp.service import SentimentService
+from libs.schemas.models import NewsItem
+from libs.utils.config import settings
+from apps.orchestrator import main
+
+REDIS_RTT_S = 0.0005
+PRICES_S, FUND_S, NEWS_S = 0.03, 0.04, 0.06
+FINBERT_CALL_S, FINBERT_ARTICLE_S = 0.02, 0.001
+ARTICLES = 10
+
+class FakeRedisConn:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        await asyncio.sleep(REDIS_RTT_S)
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        await asyncio.sleep(REDIS_RTT_S)
+        self.data[key] = value
+
+    async def mget(self, keys):
+        await asyncio.sleep(REDIS_RTT_S)
+        return [self.data.get(k) for k in keys]
+
+    def pipeline(self, transaction=False):
+        conn, ops = self, []
+
+        class Pipe:
+            def set(self, key, value, ex=None):
+                ops.append((key, value))
+
+            async def execute(self):
+                await asyncio.sleep(REDIS_RTT_S)
+                conn.data.update(ops)
+
+        return Pipe()
+
+class FakeFinBert:
+    def __init__(self):
+        self.calls = 0
+
+    def score_texts(self, texts):
+        # fixed overhead per forward pass plus per-article cost
+        self.calls += 1
+        time.sleep(FINBERT_CALL_S + FINBERT_ARTICLE_S * len(texts))
+        return [(0.1, 0.8)] * len(texts)
+
+async def read_history(symbol, start, end):
+    await asyncio.sleep(PRICES_S)
+    days = np.arange(to_ns(start) // 86_400_000_000_000, to_ns(end) // 86_400_000_000_000 + 1)
+    close = 100 + np.sin(days / 9.0) * 5
+    return CandleFrame(symbol, days * 86_400_000_000_000, close, close + 1, close - 1, close, np.full(len(days), 1e6))
+
+async def fundamentals(symbol):
+    await asyncio.sleep(FUND_S)
+    return FundamentalsHistory.from_rows(symbol, [{
+        "filed": datetime(2024, 2, 1, tzinfo=timezone.utc), "period": datetime(2023, 12, 31, tzinfo=timezone.utc),
+        "pe": 20.0, "roe": 0.15, "debt_to_equity": 0.5, "profit_margin": 0.2, "growth_rev_yoy": 0.1,
+    }])
+
+async def news(symbol, start, end):
+    await asyncio.sleep(NEWS_S)
+    return [NewsItem(symbol=symbol, published_at=end - timedelta(hours=i), title=f"{symbol} headline {i}", summary="...")
+            for i in range(ARTICLES)]
+
+def reset(finbert: FakeFinBert):
+    conn = FakeRedisConn()
+    archive = NewsArchive(tempfile.mkdtemp(prefix="bench-news-"))
+    adapters.get_news_archive = lambda: archive
+    adapters.redis._pool = conn
+    adapters.redis.l1.store.clear()
+    main.state_cache._pool = conn
+    main.state_cache.l1.store.clear()
+    main.cache.store.clear()
+    main.indicator_states.store.clear()
+    finbert.calls = 0
+
+async def per_symbol(client: httpx.AsyncClient, symbols, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(s):
+        async with sem:
+            (await client.get(f"/analyze/{s}")).raise_for_status()
+
+    await asyncio.gather(*(one(s) for s in symbols))
+
+async def batch(symbols):
+    # Drive the ASGI app directly: httpx's ASGITransport buffers streamed bodies, which
+    # would hide when the first NDJSON line goes out
+    body = json.dumps({"symbols": symbols, "horizons": [5]}).encode()
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": "/analyze/batch", "raw_path": b"/analyze/batch", "query_string": b"",
+             "root_path": "", "headers": [(b"content-type", b"application/json")], "server": ("bench", 80),
+             "client": ("bench", 1)}
+    sent = False
+    lines, first, t0 = [], None, time.perf_counter()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal first
+        if message["type"] == "http.response.body" and message.get("body"):
+            first = first or time.perf_counter() - t0
+            lines.extend(l for l in message["body"].split(b"\n") if l)
+
+    await main.app(scope, receive, send)
+    assert len(lines) == len(symbols) and all(json.loads(l)["results"] for l in lines)
+    return first
+
+async def run(n: int, concurrency: int):
+    logging.getLogger("orchestrator").setLevel(logging.WARNING)
+    settings.news_api_key = settings.fmp_api_key = "bench"
+    settings.batch_concurrency = concurrency
+    adapters._read_daily_history = read_history
+    adapters.get_fundamentals_history_fmp = fundamentals
+    adapters.get_news_newsapi = news
+    finbert = FakeFinBert()
+    service = SentimentService(factory=lambda: finbert, timeout_s=60)
+    adapters.get_sentiment_service = lambda: service
+    symbols = [f"S{i:04d}" for i in range(n)]
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        reset(finbert)
+        t0 = time.perf_counter()
+        await per_symbol(client, symbols, concurrency)
+        single = time.perf_counter() - t0
+        single_calls = finbert.calls
+
+
+    reset(finbert)
+    t0 = time.perf_counter()
+    first = await batch(symbols)
+    batched = time.perf_counter() - t0
+
+    print(f"symbols={n} concurrency={concurrency}")
+    print(f"GET  /analyze/{{symbol}} x{n}: {single:7.2f} s  {n / single:7.1f} symbols/s  finbert passes={single_calls}")
+    print(f"POST /analyze/batch       : {batched:7.2f} s  {n / batched:7.1f} symbols/s  finbert passes={finbert.calls}"
+          f"  first line after {first * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(run(args.symbols, args.concurrency))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Redis payload size and decode time for a full daily history: old JSON candles vs the binary codec.
+
+The old format is what get_timeseries used to store: json.dumps of a list of Candle
+dicts, decoded with json.loads and rebuilt into pydantic Candles. The new format is the
+CandleFrame columns through libs.utils.codec. Pass --redis to also time a GET round trip
+against a running Redis (REDIS_URL).
+
+    python benchmarks/bench_cache_codec.py --bars 6000
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import numpy as np
+from libs.schemas.models import Candle
+from libs.schemas.frame import CandleFrame, to_ns
+from libs.utils.codec import encode, decode
+
+def _history(n: int) -> CandleFrame:
+    # Quotes with cent precision and whole-share volumes, like the provider data
+    rnd = np.random.default_rng(0)
+    close = 100 * np.cumprod(1 + rnd.normal(0, 0.01, n))
+    t0 = datetime(2000, 1, 3, tzinfo=timezone.utc)
+    ts = np.array([to_ns(t0 + timedelta(days=i)) for i in range(n)])
+    cents = lambda a: np.round(a, 2)
+    volume = np.round(rnd.uniform(1e6, 5e7, n))
+    return CandleFrame("AAPL", ts, cents(close * 0.99), cents(close * 1.01), cents(close * 0.98), cents(close), volume)
+
+def _time(fn, repeat: int = 20) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+async def _redis_roundtrip(old: bytes, new: bytes):
+    import redis.asyncio as redis
+    from libs.utils.config import settings
+    conn = redis.from_url(settings.redis_url, decode_responses=False)
+    await conn.set("bench:old", old)
+    await conn.set("bench:new", new)
+    for name in ("old", "new"):
+        t0 = time.perf_counter()
+        for _ in range(20):
+            await conn.get(f"bench:{name}")
+        print(f"redis GET {name}: {(time.perf_counter() - t0) / 20 * 1000:.3f} ms")
+    await conn.delete("bench:old", "bench:new")
+    await conn.aclose()
+
+def main(bars: int, use_redis: bool):
+    frame = _history(bars)
+    candles = frame.to_candles()
+    old = json.dumps({"candles": [c.model_dump(mode="json") for c in candles]}).encode()
+    new = encode({"frame": frame.to_dict(arrays=True)})
+
+    old_decode = _time(lambda: [Candle(**c) for c in json.loads(old)["candles"]], repeat=5)
+    new_decode = _time(lambda: CandleFrame.from_dict(decode(new)["frame"]))
+    new_encode = _time(lambda: encode({"frame": frame.to_dict(arrays=True)}))
+
+    print(f"bars={bars}")
+    print(f"payload  json candles: {len(old) / 1024:9.1f} KB   codec: {len(new) / 1024:8.1f} KB   ({len(old) / len(new):.1f}x smaller)")
+    print(f"decode   json candles: {old_decode:9.2f} ms   codec: {new_decode:8.3f} ms   ({old_decode / new_decode:.0f}x faster)")
+    print(f"encode   codec: {new_encode:.3f} ms")
+    assert np.array_equal(CandleFrame.from_dict(decode(new)["frame"]).close, frame.close)
+    if use_redis:
+        asyncio.run(_redis_roundtrip(old, new))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=6000)
+    parser.add_argument("--redis", action="store_true")
+    args = parser.parse_args()
+    main(args.bars, args.redis)
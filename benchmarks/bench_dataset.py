@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Meta-learner dataset build time: row-by-row to_feature_row loop vs libs.models.dataset.
+
+Sources are in-memory fakes. --latency-ms adds a simulated round trip to every
+fundamentals/news fetch (a Redis-cached hit is ~1 ms, a provider call far more); the row
+loop makes two fetches per row, the vectorized builder two per symbol. With
+--latency-ms 0 only the compute is compared:
+
+    python benchmarks/bench_dataset.py --years 10 --news 20000 --latency-ms 1
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import numpy as np
+from libs.data.news_archive import NewsHistory
+from libs.models import dataset, train_meta
+from libs.schemas.frame import CandleFrame, to_ns
+from libs.schemas.models import FundamentalsSnapshot, NewsItem
+
+T0 = datetime(2010, 1, 4, tzinfo=timezone.utc)
+
+def _sources(n_bars: int, n_news: int):
+    rnd = np.random.default_rng(0)
+    close = 50 * np.cumprod(1 + rnd.normal(0, 0.015, n_bars))
+    ts = np.array([to_ns(T0 + timedelta(days=i * 7 // 5)) for i in range(n_bars)])
+    candles = CandleFrame("BENCH", ts, close, close * 1.01, close * 0.99, close, np.full(n_bars, 1e6))
+    span = int((ts[-1] - ts[0]) // 10**9)
+    news = sorted(
+        (NewsItem(symbol="BENCH", title=f"n{i}", published_at=T0 + timedelta(seconds=int(rnd.integers(0, span))),
+                  sentiment_score=float(rnd.uniform(-1, 1))) for i in range(n_news)),
+        key=lambda n: n.published_at, reverse=True,
+    )
+    fund = FundamentalsSnapshot(symbol="BENCH", as_of=T0, pe=15.0, roe=0.2, debt_to_equity=1.0)
+    return candles, fund, news
+
+def main(years: int, n_news: int, horizon: int, latency_ms: float):
+    import asyncio
+    candles, fund, news = _sources(years * 252, n_news)
+    pub = np.array([to_ns(n.published_at) for n in news])
+
+    async def get_fundamentals(symbol, as_of):
+        await asyncio.sleep(latency_ms / 1000)
+        return fund
+
+    async def get_news(symbol, start, end):
+        await asyncio.sleep(latency_ms / 1000)
+        keep = np.flatnonzero((pub >= to_ns(start)) & (pub <= to_ns(end)))
+        return [news[i] for i in keep]
+
+    train_meta.get_fundamentals, train_meta.get_news = get_fundamentals, get_news
+
+    t0 = time.perf_counter()
+    series = train_meta.technical_series(candles)
+    rows = []
+    for i in range(40, len(candles) - horizon, 5):
+        feats = train_meta.to_feature_row("BENCH", i, candles, horizon, candles.ts_at(i), series)
+        rows.append([feats[k] for k in dataset.FEATURE_ORDER])
+    loop_s = time.perf_counter() - t0
+
+    async def vectorized():
+        f, n = await asyncio.gather(get_fundamentals("BENCH", T0), get_news("BENCH", T0 - timedelta(days=7), candles.ts_at(-1)))
+        return dataset.build_dataset(candles, f, NewsHistory("BENCH", n[::-1]), horizon)
+
+    t0 = time.perf_counter()
+    ds = asyncio.run(vectorized())
+    vec_s = time.perf_counter() - t0
+
+    # equal up to the last bits of the news sentiment (prefix sums vs per-row sums); the
+    # hash-seeded stub forecast columns are reseeded by those bits and left out
+    other = [i for i, k in enumerate(dataset.FEATURE_ORDER) if k not in ("m_exp", "m_conf")]
+    assert np.allclose(ds.X[:, other], np.array(rows)[:, other], rtol=1e-12, atol=1e-12)
+    print(f"bars={len(candles)} news={n_news} rows={len(ds)} latency/fetch={latency_ms} ms")
+    print(f"row loop   : {loop_s * 1000:9.1f} ms")
+    print(f"vectorized : {vec_s * 1000:9.1f} ms   ({loop_s / vec_s:.0f}x faster, same features)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--news", type=int, default=20000)
+    parser.add_argument("--horizon", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    main(args.years, args.news, args.horizon, args.latency_ms)
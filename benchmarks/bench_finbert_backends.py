@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Articles per second for each FinBERT backend on CPU: torch eager, ONNX fp32, ONNX int8.
+
+Exports the ONNX models into --onnx-dir on first run (needs torch, transformers and
+onnxruntime, and downloads ProsusAI/finbert if it is not cached):
+
+    python benchmarks/bench_finbert_backends.py --articles 512 --threads 4
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import numpy as np
+from libs.utils.config import settings
+
+HEADLINES = [
+    "{c} beats earnings expectations and raises full-year guidance",
+    "{c} shares plunge after regulator opens investigation into accounting",
+    "{c} to hold annual shareholder meeting in May",
+    "Analysts downgrade {c} citing slowing demand and rising inventory levels across its core markets",
+    "{c} announces buyback",
+]
+
+def _articles(n: int):
+    rnd = np.random.default_rng(0)
+    return [HEADLINES[int(rnd.integers(len(HEADLINES)))].format(c=f"Company {i}") for i in range(n)]
+
+def main(n: int, threads: int, onnx_dir: str):
+    from libs.nlp.finbert import FinBertSentiment
+    from libs.nlp.finbert_onnx import OnnxFinBertSentiment
+
+    texts = sorted(_articles(n), key=lambda t: len(t.split()))  # as the service hands them over
+    backends = [
+        ("torch", lambda: FinBertSentiment(device="cpu", threads=threads)),
+        ("onnx fp32", lambda: OnnxFinBertSentiment(onnx_dir, quantized=False, threads=threads)),
+        ("onnx int8", lambda: OnnxFinBertSentiment(onnx_dir, quantized=True, threads=threads)),
+    ]
+    ref = None
+    print(f"articles={n} threads={threads} sub-batch={settings.sentiment_model_batch}")
+    for name, factory in backends:
+        model = factory()
+        model.score_texts(texts[:16])  # warm-up
+        t0 = time.perf_counter()
+        scores = np.array(model.score_texts(texts))
+        elapsed = time.perf_counter() - t0
+        ref = scores if ref is None else ref
+        print(f"{name:10} {n / elapsed:8.1f} articles/s   max |score - torch| = {np.abs(scores - ref)[:, 0].max():.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=512)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--onnx-dir", default=settings.sentiment_onnx_dir)
+    args = parser.parse_args()
+    main(args.articles, args.threads, args.onnx_dir)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Per-call latency of get_json with a fresh AsyncClient per call vs the pooled registry.
+
+Runs against a local keep-alive stub server, so the numbers isolate client setup and
+connection establishment from provider latency:
+
+    python benchmarks/bench_http.py --requests 500 --concurrency 10
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import httpx
+import numpy as np
+from libs.utils.http import clients, get_json
+
+BODY = json.dumps({"Time Series (Daily)": {"2024-01-02": {"4. close": "100.0"}}}).encode()
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            if not head:
+                break
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(BODY)}\r\n\r\n".encode()
+                + BODY
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+async def _per_call_client(url: str):
+    # What get_json did before: a new client (and connection) for every call
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        resp = await client.get(url)
+        resp.raise_for_status()
+        return resp.json()
+
+async def _measure(fn, url: str, n: int, concurrency: int) -> np.ndarray:
+    sem = asyncio.Semaphore(concurrency)
+    lat = []
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            await fn(url)
+            lat.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(one() for _ in range(n)))
+    return np.array(lat) * 1000.0
+
+async def main(n: int, concurrency: int):
+    server = await asyncio.start_server(_handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/query"
+    async with server:
+        await _measure(_per_call_client, url, 20, concurrency)  # warm-up
+        before = await _measure(_per_call_client, url, n, concurrency)
+        await _measure(get_json, url, 20, concurrency)
+        after = await _measure(get_json, url, n, concurrency)
+        await clients.aclose()
+    for name, lat in (("per-call client", before), ("pooled client", after)):
+        print(f"{name:16s} p50={np.percentile(lat, 50):7.3f} ms  p99={np.percentile(lat, 99):7.3f} ms  n={len(lat)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
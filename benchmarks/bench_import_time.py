@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Import-time budget for the service entry points, measured with `python -X importtime`.
+
+Each module is imported in a fresh interpreter (best of --runs). The check fails (exit
+status 1) if an import takes longer than --budget-ms or pulls in one of the heavy ML
+dependencies, which must only load on first use:
+
+    python benchmarks/bench_import_time.py --budget-ms 2000
+"""
+from __future__ import annotations
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+project_root = Path(__file__).resolve().parent.parent
+
+ENTRY_POINTS = ["apps.orchestrator.main", "backtester.engine", "libs.models.train_meta"]
+HEAVY = ("torch", "transformers", "lightgbm", "sklearn", "pandas", "onnxruntime")
+
+def measure(module: str) -> Tuple[float, List[str], List[Tuple[float, str]]]:
+    # -> (total ms, heavy top-level packages imported, slowest modules by cumulative ms)
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(project_root), os.environ.get("PYTHONPATH")]))}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=project_root, env=env, capture_output=True, text=True, check=True,
+    )
+    cumulative: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cum) / 1000.0
+    heavy = sorted({n.split(".")[0] for n in cumulative if n.split(".")[0] in HEAVY})
+    slowest = sorted(((ms, n) for n, ms in cumulative.items()), reverse=True)[:10]
+    return cumulative.get(module, 0.0), heavy, slowest
+
+def check(budget_ms: float, runs: int = 3, verbose: bool = True) -> List[str]:
+    failures = []
+    for module in ENTRY_POINTS:
+        results = [measure(module) for _ in range(runs)]
+        total, heavy, slowest = min(results)
+        if verbose:
+            print(f"{module:28} {total:8.0f} ms   heavy: {', '.join(heavy) or '-'}")
+            for ms, name in slowest[1:6]:
+                print(f"    {ms:8.0f} ms  {name}")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} at import time")
+        if total > budget_ms:
+            failures.append(f"{module} took {total:.0f} ms to import (budget {budget_ms:.0f} ms)")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=2000.0)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    failures = check(args.budget_ms, args.runs)
+    for f in failures:
+        print(f"FAIL: {f}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Meta-ensemble scoring: one predict call per row vs meta_ensemble_batch / meta_batch.
+
+The per-row path replays the old meta_ensemble: a feature dict, a nested list, a
+one-row predict_proba, a sha256 inputs hash and an EnsembleDecision per row. The batch
+forms make one predict call: meta_ensemble_batch on a list of EnsembleInput (decision
+models), meta_batch on that list's matrix (arrays) or on a ready feature matrix.
+
+The meta model is read from settings.meta_model_path when present; otherwise a
+stand-in with a fixed per-call cost (--call-us, LightGBM's predict_proba overhead is in
+the 100s of microseconds) and a small per-row cost is used:
+
+    python benchmarks/bench_meta.py --rows 1 100 10000
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import numpy as np
+from libs.ensemble import meta
+from libs.schemas.models import AgentResult, EnsembleDecision, EnsembleInput, ForecastResult
+from libs.utils.cache import hash_dict
+
+T0 = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+class StandInModel:
+    def __init__(self, call_us: float, row_us: float = 0.5):
+        self.call_s, self.row_s = call_us / 1e6, row_us / 1e6
+
+    def predict_proba(self, X):
+        until = time.perf_counter() + self.call_s + self.row_s * len(X)
+        while time.perf_counter() < until:
+            pass
+        p = 1 / (1 + np.exp(-np.asarray(X, dtype=np.float64).sum(axis=1)))
+        return np.column_stack([1 - p, p])
+
+def make_inputs(n: int):
+    rnd = np.random.default_rng(0)
+    out = []
+    for i in range(n):
+        agent = lambda: AgentResult(symbol=f"S{i}", as_of=T0, signal="hold",
+                                    score=float(rnd.uniform(-1, 1)), confidence=float(rnd.uniform(0, 1)))
+        out.append(EnsembleInput(
+            technical=agent(), fundamental=agent(), sentiment=agent(),
+            forecast=ForecastResult(symbol=f"S{i}", as_of=T0, horizon_days=5, p10=0, p50=0, p90=0,
+                                    exp_return=float(rnd.normal(0, 0.05)), direction="flat",
+                                    confidence=float(rnd.uniform(0, 1))),
+        ))
+    return out
+
+def per_row(inp: EnsembleInput) -> EnsembleDecision:
+    model, spec = meta._load_meta_if_available()
+    row = {
+        "t_score": inp.technical.score, "t_conf": inp.technical.confidence,
+        "f_score": inp.fundamental.score, "f_conf": inp.fundamental.confidence,
+        "s_score": inp.sentiment.score, "s_conf": inp.sentiment.confidence,
+        "m_exp": inp.forecast.exp_return, "m_conf": inp.forecast.confidence,
+    }
+    p = float(model.predict_proba([[row[k] for k in spec["feature_order"]]])[:, 1][0])
+    eps = 1e-6
+    unc = -(p * np.log(p + eps) + (1 - p) * np.log(1 - p + eps)) / np.log(2)
+    signal = "buy" if p > 0.55 else "sell" if p < 0.45 else "hold"
+    size = max(0.0, min(1.0, (p - 0.5) * 2.0)) if signal != "hold" else 0.0
+    return EnsembleDecision(
+        symbol=inp.technical.symbol, as_of=inp.technical.as_of, horizon_days=inp.forecast.horizon_days,
+        prob_up=p, uncertainty=float(unc), signal=signal, size=size, rationale="Meta-learner ensemble",
+        versions={"technical": inp.technical.agent_version, "fundamental": inp.fundamental.agent_version,
+                  "sentiment": inp.sentiment.agent_version, "forecast": inp.forecast.model_version,
+                  "ensemble": "meta_lgbm"},
+        inputs_hash=hash_dict({"t": row["t_score"], "tf": row["t_conf"], "f": row["f_score"], "ff": row["f_conf"],
+                               "s": row["s_score"], "sf": row["s_conf"], "m": row["m_exp"], "mc": row["m_conf"]}),
+    )
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main(rows, call_us: float):
+    if not meta.preload():
+        meta._cached_model, meta._cached_spec = StandInModel(call_us), {"feature_order": meta.FEATURE_ORDER}
+        print(f"stand-in model: {call_us:.0f} us per predict call")
+    for n in rows:
+        inputs = make_inputs(n)
+        X = meta.inputs_matrix(inputs)
+        repeat = 5 if n <= 100 else 1
+        t_row = timed(lambda: [per_row(i) for i in inputs], repeat)
+        t_models = timed(lambda: meta.meta_ensemble_batch(inputs), repeat)
+        t_arrays = timed(lambda: meta.meta_batch(meta.inputs_matrix(inputs)), repeat)
+        t_matrix = timed(lambda: meta.meta_batch(X), repeat)
+        print(f"{n:>6} rows  per-row {t_row * 1e3:9.2f} ms | batch: models {t_models * 1e3:8.2f} ms "
+              f"({t_row / t_models:5.1f}x)  arrays {t_arrays * 1e3:8.2f} ms ({t_row / t_arrays:6.1f}x)  "
+              f"matrix {t_matrix * 1e3:7.3f} ms ({t_row / t_matrix:7.1f}x)")
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, nargs="+", default=[1, 100, 10_000])
+    p.add_argument("--call-us", type=float, default=150.0)
+    a = p.parse_args()
+    main(a.rows, a.call_us)
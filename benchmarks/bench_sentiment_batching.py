@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Sentiment throughput under concurrent callers: per-call passes vs micro-batching.
+
+The stand-in model charges a fixed cost per call plus, for every padded sub-batch of
+`sentiment_model_batch` texts, a cost proportional to sub-batch size x longest text in
+it - the shape of a transformer forward pass - so both batching and length sorting
+show up in the numbers:
+
+    python benchmarks/bench_sentiment_batching.py --callers 200 --texts 3
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import numpy as np
+from libs.nlp.service import SentimentService
+
+CALL_S = 0.015
+TOKEN_S = 0.00002
+SUB_BATCH = 16
+
+class PaddedModel:
+    def __init__(self):
+        self.calls = 0
+
+    def score_texts(self, texts):
+        self.calls += 1
+        cost = CALL_S
+        for i in range(0, len(texts), SUB_BATCH):
+            sub = texts[i:i + SUB_BATCH]
+            cost += len(sub) * max(len(t.split()) for t in sub) * TOKEN_S
+        time.sleep(cost)
+        return [(0.0, 1.0)] * len(texts)
+
+async def run(callers: int, n_texts: int):
+    rnd = np.random.default_rng(0)
+    requests = [[" ".join(["word"] * int(rnd.integers(5, 120))) for _ in range(n_texts)] for _ in range(callers)]
+    configs = [
+        ("per call (before)", dict(max_batch=1)),
+        ("micro-batch, unsorted", dict(max_batch=64, max_wait_ms=10, sort=False)),
+        ("micro-batch, sorted", dict(max_batch=64, max_wait_ms=10)),
+    ]
+    print(f"callers={callers} texts/caller={n_texts}")
+    print(f"{'':22} {'total s':>8} {'texts/s':>8} {'passes':>7} {'mean batch':>11} {'wait p50 ms':>12} {'wait p99 ms':>12}")
+    for name, cfg in configs:
+        model = PaddedModel()
+        sort = cfg.pop("sort", True)
+        svc = SentimentService(factory=lambda: model, workers=1, max_queue=callers, timeout_s=600, **cfg)
+        if svc.batcher is not None and not sort:
+            svc.batcher.size_of = lambda t: 0
+        t0 = time.perf_counter()
+        await asyncio.gather(*(svc.score_texts(r) for r in requests))
+        elapsed = time.perf_counter() - t0
+        b = svc.stats().get("batching", {})
+        print(f"{name:22} {elapsed:8.2f} {callers * n_texts / elapsed:8.0f} {model.calls:7d} "
+              f"{b.get('mean_batch', n_texts):11.1f} {b.get('queue_wait_ms_p50', 0.0):12.1f} {b.get('queue_wait_ms_p99', 0.0):12.1f}")
+        svc.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=200)
+    parser.add_argument("--texts", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.callers, args.texts))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Event-loop lag while sentiment scoring runs: inline call vs the SentimentService pool.
+
+A ticker coroutine sleeps 5 ms in a loop and records how late it wakes up while a burst
+of news-scoring jobs runs. The model is a stand-in doing BLAS matmuls per text (which,
+like a torch forward pass, release the GIL), so no weights need to be downloaded:
+
+    python benchmarks/bench_sentiment_loop.py --jobs 16 --texts 20
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import numpy as np
+from libs.nlp.service import SentimentService
+
+class MatmulModel:
+    def __init__(self):
+        rnd = np.random.default_rng(0)
+        self.w = rnd.normal(size=(384, 384))
+
+    def score_texts(self, texts):
+        out = []
+        for t in texts:
+            h = np.full((64, 384), len(t) / 100.0)
+            for _ in range(6):
+                h = np.tanh(h @ self.w)
+            out.append((float(np.tanh(h.mean())), 0.9))
+        return out
+
+async def _lag_during(work, tick_s: float = 0.005):
+    lags, stop = [], asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(tick_s)
+            lags.append(time.perf_counter() - t0 - tick_s)
+
+    t = asyncio.create_task(ticker())
+    t0 = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await t
+    lags = np.array(lags) * 1000
+    return elapsed, np.percentile(lags, 50), np.percentile(lags, 99), lags.max()
+
+async def run(jobs: int, n_texts: int, workers: int):
+    texts = [f"headline number {i} about earnings" for i in range(n_texts)]
+    model = MatmulModel()
+
+    async def inline():
+        for _ in range(jobs):
+            model.score_texts(texts)
+            await asyncio.sleep(0)
+
+    def pooled(svc):
+        async def work():
+            await asyncio.gather(*(svc.score_texts(texts) for _ in range(jobs)))
+        return work
+
+    rows = [("inline (before)", inline)]
+    services = []
+    for kind in ("thread", "process"):
+        svc = SentimentService(factory=MatmulModel, workers=workers, executor=kind, max_queue=jobs, timeout_s=120)
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in svc.start()))
+        services.append(svc)
+        rows.append((f"{kind} pool x{workers}", pooled(svc)))
+
+    print(f"jobs={jobs} texts/job={n_texts}")
+    print(f"{'':18} {'total s':>8} {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag max ms':>11}")
+    for name, work in rows:
+        elapsed, p50, p99, mx = await _lag_during(work)
+        print(f"{name:18} {elapsed:8.2f} {p50:11.2f} {p99:11.2f} {mx:11.2f}")
+    for svc in services:
+        svc.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=16)
+    parser.add_argument("--texts", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(run(args.jobs, args.texts, args.workers))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Parameter sweep: serial per-run backtests vs the staged grid on a process pool.
+
+Synthetic symbols are staged the way `backtester.sweep.prepare` stages them (price and
+feature arrays as .npy files that workers memory-map). The serial baseline calls
+backtest_arrays once per (symbol, horizon, buy, sell), recomputing features and model
+scores every time; the sweep scores each symbol once and runs the grid at 1, 2, 4, ...
+workers:
+
+    python benchmarks/bench_sweep.py --symbols 64 --years 10 --max-workers 8
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from backtester import engine, sweep
+from benchmarks.bench_backtest import _sources
+
+def main(n_symbols: int, years: int, n_news: int, max_workers: int):
+    horizons = [5, 10, 20]
+    grid = sweep.threshold_grid([0.52, 0.55, 0.6], [0.4, 0.45, 0.48])
+    candles, fund, news = _sources(years * 252 + 80, n_news)
+    start, end = candles.ts_at(80), candles.ts_at(-1)
+    runs = n_symbols * len(horizons) * len(grid)
+    print(f"{n_symbols} symbols x {len(horizons)} horizons x {len(grid)} thresholds = {runs} runs, "
+          f"{years}y daily, {os.cpu_count()} cpus")
+
+    # serial baseline on a sample, extrapolated to the whole grid
+    sample = min(n_symbols, 2)
+    t0 = time.perf_counter()
+    for _ in range(sample):
+        for h in horizons:
+            for buy, sell in grid:
+                engine.backtest_arrays(candles, fund, news, start, end, h, buy=buy, sell=sell)
+    serial_s = (time.perf_counter() - t0) * n_symbols / sample
+    print(f"serial backtests   : {serial_s:8.2f} s (extrapolated from {sample} symbols)")
+
+    with tempfile.TemporaryDirectory(prefix="bench-sweep-") as tmp:
+        root = Path(tmp)
+        t0 = time.perf_counter()
+        idx = engine.rebalance_indices(candles, start, end)
+        X = engine.decision_features(candles, fund, news, idx)
+        ready = {}
+        for i in range(n_symbols):
+            sym = f"S{i:04d}"
+            sweep.stage(root, sym, candles, idx, X)
+            ready[sym] = engine.last_index(candles, end)
+        print(f"stage arrays       : {time.perf_counter() - t0:8.2f} s")
+
+        counts = sorted({min(2 ** i, max_workers) for i in range(max_workers.bit_length() + 1)})
+        base = None
+        for n in counts:
+            t0 = time.perf_counter()
+            rows = sweep.run_grid(root, ready, horizons, grid, workers=n)
+            wall = time.perf_counter() - t0
+            base = base or wall
+            print(f"sweep workers={n:>3}  : {wall:8.2f} s  speedup={base / wall:5.2f}x  "
+                  f"({serial_s / wall:.0f}x vs serial, {len(rows) / wall:,.0f} runs/s)")
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--symbols", type=int, default=64)
+    p.add_argument("--years", type=int, default=10)
+    p.add_argument("--news", type=int, default=5000)
+    p.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    a = p.parse_args()
+    main(a.symbols, a.years, a.news, a.max_workers)
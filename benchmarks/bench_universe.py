@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Multi-symbol training data generation: wall time vs process-pool size.
+
+Each worker's sources are in-memory fakes: --latency-ms is slept per symbol to stand in
+for the provider fetches, then the dataset is built for real from synthetic candles and
+news. Every run starts from an empty partials directory, then one more run at the
+largest pool size shows the resume path:
+
+    python benchmarks/bench_universe.py --symbols 32 --years 10 --latency-ms 200
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import functools
+import os
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+T0 = datetime(2010, 1, 4, tzinfo=timezone.utc)
+
+def _sources(symbol: str, n_bars: int, n_news: int):
+    from libs.schemas.frame import CandleFrame, to_ns
+    from libs.schemas.models import FundamentalsSnapshot, NewsItem
+
+    rnd = np.random.default_rng(zlib.crc32(symbol.encode()))
+    close = 50 * np.cumprod(1 + rnd.normal(0, 0.015, n_bars))
+    ts = np.array([to_ns(T0 + timedelta(days=i * 7 // 5)) for i in range(n_bars)])
+    candles = CandleFrame(symbol, ts, close, close * 1.01, close * 0.99, close, np.full(n_bars, 1e6))
+    span = int((ts[-1] - ts[0]) // 10**9)
+    news = [
+        NewsItem(symbol=symbol, title=f"n{i}", published_at=T0 + timedelta(seconds=int(rnd.integers(0, span))),
+                 sentiment_score=float(rnd.uniform(-1, 1)))
+        for i in range(n_news)
+    ]
+    fund = FundamentalsSnapshot(symbol=symbol, as_of=T0, pe=15.0, roe=0.2, debt_to_equity=1.0)
+    return candles, fund, news
+
+def fake_sources(n_bars: int, n_news: int, latency_ms: float) -> None:
+    # worker initializer: replace the provider fetches in this process
+    from libs.data.news_archive import NewsHistory
+    from libs.models import dataset
+
+    async def load_sources(symbol, start, end):
+        await asyncio.sleep(latency_ms / 1000)
+        candles, fund, news = _sources(symbol, n_bars, n_news)
+        return candles, fund, NewsHistory(symbol, sorted(news, key=lambda n: n.published_at))
+
+    dataset.load_sources = load_sources
+
+def main(n_symbols: int, years: int, n_news: int, latency_ms: float, max_workers: int):
+    from libs.models.universe import generate_universe
+    from libs.utils import limits
+
+    # the fake sources make no provider calls: lift the in-flight caps that bound the pool
+    for lim in (limits.alpha_limiter, limits.news_limiter, limits.fmp_limiter):
+        lim.max_concurrency = max(lim.max_concurrency, max_workers)
+    symbols = [f"S{i:03d}" for i in range(n_symbols)]
+    init = functools.partial(fake_sources, years * 252, n_news, latency_ms)
+    start, end = datetime(2010, 1, 1, tzinfo=timezone.utc), datetime(2020, 1, 1, tzinfo=timezone.utc)
+    counts = sorted({min(2 ** i, max_workers) for i in range(max_workers.bit_length() + 1)})
+    print(f"{n_symbols} symbols x {years}y, {n_news} news, {latency_ms:.0f} ms fetch; {os.cpu_count()} CPUs")
+    base = None
+    with tempfile.TemporaryDirectory() as root:
+        for n in counts:
+            out = os.path.join(root, f"w{n}")
+            merged, report = generate_universe(symbols, start, end, 5, out, workers=n, worker_init=init, log=lambda _: None)
+            base = base or report["wall_s"]
+            print(f"workers={n:>3}  wall={report['wall_s']:7.2f}s  symbol-time={report['symbol_s']:7.2f}s  "
+                  f"speedup vs 1={base / report['wall_s']:5.2f}x  rows={report['rows']}")
+        t0 = time.perf_counter()
+        _, report = generate_universe(symbols, start, end, 5, out, workers=counts[-1], worker_init=init, log=lambda _: None)
+        print(f"resume (all partials present): {time.perf_counter() - t0:.2f}s, resumed={report['resumed']}")
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--symbols", type=int, default=32)
+    p.add_argument("--years", type=int, default=10)
+    p.add_argument("--news", type=int, default=2000)
+    p.add_argument("--latency-ms", type=float, default=200.0)
+    p.add_argument("--max-workers", type=int, default=max(4, os.cpu_count() or 1))
+    a = p.parse_args()
+    main(a.symbols, a.years, a.news, a.latency_ms, a.max_workers)
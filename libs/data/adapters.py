@@ -1,66 +1,260 @@
 from __future__ import annotations
-from typing import List
+import time
+import asyncio
+from typing import Dict, List, Sequence, Tuple, Union
 from datetime import datetime
-from libs.schemas.models import Candle, FundamentalsSnapshot, NewsItem
+from libs.schemas.models import FundamentalsSnapshot, NewsItem
+from libs.schemas.frame import COLUMNS, CandleFrame, to_ns, from_ns
+from libs.schemas.fundamentals import FundamentalsHistory
 from libs.utils.config import settings
-from libs.data.alpha_vantage import get_timeseries_alpha
-from libs.data.news_api import get_news_newsapi
-from libs.nlp.finbert import get_finbert
-from libs.data.fmp import get_fundamentals_snapshot
+from libs.data.alpha_vantage import update_daily_store, update_intraday_store
+from libs.data.intraday import INTERVAL_NS, INTRADAY, months_to_fetch, resample
+from libs.data.store import get_store
+from libs.data.news_api import PAGE_SIZE as NEWS_PAGE_SIZE, get_news_newsapi
+from libs.data.news_archive import NewsHistory, get_news_archive
+from libs.nlp.service import SentimentUnavailable, get_sentiment_service
+from libs.data.fmp import get_fundamentals_history as get_fundamentals_history_fmp
 from libs.utils.redis_cache import RedisCache
+from libs.utils.singleflight import SingleFlight
 
 redis = RedisCache()
+# Concurrent identical provider requests share one fetch
+flights = SingleFlight()
 
-async def get_timeseries(symbol: str, start: datetime, end: datetime, interval: str = "1d") -> List[Candle]:
-    if interval != "1d":
-        raise NotImplementedError("Daily only in this example")
-    
-    cache_key = RedisCache.make_key("ts", {"symbol": symbol, "start": start.isoformat(), "end": end.isoformat(), "interval": interval})
+# Time series are cached as one canonical history per symbol/interval together with the
+# [start, end] range it covers. The covered end is the last bar read, not the requested
+# end: a bar can be published (or revised) after a request for its date, so requests
+# past the last bar re-read from it and extend the cached entry. Reads that bring
+# nothing new count as hits.
+ts_cache_stats: Dict[str, int] = {"hit": 0, "miss": 0, "extend": 0}
+
+async def get_timeseries(symbol: str, start: datetime, end: datetime, interval: str = "1d") -> CandleFrame:
+    if interval not in INTERVAL_NS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    key = f"ts:{symbol}:{interval}:{start.isoformat()}:{end.isoformat()}"
+    if interval in INTRADAY:
+        return await flights.do(key, lambda: _get_intraday(symbol, start, end, interval))
+    return await flights.do(key, lambda: _get_timeseries(symbol, start, end, interval))
+
+async def _get_timeseries(symbol: str, start: datetime, end: datetime, interval: str) -> CandleFrame:
+    cache_key = RedisCache.make_key("ts", {"symbol": symbol, "interval": interval})
+    lo, hi = to_ns(start), to_ns(end)
     cached = await redis.get(cache_key)
+    if cached and cached["start"] <= lo and hi <= cached["end"]:
+        ts_cache_stats["hit"] += 1
+        return CandleFrame.from_dict(cached["frame"]).between(start, end)
+
     if cached:
-        # reconstruct candles
-        return [Candle(**c) for c in cached["candles"]]
-    
-    candles = await get_timeseries_alpha(symbol, start, end)
-    await redis.set(cache_key, {"candles": [c.dict() for c in candles]})
-    return candles
+        frame = CandleFrame.from_dict(cached["frame"])
+        changed = False
+        if lo < cached["start"]:
+            frame = (await _read_daily_history(symbol, start, from_ns(cached["start"]))).merge(frame)
+            changed = True
+        if hi > cached["end"]:
+            tail = await _read_daily_history(symbol, from_ns(cached["end"]), end)
+            changed = changed or _adds_bars(frame, tail)
+            frame = frame.merge(tail)
+        # the entry keeps the union of what it covered and what was just read
+        lo, hi = min(lo, cached["start"]), max(hi, cached["end"])
+        ts_cache_stats["extend" if changed else "hit"] += 1
+    else:
+        ts_cache_stats["miss"] += 1
+        frame = await _read_daily_history(symbol, start, end)
+        changed = True
+
+    # A live request only moves the end forward by a few seconds; don't rewrite the
+    # entry unless the read actually brought in new or revised bars.
+    if changed:
+        covered = min(hi, int(frame.ts[-1])) if len(frame) else lo
+        await redis.set(cache_key, {"start": lo, "end": covered, "frame": frame.to_dict(arrays=True)}, ttl=settings.ts_cache_ttl_s)
+    return frame.between(start, end)
+
+def _adds_bars(frame: CandleFrame, tail: CandleFrame) -> bool:
+    # tail re-reads from frame's last bar: anything past it, or a revision of it
+    if not len(tail):
+        return False
+    if not len(frame) or len(tail) > 1 or tail.ts[0] != frame.ts[-1]:
+        return True
+    return any(getattr(tail, c)[0] != getattr(frame, c)[-1] for c in COLUMNS)
+
+async def _read_daily_history(symbol: str, start: datetime, end: datetime) -> CandleFrame:
+    # Serve ranges from the local store; go to the network only when the symbol has never
+    # been loaded, or the request reaches past the stored bars and the last refresh is old.
+    store = get_store()
+    meta = store.meta(symbol)
+    if (
+        meta is None
+        or not meta.get("full")
+        or meta.get("last_ts") is None  # the last full fetch came back empty
+        or (to_ns(end) > meta["last_ts"] and time.time() - meta["fetched_at"] > settings.ohlcv_refresh_s)
+    ):
+        # one refresh per symbol no matter how many ranges are being requested
+        await flights.do(f"ohlcv:{symbol}", lambda: update_daily_store(symbol, store))
+    return store.read(symbol, start, end)
+
+# Intraday bars skip Redis (a month of 1min bars is ~20k rows): the 1min history is read
+# from the memory-mapped store, topped up a month at a time, and resampled to the
+# requested interval on the fly.
+
+async def _get_intraday(symbol: str, start: datetime, end: datetime, interval: str) -> CandleFrame:
+    store = get_store()
+    months = months_to_fetch(store.meta(symbol, "1min"), start, end)
+    if months:
+        await flights.do(
+            f"ohlcv:{symbol}:1min:{months[0]}:{months[-1]}", lambda: update_intraday_store(symbol, months, store),
+        )
+    bars = store.read(symbol, start, end, "1min")
+    if bars is None:
+        return CandleFrame.empty(symbol, interval)
+    # bars are labelled by their bucket start: a bucket begun before `start` is dropped,
+    # and the one holding `end` has only the minutes up to `end`, as it stood then
+    return resample(bars, interval, settings.market_tz).between(start, end)
+
+# Fundamentals are cached as one point-in-time history per symbol (every quarterly
+# filing, sorted by filing date); any as_of is a binary search into it, so historical
+# requests see only what had been filed by then.
 
 async def get_fundamentals(symbol: str, as_of: datetime) -> FundamentalsSnapshot:
+    return (await get_fundamentals_history(symbol)).at(as_of)
+
+async def get_fundamentals_history(symbol: str) -> FundamentalsHistory:
     if not settings.fmp_api_key:
-        # fallback minimal snapshot
-        return FundamentalsSnapshot(symbol=symbol, as_of=as_of, pe=None, roe=None, debt_to_equity=None)
-    
-    cache_key = RedisCache.make_key("fund", {"symbol": symbol})
+        # fallback: no filings, every as_of gets an empty snapshot
+        return FundamentalsHistory.empty(symbol)
+    cache_key = RedisCache.make_key("fundh", {"symbol": symbol})
+    return await flights.do(cache_key, lambda: _get_fundamentals_history(symbol, cache_key))
+
+async def _get_fundamentals_history(symbol: str, cache_key: str) -> FundamentalsHistory:
     cached = await redis.get(cache_key)
     if cached:
-        return FundamentalsSnapshot(**cached)
-    
-    snap = await get_fundamentals_snapshot(symbol)
-    fundamentals = FundamentalsSnapshot(
-        symbol=symbol,
-        as_of=snap["as_of"],
-        pe=snap["pe"],
-        roe=snap["roe"],
-        debt_to_equity=snap["debt_to_equity"],
-        profit_margin=snap["profit_margin"],
-        growth_rev_yoy=snap["growth_rev_yoy"],
-        source="fmp",
-        filing_recency_days=snap["filing_recency_days"]
-    )
-    await redis.set(cache_key, fundamentals.dict())
-    return fundamentals
+        return FundamentalsHistory.from_dict(cached)
+    history = await get_fundamentals_history_fmp(symbol)
+    await redis.set(cache_key, history.to_dict(arrays=True), ttl=settings.fund_history_ttl_s)
+    return history
+
+# News is served from the local archive (libs.data.news_archive). Only the part of a
+# window the archive has not covered yet goes to NewsAPI: a start before the covered
+# range, or an end past it once the last fetch is older than news_refresh_s. New
+# articles are scored, merged in and written back.
 
 async def get_news(symbol: str, start: datetime, end: datetime) -> list[NewsItem]:
     if not settings.news_api_key:
         return []
-    
-    cache_key = RedisCache.make_key("news", {"symbol": symbol, "start": start.isoformat(), "end": end.isoformat()})
-    cached = await redis.get(cache_key)
-    if cached:
-        return [NewsItem(**n) for n in cached["items"]]
-    
-    items = await get_news_newsapi(symbol, start, end)
-    finbert = get_finbert()
-    items = finbert.score_articles(items)
-    await redis.set(cache_key, {"items": [i.dict() for i in items]})
-    return items
\ No newline at end of file
+    return (await get_news_history(symbol, start, end)).window(start, end)
+
+async def get_news_history(symbol: str, start: datetime, end: datetime) -> NewsHistory:
+    # The archived history, covering at least [start, end]
+    if not settings.news_api_key:
+        return NewsHistory.empty(symbol)
+    history = (await _news_histories([symbol], start, end))[symbol]
+    if isinstance(history, BaseException):
+        raise history
+    return history
+
+def _news_gaps(meta: Dict | None, lo: int, hi: int) -> List[Tuple[int, int]]:
+    if meta is None:
+        return [(lo, hi)]
+    gaps = []
+    if lo < meta["start"]:
+        gaps.append((lo, meta["start"]))
+    if hi > meta["end"] and time.time() - meta["fetched_at"] > settings.news_refresh_s:
+        gaps.append((meta["end"], hi))
+    return gaps
+
+async def _fetch_news_range(symbol: str, lo: int, hi: int) -> Tuple[List[NewsItem], int]:
+    # A query returns one page of the newest articles; page back from the oldest one
+    # returned while pages come back full (at most news_max_pages).
+    # -> (articles, start of the range now covered): lo, or the oldest article received
+    # when the page limit cut the range short
+    out: List[NewsItem] = []
+    for _ in range(settings.news_max_pages):
+        page = await get_news_newsapi(symbol, from_ns(lo), from_ns(hi))
+        out.extend(page)
+        if len(page) < NEWS_PAGE_SIZE:
+            return out, lo
+        hi = min(to_ns(n.published_at) for n in page)
+    return out, hi
+
+async def _fetch_news_gaps(symbol: str, gaps: List[Tuple[int, int]]) -> Tuple[List[NewsItem], List[int]]:
+    parts = await asyncio.gather(*(_fetch_news_range(symbol, lo, hi) for lo, hi in gaps))
+    return [n for items, _ in parts for n in items], [got for _, got in parts]
+
+def _covered(meta: Dict | None, gaps: List[Tuple[int, int]], got: List[int]) -> Tuple[int, int]:
+    # The archive's range after fetching `gaps` (got: covered start of each). It stays
+    # contiguous, so it grows only over fetched ranges that touch it: a tail gap cut
+    # short by the page limit leaves the end where it was.
+    covered = None if meta is None else (meta["start"], meta["end"])
+    for (_, g_hi), g_lo in zip(gaps, got):
+        if covered is None:
+            covered = (g_lo, g_hi)
+        elif g_lo <= covered[1] and g_hi >= covered[0]:
+            covered = (min(covered[0], g_lo), max(covered[1], g_hi))
+    return covered
+
+async def _news_histories(
+    symbols: Sequence[str], start: datetime, end: datetime,
+) -> Dict[str, Union[NewsHistory, Exception]]:
+    # A symbol whose fetch failed maps to its exception, not to the (incomplete) archive
+    archive = get_news_archive()
+    lo, hi = to_ns(start), to_ns(end)
+    gaps = {s: _news_gaps(archive.meta(s), lo, hi) for s in symbols}
+    stale = [s for s in symbols if gaps[s]]
+    fetched = await asyncio.gather(
+        *(flights.do(f"news:{s}:{gaps[s]}", lambda s=s: _fetch_news_gaps(s, gaps[s])) for s in stale),
+        return_exceptions=True,
+    )
+    failed = {s: res for s, res in zip(stale, fetched) if isinstance(res, BaseException)}
+    fresh = {s: res for s, res in zip(stale, fetched) if s not in failed}
+    # stored articles that missed scoring before are retried (as copies: scoring sets
+    # the score in place, and the archived history must see them as new)
+    for s, (items, got) in fresh.items():
+        fresh[s] = (items + [n.model_copy() for n in archive.load(s).unscored()], got)
+    try:
+        # one FinBERT pass over the new articles of every symbol
+        await get_sentiment_service().score_articles([n for items, _ in fresh.values() for n in items])
+    except SentimentUnavailable:
+        pass  # archived unscored, retried on the next refresh
+    for s, (items, got) in fresh.items():
+        # load, merge and write without awaiting, so concurrent refreshes can't interleave
+        archive.write(archive.load(s).merge(items), *_covered(archive.meta(s), gaps[s], got))
+    return {s: failed.get(s) or archive.load(s) for s in symbols}
+
+# Batch variants for multi-symbol requests: one MGET for every cached key, concurrent
+# provider calls for the misses (the provider limiters bound them) and one MSET for the
+# results. News goes through the archive, with one FinBERT pass for all symbols. A
+# symbol whose provider call failed maps to the exception, so callers can report it
+# rather than take it for a symbol without filings or articles.
+
+async def warm_timeseries(symbols: Sequence[str], interval: str = "1d") -> None:
+    # Pull the canonical histories into the L1 so per-symbol get_timeseries calls don't
+    # each pay a Redis round trip
+    await redis.mget([RedisCache.make_key("ts", {"symbol": s, "interval": interval}) for s in symbols])
+
+async def get_fundamentals_many(
+    symbols: Sequence[str], as_of: datetime,
+) -> Dict[str, Union[FundamentalsSnapshot, Exception]]:
+    histories = await get_fundamentals_history_many(symbols)
+    return {s: h if isinstance(h, BaseException) else h.at(as_of) for s, h in histories.items()}
+
+async def get_fundamentals_history_many(symbols: Sequence[str]) -> Dict[str, Union[FundamentalsHistory, Exception]]:
+    if not settings.fmp_api_key:
+        return {s: FundamentalsHistory.empty(s) for s in symbols}
+    keys = {s: RedisCache.make_key("fundh", {"symbol": s}) for s in symbols}
+    cached = await redis.mget(list(keys.values()))
+    out = {s: FundamentalsHistory.from_dict(c) for s, c in zip(keys, cached) if c}
+    missing = [s for s in keys if s not in out]
+    fetched = await asyncio.gather(
+        *(flights.do(keys[s], lambda s=s: get_fundamentals_history_fmp(s)) for s in missing), return_exceptions=True
+    )
+    fresh = {s: h for s, h in zip(missing, fetched) if not isinstance(h, BaseException)}
+    await redis.mset({keys[s]: h.to_dict(arrays=True) for s, h in fresh.items()}, ttl=settings.fund_history_ttl_s)
+    out.update(zip(missing, fetched))
+    return out
+
+async def get_news_many(
+    symbols: Sequence[str], start: datetime, end: datetime,
+) -> Dict[str, Union[List[NewsItem], Exception]]:
+    if not settings.news_api_key:
+        return {s: [] for s in symbols}
+    histories = await _news_histories(symbols, start, end)
+    return {s: h if isinstance(h, BaseException) else h.window(start, end) for s, h in histories.items()}
@@ -1,24 +1,35 @@
 from __future__ import annotations
-from typing import List
+import asyncio
+import io
+import json
 from datetime import datetime
-import pandas as pd
-from libs.schemas.models import Candle
+from typing import TYPE_CHECKING, Sequence
+from libs.schemas.frame import CandleFrame
+from libs.data.intraday import concat_frames, merge_into_store, read_bars_csv
+from libs.data.store import OHLCVStore
 from libs.utils.config import settings
-from libs.utils.http import get_json
-from libs.utils.limits import alpha_semaphore
+from libs.utils.http import get_json, get_text
+from libs.utils.limits import alpha_limiter
 
-async def fetch_alpha_vantage(symbol: str) -> pd.DataFrame:
+if TYPE_CHECKING:
+    import pandas as pd
+
+async def fetch_alpha_vantage(symbol: str, outputsize: str = "full") -> pd.DataFrame:
+    # "full" is the whole 20+ year history, "compact" only the latest 100 bars
     params = {
         "function": "TIME_SERIES_DAILY_ADJUSTED",
         "symbol": symbol,
         "apikey": settings.alpha_vantage_key,
-        "outputsize": "full"
+        "outputsize": outputsize
     }
-    async with alpha_semaphore:
-        data = await get_json(settings.alphavantage_base, params=params)
+    data = await get_json(settings.alphavantage_base, params=params, limiter=alpha_limiter)
     key = "Time Series (Daily)"
+    if key not in data and ("Note" in data or "Information" in data):
+        # Alpha Vantage reports throttling as a 200 with a "Note"
+        alpha_limiter.on_throttled()
     if key not in data:
         raise ValueError(f"Alpha Vantage error or limit: {data}")
+    import pandas as pd  # deferred: ~0.35 s of server start-up for the refresh path only
     df = pd.DataFrame.from_dict(data[key], orient="index")
     df.index = pd.to_datetime(df.index, utc=True)
     df = df.sort_index()
@@ -31,20 +42,54 @@ async def fetch_alpha_vantage(symbol: str) -> pd.DataFrame:
     })[["open", "high", "low", "close", "volume"]].astype(float)
     return df
 
-async def get_timeseries_alpha(symbol: str, start: datetime, end: datetime) -> List[Candle]:
+async def get_timeseries_alpha(symbol: str, start: datetime, end: datetime) -> CandleFrame:
     df = await fetch_alpha_vantage(symbol)
-    df = df.loc[(df.index >= pd.Timestamp(start, tz="UTC")) & (df.index <= pd.Timestamp(end, tz="UTC"))]
-    candles: List[Candle] = []
-    for ts, row in df.iterrows():
-        candles.append(Candle(
-            symbol=symbol,
-            ts=ts.to_pydatetime(),
-            open=float(row["open"]),
-            high=float(row["high"]),
-            low=float(row["low"]),
-            close=float(row["close"]),
-            volume=float(row["volume"]),
-            interval="1d",
-            source="alpha_vantage"
-        ))
-    return candles
\ No newline at end of file
+    return CandleFrame.from_pandas(df, symbol, interval="1d", source="alpha_vantage").between(start, end)
+
+async def update_daily_store(symbol: str, store: OHLCVStore) -> CandleFrame:
+    # First call for a symbol loads the full history; later calls top it up with the
+    # compact (last 100 bars) endpoint, falling back to a full refetch if the stored
+    # history ends before the compact window starts.
+    meta = store.meta(symbol)
+    if meta is not None and meta.get("full") and meta.get("last_ts") is not None:
+        df = await fetch_alpha_vantage(symbol, outputsize="compact")
+        delta = CandleFrame.from_pandas(df, symbol, interval="1d", source="alpha_vantage")
+        if not len(delta) or delta.ts[0] <= meta["last_ts"]:
+            return store.append(delta)
+    df = await fetch_alpha_vantage(symbol, outputsize="full")
+    frame = CandleFrame.from_pandas(df, symbol, interval="1d", source="alpha_vantage")
+    store.write(frame, full=True)
+    return frame
+
+# Intraday: one request per calendar month of bars. The CSV form is parsed straight into
+# arrays (timestamps are exchange local time).
+_AV_INTERVALS = {"1min": "1min", "5min": "5min", "15min": "15min", "1h": "60min"}
+
+async def fetch_intraday_month(symbol: str, month: str, interval: str = "1min") -> CandleFrame:
+    # month: "YYYY-MM"
+    params = {
+        "function": "TIME_SERIES_INTRADAY",
+        "symbol": symbol,
+        "interval": _AV_INTERVALS[interval],
+        "month": month,
+        "outputsize": "full",
+        "extended_hours": "true" if settings.intraday_extended_hours else "false",
+        "datatype": "csv",
+        "apikey": settings.alpha_vantage_key,
+    }
+    text = await get_text(settings.alphavantage_base, params=params, limiter=alpha_limiter)
+    if text.lstrip().startswith("{"):
+        # errors and throttling notes come back as JSON even in CSV mode
+        data = json.loads(text)
+        if "Note" in data or "Information" in data:
+            alpha_limiter.on_throttled()
+        raise ValueError(f"Alpha Vantage error or limit: {data}")
+    chunks = list(read_bars_csv(io.StringIO(text), symbol, interval, tz=settings.market_tz, source="alpha_vantage"))
+    return concat_frames(chunks) if chunks else CandleFrame.empty(symbol, interval)
+
+async def update_intraday_store(symbol: str, months: Sequence[str], store: OHLCVStore) -> CandleFrame:
+    # Fetch the given months of 1min bars (queued on the provider limiter) and merge them in
+    frames = await asyncio.gather(*(fetch_intraday_month(symbol, m) for m in months))
+    fetched = [f for f in frames if len(f)]
+    new = concat_frames(fetched) if fetched else CandleFrame.empty(symbol, "1min")
+    return merge_into_store(store, new, months)
@@ -1,9 +1,11 @@
 from __future__ import annotations
-from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List
 from libs.utils.config import settings
 from libs.utils.http import get_json
-from libs.utils.limits import fmp_semaphore
+from libs.utils.limits import fmp_limiter
+from libs.schemas.fundamentals import FundamentalsHistory
 
 # Docs: https://site.financialmodelingprep.com/developer/docs
 
@@ -13,8 +15,7 @@ def _with_key(params: dict[str, Any]) -> dict[str, Any]:
     return p
 
 async def _get(url: str, params: dict[str, Any]):
-    async with fmp_semaphore:
-        return await get_json(url, params=params)
+    return await get_json(url, params=params, limiter=fmp_limiter)
 
 async def get_company_profile(symbol: str) -> Optional[dict]:
     url = f"{settings.fmp_base}/profile/{symbol}"
@@ -54,31 +55,65 @@ def _parse_date(s: str | None) -> datetime | None:
     except Exception:
         return None
 
-async def get_fundamentals_snapshot(symbol: str) -> dict:
-    profile = await get_company_profile(symbol) or {}
-    metrics = await get_key_metrics(symbol) or {}
-    income = await get_income_statement(symbol) or {}
-    balance = await get_balance_sheet(symbol) or {}
+# Quarterly history for point-in-time lookups. Each statement is placed at the date it
+# was filed; FMP's "fillingDate" (sic), else "acceptedDate", else the period end plus
+# the 10-Q deadline. TTM figures use the four latest quarters, all filed by then.
+_FILING_LAG = timedelta(days=45)
 
-    # Recency: prefer incomeStatement date
-    as_of = _parse_date(income.get("date")) or _parse_date(profile.get("ipoDate")) or datetime.now(timezone.utc)
-    recency_days = int((datetime.now(timezone.utc) - as_of).days) if as_of else None
+async def _get_quarterly(path: str, symbol: str, limit: int) -> List[dict]:
+    data = await _get(f"{settings.fmp_base}/{path}/{symbol}", _with_key({"period": "quarter", "limit": limit}))
+    return data if isinstance(data, list) else []
 
-    # PE from profile or metrics
-    pe = profile.get("pe") or metrics.get("peRatio") or None
-    roe = metrics.get("returnOnEquityTTM") or metrics.get("roe") or None
-    d2e = metrics.get("debtToEquity") or None
+def _num(d: dict, *keys: str) -> float | None:
+    for k in keys:
+        v = d.get(k)
+        if v is not None:
+            try:
+                return float(v)
+            except (TypeError, ValueError):
+                pass
+    return None
+
+def _ratio(a: float | None, b: float | None) -> float | None:
+    return a / b if a is not None and b else None
+
+def _ttm(last4: List[dict], key: str) -> float | None:
+    # unknown unless all four quarters report it: a missing quarter is not a zero
+    values = [_num(q, key) for q in last4]
+    return sum(values) if len(values) == 4 and None not in values else None
 
-    margin = (income.get("netIncome") / income.get("revenue")) if income.get("revenue") else None
-    growth_rev_yoy = metrics.get("revenueGrowth") if metrics.get("revenueGrowth") is not None else None
+def history_from_statements(symbol: str, income: List[dict], balance: List[dict], metrics: List[dict]) -> FundamentalsHistory:
+    by_period = lambda rows: {r["date"]: r for r in rows if r.get("date")}
+    bal, met = by_period(balance), by_period(metrics)
+    quarters = sorted(by_period(income).items())
+    rows = []
+    for i, (date, inc) in enumerate(quarters):
+        period = _parse_date(date)
+        if period is None:
+            continue
+        filed = _parse_date(inc.get("fillingDate")) or _parse_date((inc.get("acceptedDate") or "")[:10]) or period + _FILING_LAG
+        last4 = [q for _, q in quarters[max(0, i - 3):i + 1]]
+        revenue_ttm, net_income_ttm, eps_ttm = (_ttm(last4, k) for k in ("revenue", "netIncome", "eps"))
+        b, m = bal.get(date, {}), met.get(date, {})
+        growth = _ratio(_num(inc, "revenue"), _num(quarters[i - 4][1], "revenue")) if i >= 4 else None
+        rows.append({
+            "filed": max(filed, period),
+            "period": period,
+            "pe": _ratio(_num(m, "marketCap"), net_income_ttm) if net_income_ttm and net_income_ttm > 0 else None,
+            "roe": _ratio(net_income_ttm, _num(b, "totalStockholdersEquity")),
+            "debt_to_equity": _num(m, "debtToEquity") or _ratio(_num(b, "totalDebt"), _num(b, "totalStockholdersEquity")),
+            "revenue_ttm": revenue_ttm,
+            "eps_ttm": eps_ttm,
+            "profit_margin": _ratio(_num(inc, "netIncome"), _num(inc, "revenue")),
+            "growth_rev_yoy": growth - 1.0 if growth is not None else None,
+        })
+    return FundamentalsHistory.from_rows(symbol, rows)
 
-    return {
-        "symbol": symbol,
-        "as_of": as_of,
-        "pe": float(pe) if pe is not None else None,
-        "roe": float(roe) if roe is not None else None,
-        "debt_to_equity": float(d2e) if d2e is not None else None,
-        "profit_margin": float(margin) if margin is not None else None,
-        "growth_rev_yoy": float(growth_rev_yoy) if growth_rev_yoy is not None else None,
-        "filing_recency_days": recency_days
-    }
\ No newline at end of file
+async def get_fundamentals_history(symbol: str, quarters: int | None = None) -> FundamentalsHistory:
+    limit = quarters or settings.fmp_history_quarters
+    income, balance, metrics = await asyncio.gather(
+        _get_quarterly("income-statement", symbol, limit),
+        _get_quarterly("balance-sheet-statement", symbol, limit),
+        _get_quarterly("key-metrics", symbol, limit),
+    )
+    return history_from_statements(symbol, income, balance, metrics)
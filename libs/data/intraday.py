@@ -0,0 +1,182 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, Iterator, List, Optional, Sequence, Union
+from zoneinfo import ZoneInfo
+import numpy as np
+from libs.data.store import OHLCVStore
+from libs.schemas.frame import COLUMNS, CandleFrame, from_ns, to_ns
+from libs.utils.config import settings
+
+# Intraday bars as arrays.
+#
+# Ingestion never builds per-bar Python objects: CSV feeds (Alpha Vantage's intraday CSV
+# or a local file) are parsed a chunk at a time straight into CandleFrame columns, and
+# the 1min history lives in the memory-mapped OHLCVStore. Coarser bars are resampled
+# from finer ones with segment reductions over the sorted timestamps: first open, max
+# high, min low, last close and summed volume per bucket. Buckets are labelled by their
+# start. 1d buckets follow the exchange's local date (settings.market_tz) and are
+# labelled midnight UTC of that date, like the daily store.
+
+INTERVAL_NS = {
+    "1min": 60 * 10**9,
+    "5min": 5 * 60 * 10**9,
+    "15min": 15 * 60 * 10**9,
+    "1h": 3600 * 10**9,
+    "1d": 86400 * 10**9,
+}
+INTRADAY = ("1min", "5min", "15min", "1h")
+_HOUR_NS = INTERVAL_NS["1h"]
+_DAY_NS = INTERVAL_NS["1d"]
+
+@lru_cache(maxsize=None)
+def _zone(tz: str) -> ZoneInfo:
+    return ZoneInfo(tz)
+
+def _utc_offsets(ts: np.ndarray, tz: str) -> np.ndarray:
+    # UTC offset (ns) at each timestamp; DST changes fall on whole UTC hours, so one
+    # zone lookup per distinct hour is exact (for zones whose offsets are whole hours)
+    hours, inv = np.unique(ts // _HOUR_NS, return_inverse=True)
+    zone = _zone(tz)
+    off = np.array([datetime.fromtimestamp(int(h) * 3600, tz=zone).utcoffset().total_seconds() for h in hours.tolist()])
+    return (off * 1e9).astype(np.int64)[inv]
+
+def bucket_start(ts: np.ndarray, interval: str, tz: Optional[str] = None) -> np.ndarray:
+    # Start of each timestamp's bucket. Sub-daily buckets are aligned in UTC, which is
+    # also the local alignment for whole-hour zone offsets.
+    ts = np.asarray(ts, dtype=np.int64)
+    if interval != "1d":
+        return ts - ts % INTERVAL_NS[interval]
+    local = ts + _utc_offsets(ts, tz or settings.market_tz) if len(ts) else ts
+    return local - local % _DAY_NS
+
+def resample(frame: CandleFrame, interval: str, tz: Optional[str] = None) -> CandleFrame:
+    if INTERVAL_NS[interval] < INTERVAL_NS[frame.interval]:
+        raise ValueError(f"Cannot resample {frame.interval} bars to {interval}")
+    if interval == frame.interval:
+        return frame
+    if not len(frame):
+        return CandleFrame.empty(frame.symbol, interval, frame.source)
+    b = bucket_start(frame.ts, interval, tz)
+    starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    ends = np.append(starts[1:], len(b)) - 1
+    return CandleFrame(
+        frame.symbol, b[starts], frame.open[starts],
+        np.maximum.reduceat(frame.high, starts), np.minimum.reduceat(frame.low, starts),
+        frame.close[ends], np.add.reduceat(frame.volume, starts),
+        interval=interval, source=frame.source,
+    )
+
+class Resampler:
+    """Streaming resample: push chunks of finer bars in time order, get completed bars back.
+
+    The newest bucket may still receive bars, so it is held back until a later chunk
+    starts a new bucket or flush() is called.
+    """
+
+    def __init__(self, interval: str, tz: Optional[str] = None):
+        self.interval = interval
+        self.tz = tz
+        self._pending: Optional[CandleFrame] = None
+
+    def push(self, frame: CandleFrame) -> CandleFrame:
+        if self._pending is not None and len(self._pending):
+            frame = concat_frames([self._pending, frame])
+        if not len(frame):
+            return CandleFrame.empty(frame.symbol, self.interval, frame.source)
+        b = bucket_start(frame.ts, self.interval, self.tz)
+        k = int(np.searchsorted(b, b[-1], side="left"))
+        self._pending = frame[k:].copy()
+        return resample(frame[:k], self.interval, self.tz)
+
+    def flush(self) -> Optional[CandleFrame]:
+        pending, self._pending = self._pending, None
+        return None if pending is None else resample(pending, self.interval, self.tz)
+
+def concat_frames(frames: Sequence[CandleFrame]) -> CandleFrame:
+    # Chunks of one symbol/interval; sorted by time afterwards if they arrived out of order
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        raise ValueError("No frames to concatenate")
+    first = frames[0]
+    ts = np.concatenate([f.ts for f in frames])
+    cols = {c: np.concatenate([getattr(f, c) for f in frames]) for c in COLUMNS}
+    if len(ts) > 1 and np.any(np.diff(ts) < 0):
+        order = np.argsort(ts, kind="stable")
+        ts, cols = ts[order], {c: v[order] for c, v in cols.items()}
+    return CandleFrame(first.symbol, ts, interval=first.interval, source=first.source, **cols)
+
+def read_bars_csv(
+    src: Union[str, Path, IO[str]],
+    symbol: str,
+    interval: str = "1min",
+    tz: str = "UTC",
+    chunk_rows: int = 100_000,
+    source: str = "file",
+) -> Iterator[CandleFrame]:
+    """Parse a timestamp,open,high,low,close,volume CSV into frames of up to chunk_rows bars.
+
+    Timestamps without an offset are read as local time in `tz`; rows that do not exist
+    or are ambiguous there (DST changes) are dropped. Each chunk is sorted by time.
+    """
+    import pandas as pd  # deferred: ingestion path only
+    for df in pd.read_csv(src, chunksize=chunk_rows):
+        t = pd.DatetimeIndex(pd.to_datetime(df["timestamp"]))
+        if t.tz is None:
+            t = t.tz_localize(tz, ambiguous="NaT", nonexistent="NaT")
+        keep = ~t.isna()
+        ts = t[keep].tz_convert("UTC").as_unit("ns").asi8
+        cols = {c: df[c].to_numpy(dtype=np.float64)[keep] for c in COLUMNS}
+        order = np.argsort(ts, kind="stable")
+        yield CandleFrame(symbol, ts[order], interval=interval, source=source, **{c: v[order] for c, v in cols.items()})
+
+def month_of(ns: int) -> str:
+    return f"{from_ns(ns):%Y-%m}"
+
+def months_between(start: datetime, end: datetime) -> List[str]:
+    y, m = start.year, start.month
+    out = []
+    while (y, m) <= (end.year, end.month):
+        out.append(f"{y:04d}-{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+def merge_into_store(store: OHLCVStore, frame: CandleFrame, months: Sequence[str]) -> CandleFrame:
+    # Merge fetched bars into the stored history and widen its covered month range. No
+    # awaits here, so concurrent refreshes in one event loop cannot interleave writes.
+    current = store.load(frame.symbol, frame.interval)
+    meta = store.meta(frame.symbol, frame.interval) or {}
+    merged = (frame if current is None else current.merge(frame)).copy()
+    covered = list(months) + list(meta.get("months") or [])
+    store.write(merged, full=True, extra={"months": [min(covered), max(covered)]})
+    return merged
+
+def ingest_bars_file(
+    path: Union[str, Path], symbol: str, store: OHLCVStore, tz: str = "UTC", chunk_rows: int = 100_000,
+) -> CandleFrame:
+    # Load a local 1min CSV feed into the store a chunk at a time; returns the stored history
+    frame = concat_frames(list(read_bars_csv(path, symbol, "1min", tz, chunk_rows)))
+    return merge_into_store(store, frame, [month_of(frame.ts[0]), month_of(frame.ts[-1])])
+
+def months_to_fetch(meta: Optional[dict], start: datetime, end: datetime, now: Optional[datetime] = None) -> List[str]:
+    """Months of 1min bars to fetch so the stored history covers [start, end].
+
+    The covered range stays contiguous: a start before it fetches every month up to it,
+    an end past its last bar refetches from its (possibly partial) last month, once the
+    last fetch is older than intraday_refresh_s.
+    """
+    now = now or datetime.now(timezone.utc)
+    end = min(end, now)
+    if start > end:
+        return []
+    if not meta or not meta.get("months"):
+        return months_between(start, end)
+    first, last = meta["months"]
+    out = [m for m in months_between(start, end) if m < first]
+    if out:
+        out = months_between(start, datetime.strptime(first, "%Y-%m").replace(tzinfo=timezone.utc))[:-1]
+    stale = now.timestamp() - meta.get("fetched_at", 0) > settings.intraday_refresh_s
+    if (meta.get("last_ts") is None or to_ns(end) > meta["last_ts"]) and stale:
+        out += [m for m in months_between(datetime.strptime(last, "%Y-%m").replace(tzinfo=timezone.utc), end) if m not in out]
+    return out
@@ -1,23 +1,29 @@
 from __future__ import annotations
 from typing import List
-from datetime import datetime
+from datetime import datetime, timezone
 from libs.schemas.models import NewsItem
 from libs.utils.config import settings
 from libs.utils.http import get_json
-from libs.utils.limits import news_semaphore
+from libs.utils.limits import news_limiter
+
+PAGE_SIZE = 50  # newest articles first; a full page means older ones were cut off
+
+def _utc(dt: datetime) -> str:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S")
 
 async def get_news_newsapi(symbol: str, start: datetime, end: datetime) -> List[NewsItem]:
     params = {
         "q": symbol,
-        "from": start.date().isoformat(),
-        "to": end.date().isoformat(),
+        "from": _utc(start),
+        "to": _utc(end),
         "language": "en",
         "sortBy": "publishedAt",
-        "pageSize": 50,
+        "pageSize": PAGE_SIZE,
         "apiKey": settings.news_api_key,
     }
-    async with news_semaphore:
-        data = await get_json(f"{settings.newsapi_base}/everything", params=params)
+    data = await get_json(f"{settings.newsapi_base}/everything", params=params, limiter=news_limiter)
     articles = data.get("articles", [])
     out: List[NewsItem] = []
     for a in articles:
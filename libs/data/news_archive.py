@@ -0,0 +1,203 @@
+from __future__ import annotations
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from libs.schemas.frame import from_ns, to_ns
+from libs.schemas.models import NewsItem, SentimentFeatures
+from libs.utils.config import settings
+
+# Local per-symbol news archive.
+#
+# Each symbol is one JSON file with its scored articles sorted by published_at and a
+# sidecar recording the [start, end] range fetched from the provider so far. In memory
+# a NewsHistory keeps the publish times as a sorted int64 ns column, so a window query
+# is two bisections and newly fetched articles are merged in by timestamp.
+#
+# Sentiment: build_sentiment's weighted average over [as_of - window, as_of] is
+#     sum(s_i * 0.5 ** ((as_of - t_i) / 3d)) / sum(0.5 ** ((as_of - t_i) / 3d))
+# The as_of factor cancels, leaving sums of s_i * 2 ** (t_i / 3d) and 2 ** (t_i / 3d)
+# over the window, i.e. differences of prefix sums. 2 ** (t / 3d) overflows a double
+# ~8 years past its origin, so the exponent is taken relative to the end of the article's
+# 1024-day block and the prefix sums restart at every block; a window that crosses a
+# block edge rescales the older block's part. Any as_of then costs O(log n).
+
+_DAY_NS = 86400 * 10**9
+_HALF_LIFE_NS = 3 * _DAY_NS
+_BLOCK_NS = 1024 * _DAY_NS  # weights stay within 2 ** -342 .. 1
+
+def _key(n: NewsItem) -> Tuple[str, ...]:
+    return (n.url,) if n.url else (n.title, n.published_at.isoformat())
+
+class NewsHistory:
+    __slots__ = ("symbol", "items", "pub", "score", "_block", "_cs", "_cw", "_csw")
+
+    def __init__(self, symbol: str, items: List[NewsItem]):
+        # items must be sorted by published_at
+        self.symbol = symbol
+        self.items = items
+        self.pub = np.fromiter((to_ns(n.published_at) for n in items), dtype=np.int64, count=len(items))
+        self.score = np.array([n.sentiment_score if n.sentiment_score is not None else 0.0 for n in items], dtype=np.float64)
+        self._block = self.pub // _BLOCK_NS
+        w = np.exp2((self.pub - (self._block + 1) * _BLOCK_NS) / _HALF_LIFE_NS)
+        # inclusive prefix sums; _cw/_csw restart at every block edge
+        self._cs = np.concatenate([[0.0], np.cumsum(self.score)])
+        self._cw = self._block_cumsum(w)
+        self._csw = self._block_cumsum(self.score * w)
+
+    def _block_cumsum(self, x: np.ndarray) -> np.ndarray:
+        # summed per block, not subtracted from a global cumsum: a block's first weights
+        # are far below the rounding error of the previous block's total
+        starts = np.flatnonzero(np.diff(self._block)) + 1
+        return np.concatenate([np.cumsum(part) for part in np.split(x, starts)]) if len(x) else x
+
+    @classmethod
+    def empty(cls, symbol: str) -> "NewsHistory":
+        return cls(symbol, [])
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __repr__(self) -> str:
+        span = f"{from_ns(self.pub[0]).date()}..{from_ns(self.pub[-1]).date()}" if len(self) else "empty"
+        return f"NewsHistory({self.symbol!r}, n={len(self)}, {span})"
+
+    def bounds(self, start: datetime, end: datetime) -> Tuple[int, int]:
+        return (
+            int(np.searchsorted(self.pub, to_ns(start), side="left")),
+            int(np.searchsorted(self.pub, to_ns(end), side="right")),
+        )
+
+    def window(self, start: datetime, end: datetime) -> List[NewsItem]:
+        # Articles published in [start, end], newest first like the provider returns them
+        lo, hi = self.bounds(start, end)
+        return self.items[lo:hi][::-1]
+
+    def merge(self, new: Iterable[NewsItem]) -> "NewsHistory":
+        # Union keyed by url (else title + time); a scored copy wins over an unscored one
+        by_key = {_key(n): n for n in self.items}
+        changed = False
+        for n in new:
+            k = _key(n)
+            old = by_key.get(k)
+            if old is None or (old.sentiment_score is None and n.sentiment_score is not None):
+                by_key[k] = n
+                changed = True
+        if not changed:
+            return self
+        return NewsHistory(self.symbol, sorted(by_key.values(), key=lambda n: to_ns(n.published_at)))
+
+    def unscored(self) -> List[NewsItem]:
+        return [n for n in self.items if n.sentiment_score is None]
+
+    def sentiment_many(self, as_of_ns: np.ndarray, window_days: float = 7.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # build_sentiment over [as_of - window_days, as_of] for every as_of at once
+        # -> (avg_sentiment, weighted_sentiment, news_volume)
+        if window_days * _DAY_NS >= _BLOCK_NS:
+            raise ValueError("window_days must be shorter than a prefix-sum block")
+        as_of_ns = np.asarray(as_of_ns, dtype=np.int64)
+        lo = np.searchsorted(self.pub, as_of_ns - int(window_days * _DAY_NS), side="left")
+        hi = np.searchsorted(self.pub, as_of_ns, side="right")
+        volume = (hi - lo).astype(np.int64)
+        avg = np.zeros(len(as_of_ns))
+        wavg = np.zeros(len(as_of_ns))
+        k = np.flatnonzero(volume)
+        if not len(k):
+            return avg, wavg, volume
+        lo, last = lo[k], hi[k] - 1
+        avg[k] = (self._cs[last + 1] - self._cs[lo]) / volume[k]
+        # the part in the newest article's block, then (if the window reaches back past
+        # that block's first article) the rest, rescaled by one block of decay
+        first = np.searchsorted(self._block, self._block[last], side="left")
+        start = np.maximum(lo, first)
+        w, sw = self._span(self._cw, start, last), self._span(self._csw, start, last)
+        cross = lo < first
+        if cross.any():
+            scale = np.exp2(-_BLOCK_NS / _HALF_LIFE_NS)
+            w[cross] += self._span(self._cw, lo[cross], first[cross] - 1) * scale
+            sw[cross] += self._span(self._csw, lo[cross], first[cross] - 1) * scale
+        wavg[k] = sw / w
+        return avg, wavg, volume
+
+    def _span(self, cum: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        # sum of a block-restarting prefix sum over [a, b], both in the same block
+        prev = np.maximum(a - 1, 0)
+        same = (a > 0) & (self._block[prev] == self._block[b])
+        return cum[b] - np.where(same, cum[prev], 0.0)
+
+    def sentiment_at(self, as_of: datetime, window_days: float = 7.0) -> SentimentFeatures:
+        avg, wavg, volume = self.sentiment_many(np.array([to_ns(as_of)]), window_days)
+        symbol = self.symbol if volume[0] else ""
+        return SentimentFeatures(
+            symbol=symbol, as_of=as_of, avg_sentiment=float(avg[0]),
+            news_volume=int(volume[0]), weighted_sentiment=float(wavg[0]),
+        )
+
+
+class NewsArchive:
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.news_archive_dir)
+        # parsed histories, reused while the file on disk is unchanged
+        self._loaded: Dict[str, Tuple[int, NewsHistory]] = {}
+
+    def _path(self, symbol: str) -> Path:
+        return self.root / f"{symbol.upper()}.json"
+
+    def _meta_path(self, symbol: str) -> Path:
+        return self.root / f"{symbol.upper()}.meta.json"
+
+    def meta(self, symbol: str) -> Optional[Dict[str, Any]]:
+        p = self._meta_path(symbol)
+        if not p.exists():
+            return None
+        with open(p) as f:
+            return json.load(f)
+
+    def load(self, symbol: str) -> NewsHistory:
+        p = self._path(symbol)
+        try:
+            mtime = p.stat().st_mtime_ns
+        except FileNotFoundError:
+            return NewsHistory.empty(symbol)
+        hit = self._loaded.get(symbol)
+        if hit and hit[0] == mtime:
+            return hit[1]
+        with open(p) as f:
+            history = NewsHistory(symbol, [NewsItem(**n) for n in json.load(f)])
+        self._loaded[symbol] = (mtime, history)
+        return history
+
+    def write(self, history: NewsHistory, start: int, end: int) -> None:
+        # start/end: int64 ns range now covered by provider fetches
+        p = self._path(history.symbol)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump([n.model_dump(mode="json") for n in history.items], f)
+        os.replace(tmp, p)
+        self._loaded[history.symbol] = (p.stat().st_mtime_ns, history)
+
+        meta = {
+            "symbol": history.symbol.upper(),
+            "articles": len(history),
+            "start": start,
+            "end": end,
+            "fetched_at": time.time(),
+        }
+        mp = self._meta_path(history.symbol)
+        tmp_meta = mp.with_suffix(".tmp")
+        with open(tmp_meta, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, mp)
+
+
+_archive: NewsArchive | None = None
+
+def get_news_archive() -> NewsArchive:
+    global _archive
+    if _archive is None:
+        _archive = NewsArchive()
+    return _archive
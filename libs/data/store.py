@@ -0,0 +1,102 @@
+from __future__ import annotations
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+import numpy as np
+from libs.schemas.frame import CandleFrame, COLUMNS
+from libs.utils.config import settings
+
+# On-disk per-symbol OHLCV history.
+#
+# Each symbol/interval is one .npy file holding a (6, n) float64 matrix in C order, so
+# every column is contiguous: row 0 is the int64 ns timestamp (stored bit-for-bit and
+# viewed back as int64), rows 1-5 are open/high/low/close/volume. Files are opened with
+# mmap_mode="r"; the sorted timestamp row is the date index and range reads bisect it,
+# touching only the pages of the requested window. A small JSON sidecar records when the
+# symbol was last fetched and whether a full history has been loaded (for intraday
+# intervals, also the range of months fetched).
+
+
+class OHLCVStore:
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.ohlcv_store_dir)
+
+    def _path(self, symbol: str, interval: str) -> Path:
+        return self.root / interval / f"{symbol.upper()}.npy"
+
+    def _meta_path(self, symbol: str, interval: str) -> Path:
+        return self.root / interval / f"{symbol.upper()}.json"
+
+    def meta(self, symbol: str, interval: str = "1d") -> Optional[Dict[str, Any]]:
+        p = self._meta_path(symbol, interval)
+        if not p.exists():
+            return None
+        with open(p) as f:
+            return json.load(f)
+
+    def load(self, symbol: str, interval: str = "1d") -> Optional[CandleFrame]:
+        # Whole history as memory-mapped column views; nothing is read until accessed
+        p = self._path(symbol, interval)
+        if not p.exists():
+            return None
+        mat = np.load(p, mmap_mode="r")
+        source = (self.meta(symbol, interval) or {}).get("source", "alpha_vantage")
+        return CandleFrame(symbol, mat[0].view(np.int64), *mat[1:], interval=interval, source=source)
+
+    def read(self, symbol: str, start: Optional[datetime], end: Optional[datetime], interval: str = "1d") -> Optional[CandleFrame]:
+        full = self.load(symbol, interval)
+        if full is None:
+            return None
+        # Copy the (small) window out of the map so callers never pin the file
+        return full.between(start, end).copy()
+
+    def write(self, frame: CandleFrame, full: bool = False, extra: Optional[Dict[str, Any]] = None) -> None:
+        # extra: additional sidecar fields, kept across later writes
+        p = self._path(frame.symbol, frame.interval)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        mat = np.empty((1 + len(COLUMNS), len(frame)), dtype=np.float64)
+        mat[0] = frame.ts.view(np.float64)
+        for i, c in enumerate(COLUMNS, start=1):
+            mat[i] = getattr(frame, c)
+        tmp = p.with_suffix(".tmp.npy")
+        np.save(tmp, mat)
+        os.replace(tmp, p)
+
+        prev = self.meta(frame.symbol, frame.interval) or {}
+        meta = {
+            **prev,
+            **(extra or {}),
+            "symbol": frame.symbol.upper(),
+            "interval": frame.interval,
+            "source": frame.source,
+            "rows": len(frame),
+            "first_ts": int(frame.ts[0]) if len(frame) else None,
+            "last_ts": int(frame.ts[-1]) if len(frame) else None,
+            "fetched_at": time.time(),
+            "full": bool(full or prev.get("full", False)),
+        }
+        mp = self._meta_path(frame.symbol, frame.interval)
+        tmp_meta = mp.with_suffix(".tmp.json")
+        with open(tmp_meta, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, mp)
+
+    def append(self, frame: CandleFrame) -> CandleFrame:
+        # Merge newer bars into the stored history; returns the merged frame
+        current = self.load(frame.symbol, frame.interval)
+        # materialize before the file under the map is replaced
+        merged = (frame if current is None else current.merge(frame)).copy()
+        self.write(merged)
+        return merged
+
+
+_store: OHLCVStore | None = None
+
+def get_store() -> OHLCVStore:
+    global _store
+    if _store is None:
+        _store = OHLCVStore()
+    return _store
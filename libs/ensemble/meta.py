@@ -1,11 +1,17 @@
 from __future__ import annotations
 from libs.schemas.models import EnsembleInput, EnsembleDecision, Signal
-from libs.utils.cache import hash_dict
 from libs.utils.config import settings
-from datetime import datetime
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+import hashlib
 import os
 import pickle
 import math
+import numpy as np
+
+# Column order of the meta-learner's feature matrix
+FEATURE_ORDER = ["t_score", "t_conf", "f_score", "f_conf", "s_score", "s_conf", "m_exp", "m_conf"]
 
 _cached_model = None
 _cached_spec = None
@@ -22,65 +28,127 @@ def _load_meta_if_available():
         _cached_spec = obj["spec"]
     return _cached_model, _cached_spec
 
-def _sigmoid(x: float) -> float:
-    return 1.0 / (1.0 + math.exp(-x))
+def preload() -> bool:
+    # Unpickle the meta model (and import lightgbm) now rather than on the first request
+    model, _ = _load_meta_if_available()
+    return model is not None
 
-def _simple_baseline(inp: EnsembleInput) -> tuple[float, float]:
-    w_tech, w_fund, w_sent, w_fc = 0.3, 0.3, 0.2, 0.4
-    x = (
-        w_tech * inp.technical.score * inp.technical.confidence +
-        w_fund * inp.fundamental.score * inp.fundamental.confidence +
-        w_sent * inp.sentiment.score * inp.sentiment.confidence +
-        w_fc * inp.forecast.exp_return * (2.0 * inp.forecast.confidence)
-    )
-    prob_up = _sigmoid(5.0 * x)
-    uncertainty = max(0.0, 1.0 - abs(x))
-    return prob_up, uncertainty
+def _thresholds(buy: Optional[float], sell: Optional[float]) -> Tuple[float, float]:
+    # prob_up above `buy` is a buy, below `sell` a sell; defaults from settings
+    buy = settings.ensemble_buy_threshold if buy is None else buy
+    sell = settings.ensemble_sell_threshold if sell is None else sell
+    if sell > buy:
+        raise ValueError(f"sell threshold {sell} is above buy threshold {buy}")
+    return buy, sell
+
+def inputs_matrix(inputs: Sequence[EnsembleInput]) -> np.ndarray:
+    # (rows, FEATURE_ORDER) from agent outputs
+    return np.array([
+        (inp.technical.score, inp.technical.confidence, inp.fundamental.score, inp.fundamental.confidence,
+         inp.sentiment.score, inp.sentiment.confidence, inp.forecast.exp_return, inp.forecast.confidence)
+        for inp in inputs
+    ], dtype=np.float64).reshape(-1, len(FEATURE_ORDER))
+
+_SIGNALS = np.array(["sell", "hold", "buy"])
+
+@dataclass
+class EnsembleBatch:
+    """Decisions for every row of X as arrays; EnsembleDecision models are built on request."""
+
+    X: np.ndarray
+    prob_up: np.ndarray
+    uncertainty: np.ndarray
+    signal: np.ndarray      # +1 buy, -1 sell, 0 hold
+    size: np.ndarray
+    use_model: bool
+
+    def __len__(self) -> int:
+        return len(self.prob_up)
+
+    def signals(self) -> List[Signal]:
+        return _SIGNALS[self.signal + 1].tolist()
+
+    def inputs_hashes(self) -> List[str]:
+        # digest of each row's float64 bytes (the eight agent scores and confidences)
+        return [hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest() for row in self.X]
 
-def meta_ensemble(inp: EnsembleInput) -> EnsembleDecision:
+    def decisions(self, inputs: Sequence[EnsembleInput]) -> List[EnsembleDecision]:
+        # one model per row; `inputs` are the rows of X, for symbol, date and versions
+        ensemble = "meta_lgbm" if self.use_model else "meta_stub_v1"
+        rationale = "Meta-learner ensemble" if self.use_model else "Weighted blend baseline"
+        rows = zip(inputs, self.prob_up.tolist(), self.uncertainty.tolist(), self.signals(), self.size.tolist(), self.inputs_hashes())
+        return [
+            EnsembleDecision(
+                symbol=inp.technical.symbol,
+                as_of=inp.technical.as_of,
+                horizon_days=inp.forecast.horizon_days,
+                prob_up=p,
+                uncertainty=u,
+                signal=sig,
+                size=size,
+                rationale=rationale,
+                versions={
+                    "technical": inp.technical.agent_version,
+                    "fundamental": inp.fundamental.agent_version,
+                    "sentiment": inp.sentiment.agent_version,
+                    "forecast": inp.forecast.model_version,
+                    "ensemble": ensemble,
+                },
+                inputs_hash=h,
+            )
+            for inp, p, u, sig, size, h in rows
+        ]
+
+def meta_batch(X: np.ndarray, buy: Optional[float] = None, sell: Optional[float] = None) -> EnsembleBatch:
+    """Score a (rows, FEATURE_ORDER) matrix with one predict_proba call (or one array pass
+    of the baseline blend); decisions stay arrays. inputs_matrix builds X from agent outputs.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64).reshape(-1, len(FEATURE_ORDER))
+    prob_up, uncertainty, use_model = meta_probabilities(X)
+    signal, size = signal_arrays(prob_up, buy, sell)
+    return EnsembleBatch(X, prob_up, uncertainty, signal, size, use_model)
+
+def meta_ensemble(inp: EnsembleInput, buy: Optional[float] = None, sell: Optional[float] = None) -> EnsembleDecision:
+    return meta_ensemble_batch([inp], buy, sell)[0]
+
+def meta_ensemble_batch(
+    inputs: Sequence[EnsembleInput], buy: Optional[float] = None, sell: Optional[float] = None,
+) -> List[EnsembleDecision]:
+    # One EnsembleDecision per input from a single meta_batch pass; the model's per-call
+    # overhead dominates a single row, so multi-symbol requests should come through here
+    return meta_batch(inputs_matrix(inputs), buy, sell).decisions(inputs)
+
+# Array forms for many dates at once (backtests): X is (rows, FEATURE_ORDER)
+
+@lru_cache(maxsize=8)
+def _spec_columns(order: Tuple[str, ...]) -> Optional[List[int]]:
+    # X columns in the model's feature order, None when that is FEATURE_ORDER itself
+    cols = [FEATURE_ORDER.index(k) for k in order]
+    return None if cols == list(range(len(FEATURE_ORDER))) else cols
+
+def meta_probabilities(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, bool]:
+    # -> (prob_up, uncertainty, use_model), one predict_proba call for all rows
+    X = np.asarray(X, dtype=np.float64).reshape(-1, len(FEATURE_ORDER))
     model, spec = _load_meta_if_available()
     if model is not None:
-        order = spec["feature_order"]
-        feats = {
-            "t_score": inp.technical.score, "t_conf": inp.technical.confidence,
-            "f_score": inp.fundamental.score, "f_conf": inp.fundamental.confidence,
-            "s_score": inp.sentiment.score, "s_conf": inp.sentiment.confidence,
-            "m_exp": inp.forecast.exp_return, "m_conf": inp.forecast.confidence
-        }
-        X = [[feats[k] for k in order]]
-        prob_up = float(model.predict_proba(X)[0, 1])
-        # simple uncertainty proxy: entropy
-        p = prob_up
+        cols = _spec_columns(tuple(spec["feature_order"]))
+        prob = model.predict_proba(X if cols is None else X[:, cols])[:, 1].astype(np.float64) if len(X) else np.empty(0)
         eps = 1e-6
-        uncertainty = - (p*math.log(p+eps) + (1-p)*math.log(1-p+eps)) / math.log(2)
-    else:
-        prob_up, uncertainty = _simple_baseline(inp)
-
-    signal: Signal = "buy" if prob_up > 0.55 else "sell" if prob_up < 0.45 else "hold"
-    size = max(0.0, min(1.0, (prob_up - 0.5) * 2.0)) if signal != "hold" else 0.0
-
-    versions = {
-        "technical": inp.technical.agent_version,
-        "fundamental": inp.fundamental.agent_version,
-        "sentiment": inp.sentiment.agent_version,
-        "forecast": inp.forecast.model_version,
-        "ensemble": "meta_lgbm" if model is not None else "meta_stub_v1"
-    }
-    inputs_hash = hash_dict({
-        "t": inp.technical.score, "tf": inp.technical.confidence,
-        "f": inp.fundamental.score, "ff": inp.fundamental.confidence,
-        "s": inp.sentiment.score, "sf": inp.sentiment.confidence,
-        "m": inp.forecast.exp_return, "mc": inp.forecast.confidence
-    })
-    return EnsembleDecision(
-        symbol=inp.technical.symbol,
-        as_of=inp.technical.as_of,
-        horizon_days=inp.forecast.horizon_days,
-        prob_up=prob_up,
-        uncertainty=uncertainty,
-        signal=signal,
-        size=size,
-        rationale="Meta-learner ensemble" if model is not None else "Weighted blend baseline",
-        versions=versions,
-        inputs_hash=inputs_hash
-    )
\ No newline at end of file
+        entropy = -(prob * np.log(prob + eps) + (1 - prob) * np.log(1 - prob + eps)) / math.log(2)
+        return prob, entropy, True
+    c = {k: X[:, i] for i, k in enumerate(FEATURE_ORDER)}
+    x = (
+        0.3 * c["t_score"] * c["t_conf"] + 0.3 * c["f_score"] * c["f_conf"]
+        + 0.2 * c["s_score"] * c["s_conf"] + 0.4 * c["m_exp"] * (2.0 * c["m_conf"])
+    )
+    return 1.0 / (1.0 + np.exp(-5.0 * x)), np.maximum(0.0, 1.0 - np.abs(x)), False
+
+def signal_arrays(
+    prob_up: np.ndarray, buy: Optional[float] = None, sell: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # _decision's signal (+1 buy, -1 sell, 0 hold) and size for every row
+    buy, sell = _thresholds(buy, sell)
+    signal = (prob_up > buy).astype(np.int64) - (prob_up < sell)
+    # minimum/maximum: np.clip's dispatch overhead dominates small batches
+    size = np.where(signal != 0, np.minimum(np.maximum((prob_up - 0.5) * 2.0, 0.0), 1.0), 0.0)
+    return signal, size
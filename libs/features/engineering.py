@@ -1,8 +1,9 @@
 from __future__ import annotations
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Union
 from dataclasses import dataclass
-from datetime import datetime
 import math
+import numpy as np
+from datetime import datetime, timezone
 from libs.schemas.models import (
     Candle,
     FundamentalsSnapshot,
@@ -12,66 +13,29 @@ from libs.schemas.models import (
     SentimentFeatures,
     ModelFeatures,
 )
+from libs.schemas.frame import CandleFrame
+from libs.features.indicators import IndicatorSeries, compute_indicators
 from libs.utils.cache import hash_dict
 
 
-def _simple_rsi(prices: List[float], period: int = 14) -> float:
-    if len(prices) < period + 1:
-        return float("nan")
-    gains, losses = [], []
-    for i in range(1, period + 1):
-        diff = prices[-i] - prices[-i-1]
-        gains.append(max(diff, 0))
-        losses.append(abs(min(diff, 0)))
-    avg_gain = sum(gains) / period
-    avg_loss = sum(losses) / period
-    if avg_loss == 0:
-        return 100.0
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
+def as_frame(candles: Union[CandleFrame, List[Candle]]) -> CandleFrame:
+    return candles if isinstance(candles, CandleFrame) else CandleFrame.from_candles(candles)
 
-def _simple_macd(prices: List[float], fast: int = 12, slow: int = 26, signal: int = 9):
-    # super simplified EMA approximations
-    def ema(vals, p):
-        k = 2 / (p + 1)
-        e = vals[0]
-        for v in vals[1:]:
-            e = v * k + e * (1 - k)
-        return e
-    if len(prices) < slow + signal:
-        return (float("nan"), float("nan"))
-    macd_line = ema(prices[-slow:], fast) - ema(prices[-slow:], slow)
-    signal_line = ema([macd_line] * signal, signal)
-    return macd_line, signal_line
+def technical_series(candles: CandleFrame) -> IndicatorSeries:
+    # One pass over the whole history; index i holds the indicators as of bar i
+    frame = as_frame(candles)
+    return compute_indicators(frame.close, frame.high, frame.low)
 
-def build_technical(candles: List[Candle]) -> TechnicalFeatures:
-    if not candles:
+def build_technical(candles: CandleFrame, series: Optional[IndicatorSeries] = None, idx: int = -1) -> TechnicalFeatures:
+    if not len(candles):
         raise ValueError("No candles provided")
-    closes = [c.close for c in candles]
-    as_of = candles[-1].ts
-    rsi = _simple_rsi(closes)
-    macd, macd_sig = _simple_macd(closes)
-    bb_period = 20
-    if len(closes) >= bb_period:
-        m = sum(closes[-bb_period:]) / bb_period
-        var = sum((x - m) ** 2 for x in closes[-bb_period:]) / bb_period
-        sd = math.sqrt(var)
-        bb_upper = m + 2 * sd
-        bb_lower = m - 2 * sd
-    else:
-        bb_upper, bb_lower = float("nan"), float("nan")
-
+    frame = as_frame(candles)
+    if series is None:
+        series = technical_series(frame)
     return TechnicalFeatures(
-        symbol=candles[-1].symbol,
-        as_of=as_of,
-        rsi=rsi,
-        macd=macd,
-        macd_signal=macd_sig,
-        bb_upper=bb_upper,
-        bb_lower=bb_lower,
-        atr=None,
-        sma_20=None,
-        ema_50=None,
+        symbol=frame.symbol,
+        as_of=frame.ts_at(idx),
+        **series.at(idx),
     )
 
 def build_fundamental(snapshot: FundamentalsSnapshot) -> FundamentalFeatures:
@@ -107,12 +71,25 @@ def build_sentiment(news: List[NewsItem], as_of: datetime) -> SentimentFeatures:
         wavg = sum(s * w for s, w in zip(scores, weights)) / sum(weights)
     return SentimentFeatures(symbol=sym, as_of=as_of, avg_sentiment=avg, news_volume=len(news), weighted_sentiment=wavg)
 
+def model_feature_hashes(
+    rsi: np.ndarray, macd: np.ndarray, fund: FundamentalFeatures | Sequence[FundamentalFeatures], weighted_sentiment: np.ndarray,
+) -> List[str]:
+    # features_hash of build_model_features for many dates; NaN plays the role of None.
+    # `fund` is one snapshot for every date or one per date.
+    def val(x: float, default: float) -> float:
+        return default if math.isnan(x) else (float(x) or default)
+    funds = [fund] * len(rsi) if isinstance(fund, FundamentalFeatures) else fund
+    return [
+        hash_dict({"rsi": val(r, 50.0), "macd": val(m, 0.0), "pe": f.pe or 20.0, "roe": f.roe or 0.1, "sent": val(w, 0.0)})
+        for r, m, f, w in zip(rsi.tolist(), macd.tolist(), funds, weighted_sentiment.tolist())
+    ]
+
 @dataclass
 class ModelPrep:
     features: dict
     features_hash: str
 
-def build_model_features(candles: List[Candle], tech: TechnicalFeatures, fund: FundamentalFeatures, sent: SentimentFeatures) -> ModelFeatures:
+def build_model_features(candles: CandleFrame, tech: TechnicalFeatures, fund: FundamentalFeatures, sent: SentimentFeatures) -> ModelFeatures:
     # Minimal model features: latest close return proxy and a few engineered fields
     feat = {
         "rsi": tech.rsi or 50.0,
@@ -122,4 +99,4 @@ def build_model_features(candles: List[Candle], tech: TechnicalFeatures, fund: F
         "sent": sent.weighted_sentiment or 0.0,
     }
     features_hash = hash_dict(feat)
-    return ModelFeatures(symbol=candles[-1].symbol, as_of=candles[-1].ts, features_hash=features_hash)
\ No newline at end of file
+    return ModelFeatures(symbol=candles.symbol, as_of=candles.ts_at(-1), features_hash=features_hash)
\ No newline at end of file
@@ -0,0 +1,188 @@
+from __future__ import annotations
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import numpy as np
+from libs.schemas.models import Candle, TechnicalFeatures
+from libs.schemas.frame import CandleFrame, to_ns
+from libs.features.indicators import (
+    RSI_PERIOD, MACD_FAST, MACD_SLOW, MACD_SIGNAL, BB_PERIOD, BB_WIDTH, ATR_PERIOD, EMA_PERIOD,
+    ema_step, wilder_step, rsi_from_averages, true_range,
+)
+
+# Streaming counterpart of libs.features.indicators.compute_indicators. Each update()
+# costs O(1) time and memory: recursive indicators keep their running value, seeds keep
+# at most `period` values until the first output, and Bollinger/SMA keep the last 20
+# closes and take their mean and deviation from that window, like the batch kernel
+# (exact, with no running sums to drift over a long session).
+
+_STATE_VERSION = 2
+
+
+class _Seeded:
+    """Recursive average (EMA or Wilder) that is seeded with the mean of its first `period` inputs."""
+
+    __slots__ = ("period", "wilder", "value", "seed")
+
+    def __init__(self, period: int, wilder: bool = False):
+        self.period = period
+        self.wilder = wilder
+        self.value: Optional[float] = None
+        self.seed: List[float] = []
+
+    def update(self, x: float) -> Optional[float]:
+        if self.value is None:
+            self.seed.append(x)
+            if len(self.seed) == self.period:
+                # np.mean to reproduce the batch seed bit for bit
+                self.value = float(np.mean(self.seed))
+                self.seed = []
+            return self.value
+        if self.wilder:
+            self.value = wilder_step(self.value, x, self.period)
+        else:
+            self.value = ema_step(self.value, x, 2.0 / (self.period + 1))
+        return self.value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"value": self.value, "seed": list(self.seed)}
+
+    def load(self, d: Dict[str, Any]) -> None:
+        self.value = d["value"]
+        self.seed = list(d["seed"])
+
+
+class IndicatorState:
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.count = 0
+        self.last_ts: Optional[datetime] = None
+        self.prev_close: Optional[float] = None
+        # (close, high, low) of the last bar, to notice a later revision of it
+        self.last_bar: Optional[Tuple[float, float, float]] = None
+        self.ema_fast = _Seeded(MACD_FAST)
+        self.ema_slow = _Seeded(MACD_SLOW)
+        self.macd_signal = _Seeded(MACD_SIGNAL)
+        self.ema_50 = _Seeded(EMA_PERIOD)
+        self.avg_gain = _Seeded(RSI_PERIOD, wilder=True)
+        self.avg_loss = _Seeded(RSI_PERIOD, wilder=True)
+        self.atr = _Seeded(ATR_PERIOD, wilder=True)
+        self.window: Deque[float] = deque(maxlen=BB_PERIOD)
+        self.macd: Optional[float] = None
+
+    def update(self, candle: Candle) -> None:
+        if self.last_ts is not None and candle.ts <= self.last_ts:
+            raise ValueError(f"Out of order candle for {self.symbol}: {candle.ts} <= {self.last_ts}")
+        self.update_values(candle.close, candle.high, candle.low)
+        self.last_ts = candle.ts
+
+    def update_values(self, close: float, high: float, low: float) -> None:
+        close, high, low = float(close), float(high), float(low)
+        if self.prev_close is not None:
+            diff = close - self.prev_close
+            self.avg_gain.update(diff if diff > 0 else 0.0)
+            self.avg_loss.update(-diff if diff < 0 else 0.0)
+            self.atr.update(true_range(high, low, self.prev_close))
+
+        fast = self.ema_fast.update(close)
+        slow = self.ema_slow.update(close)
+        self.ema_50.update(close)
+        if fast is not None and slow is not None:
+            self.macd = fast - slow
+            self.macd_signal.update(self.macd)
+
+        self.window.append(close)
+
+        self.prev_close = close
+        self.last_bar = (close, high, low)
+        self.count += 1
+
+    def catch_up(self, frame: CandleFrame) -> int:
+        # Feed only the bars newer than the last one seen; returns how many were applied
+        lo = 0 if self.last_ts is None else int(np.searchsorted(frame.ts, to_ns(self.last_ts), side="right"))
+        if lo >= len(frame):
+            return 0
+        for c, h, l in zip(frame.close[lo:].tolist(), frame.high[lo:].tolist(), frame.low[lo:].tolist()):
+            self.update_values(c, h, l)
+        self.last_ts = frame.ts_at(-1)
+        return len(frame) - lo
+
+    def matches(self, frame: CandleFrame) -> bool:
+        # Whether `frame` still holds the last bar seen with the values it had then; a
+        # revised bar (the day's bar while the session runs, a split or dividend
+        # adjustment) means the state has to be rebuilt from the frame
+        if self.last_ts is None or self.last_bar is None:
+            return False
+        t = to_ns(self.last_ts)
+        i = int(np.searchsorted(frame.ts, t))
+        if i == len(frame) or frame.ts[i] != t:
+            return False
+        return (float(frame.close[i]), float(frame.high[i]), float(frame.low[i])) == self.last_bar
+
+    def _bollinger(self):
+        if len(self.window) < BB_PERIOD:
+            return None, None, None
+        w = np.fromiter(self.window, dtype=np.float64, count=BB_PERIOD)
+        mean, sd = float(w.mean()), float(w.std())
+        return mean, mean + BB_WIDTH * sd, mean - BB_WIDTH * sd
+
+    def values(self) -> Dict[str, Optional[float]]:
+        rsi = None
+        if self.avg_gain.value is not None:
+            rsi = rsi_from_averages(self.avg_gain.value, self.avg_loss.value)
+        mean, upper, lower = self._bollinger()
+        return {
+            "rsi": rsi,
+            "macd": self.macd,
+            "macd_signal": self.macd_signal.value,
+            "bb_upper": upper,
+            "bb_lower": lower,
+            "atr": self.atr.value,
+            "sma_20": mean,
+            "ema_50": self.ema_50.value,
+        }
+
+    def snapshot(self) -> TechnicalFeatures:
+        if self.last_ts is None:
+            raise ValueError("No candles provided")
+        return TechnicalFeatures(symbol=self.symbol, as_of=self.last_ts, **self.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": _STATE_VERSION,
+            "symbol": self.symbol,
+            "count": self.count,
+            "last_ts": self.last_ts.isoformat() if self.last_ts else None,
+            "prev_close": self.prev_close,
+            "last_bar": list(self.last_bar) if self.last_bar else None,
+            "macd": self.macd,
+            "ema_fast": self.ema_fast.to_dict(),
+            "ema_slow": self.ema_slow.to_dict(),
+            "macd_signal": self.macd_signal.to_dict(),
+            "ema_50": self.ema_50.to_dict(),
+            "avg_gain": self.avg_gain.to_dict(),
+            "avg_loss": self.avg_loss.to_dict(),
+            "atr": self.atr.to_dict(),
+            "window": list(self.window),
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "IndicatorState":
+        if d.get("version") != _STATE_VERSION:
+            raise ValueError(f"Unsupported indicator state version: {d.get('version')}")
+        st = cls(d["symbol"])
+        st.count = d["count"]
+        st.last_ts = datetime.fromisoformat(d["last_ts"]) if d["last_ts"] else None
+        st.prev_close = d["prev_close"]
+        st.last_bar = tuple(d["last_bar"]) if d.get("last_bar") else None
+        st.macd = d["macd"]
+        for name in ("ema_fast", "ema_slow", "macd_signal", "ema_50", "avg_gain", "avg_loss", "atr"):
+            getattr(st, name).load(d[name])
+        st.window.extend(d["window"])
+        return st
+
+    @classmethod
+    def from_frame(cls, frame: CandleFrame) -> "IndicatorState":
+        st = cls(frame.symbol)
+        st.catch_up(frame)
+        return st
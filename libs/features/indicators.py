@@ -0,0 +1,163 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Optional
+import math
+import numpy as np
+
+# Full-series indicators. Every array is aligned to the candle index and holds NaN
+# until the indicator has enough history. The recursive kernels below are shared with
+# libs.features.incremental so the streaming state reproduces these values exactly.
+
+RSI_PERIOD = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+BB_PERIOD = 20
+BB_WIDTH = 2.0
+ATR_PERIOD = 14
+SMA_PERIOD = 20
+EMA_PERIOD = 50
+
+
+def ema_step(prev: float, value: float, alpha: float) -> float:
+    return prev + alpha * (value - prev)
+
+def wilder_step(prev: float, value: float, period: int) -> float:
+    return (prev * (period - 1) + value) / period
+
+def rsi_from_averages(avg_gain: float, avg_loss: float) -> float:
+    if avg_loss == 0:
+        return 100.0
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+def true_range(high: float, low: float, prev_close: float) -> float:
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+def _ema_from(values: np.ndarray, period: int, first: int) -> np.ndarray:
+    # EMA seeded with the SMA of values[first:first+period], recursive afterwards.
+    out = np.full(len(values), np.nan)
+    seed_end = first + period
+    if seed_end > len(values):
+        return out
+    alpha = 2.0 / (period + 1)
+    e = float(np.mean(values[first:seed_end]))
+    out[seed_end - 1] = e
+    tail = values[seed_end:].tolist()
+    res = []
+    for v in tail:
+        e = ema_step(e, v, alpha)
+        res.append(e)
+    out[seed_end:] = res
+    return out
+
+def _wilder_from(values: np.ndarray, period: int, first: int) -> np.ndarray:
+    # Wilder smoothing seeded with the mean of values[first:first+period].
+    out = np.full(len(values), np.nan)
+    seed_end = first + period
+    if seed_end > len(values):
+        return out
+    a = float(np.mean(values[first:seed_end]))
+    out[seed_end - 1] = a
+    res = []
+    for v in values[seed_end:].tolist():
+        a = wilder_step(a, v, period)
+        res.append(a)
+    out[seed_end:] = res
+    return out
+
+def _rolling_mean_std(values: np.ndarray, period: int):
+    mean = np.full(len(values), np.nan)
+    std = np.full(len(values), np.nan)
+    if len(values) < period:
+        return mean, std
+    windows = np.lib.stride_tricks.sliding_window_view(values, period)
+    mean[period - 1:] = windows.mean(axis=1)
+    # population std, same as the original Bollinger computation
+    std[period - 1:] = windows.std(axis=1)
+    return mean, std
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    return _ema_from(np.asarray(values, dtype=np.float64), period, 0)
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    return _rolling_mean_std(np.asarray(values, dtype=np.float64), period)[0]
+
+def rsi(closes: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    closes = np.asarray(closes, dtype=np.float64)
+    out = np.full(len(closes), np.nan)
+    if len(closes) < period + 1:
+        return out
+    diff = np.diff(closes, prepend=np.nan)
+    gains = np.where(diff > 0, diff, 0.0)
+    losses = np.where(diff < 0, -diff, 0.0)
+    avg_gain = _wilder_from(gains, period, 1)
+    avg_loss = _wilder_from(losses, period, 1)
+    valid = ~np.isnan(avg_gain)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain[valid] / avg_loss[valid]
+        out[valid] = np.where(avg_loss[valid] == 0, 100.0, 100 - (100 / (1 + rs)))
+    return out
+
+def macd(closes: np.ndarray, fast: int = MACD_FAST, slow: int = MACD_SLOW, signal: int = MACD_SIGNAL):
+    closes = np.asarray(closes, dtype=np.float64)
+    line = ema(closes, fast) - ema(closes, slow)
+    sig = _ema_from(line, signal, slow - 1)
+    return line, sig
+
+def atr(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = ATR_PERIOD) -> np.ndarray:
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    closes = np.asarray(closes, dtype=np.float64)
+    if len(closes) < 2:
+        return np.full(len(closes), np.nan)
+    prev = closes[:-1]
+    tr = np.empty(len(closes))
+    tr[0] = np.nan
+    tr[1:] = np.maximum.reduce([highs[1:] - lows[1:], np.abs(highs[1:] - prev), np.abs(lows[1:] - prev)])
+    return _wilder_from(tr, period, 1)
+
+
+@dataclass
+class IndicatorSeries:
+    rsi: np.ndarray
+    macd: np.ndarray
+    macd_signal: np.ndarray
+    bb_upper: np.ndarray
+    bb_lower: np.ndarray
+    atr: np.ndarray
+    sma_20: np.ndarray
+    ema_50: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.rsi)
+
+    def at(self, idx: int) -> Dict[str, Optional[float]]:
+        # NaN (not enough history yet) is reported as None, as on TechnicalFeatures
+        out: Dict[str, Optional[float]] = {}
+        for name in FIELDS:
+            v = float(getattr(self, name)[idx])
+            out[name] = None if math.isnan(v) else v
+        return out
+
+FIELDS = ("rsi", "macd", "macd_signal", "bb_upper", "bb_lower", "atr", "sma_20", "ema_50")
+
+
+def compute_indicators(closes: np.ndarray, highs: Optional[np.ndarray] = None, lows: Optional[np.ndarray] = None) -> IndicatorSeries:
+    closes = np.asarray(closes, dtype=np.float64)
+    highs = closes if highs is None else np.asarray(highs, dtype=np.float64)
+    lows = closes if lows is None else np.asarray(lows, dtype=np.float64)
+    line, sig = macd(closes)
+    mean, std = _rolling_mean_std(closes, BB_PERIOD)
+    return IndicatorSeries(
+        rsi=rsi(closes),
+        macd=line,
+        macd_signal=sig,
+        bb_upper=mean + BB_WIDTH * std,
+        bb_lower=mean - BB_WIDTH * std,
+        atr=atr(highs, lows, closes),
+        sma_20=mean if SMA_PERIOD == BB_PERIOD else sma(closes, SMA_PERIOD),
+        ema_50=ema(closes, EMA_PERIOD),
+    )
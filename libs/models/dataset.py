@@ -0,0 +1,141 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple, Union
+import hashlib
+import json
+import numpy as np
+from libs.data.adapters import get_timeseries, get_fundamentals_history, get_news_history
+from libs.data.news_archive import NewsHistory
+from libs.ensemble.meta import FEATURE_ORDER
+from libs.features.engineering import build_fundamental, model_feature_hashes, technical_series
+from libs.schemas.frame import CandleFrame, from_ns
+from libs.schemas.fundamentals import FundamentalsHistory
+from libs.schemas.models import (
+    AgentResult, ForecastResult, FundamentalFeatures, FundamentalsSnapshot, ModelFeatures, SentimentFeatures,
+    TechnicalFeatures,
+)
+from libs.utils.config import settings
+from apps.agents.technical import technical_agent_scores
+from apps.agents.fundamental import fundamental_agent
+from apps.agents.sentiment import sentiment_agent_scores
+from apps.agents.price_model import price_model_scores
+
+# Meta-learner training data for one symbol, built column-wise: every source is fetched
+# once, and the technicals, agent scores and labels for all sample dates are computed
+# as arrays. Rows match what train_meta.to_feature_row produces one at a time, with news
+# sentiment taken from the archive's prefix sums (NewsHistory.sentiment_many, as in the
+# backtester) rather than summed per row.
+
+WARMUP_BARS = 40
+SAMPLE_STEP = 5  # every 5 trading days
+NEWS_WINDOW_DAYS = 7
+
+@dataclass
+class MetaDataset:
+    symbol: str
+    ts: np.ndarray   # int64 ns as-of time of each row
+    X: np.ndarray    # (rows, len(FEATURE_ORDER))
+    y: np.ndarray    # 1 if the forward return is positive
+    fwd: np.ndarray  # forward close-to-close return
+    symbols: Optional[np.ndarray] = None  # per-row symbol, for multi-symbol sets
+
+    def __len__(self) -> int:
+        return len(self.y)
+
+def _default(model, field: str) -> str:
+    return str(model.model_fields[field].default)
+
+def feature_versions() -> Dict[str, str]:
+    # Every version a row of X depends on: features, agents and the news sentiment model
+    return {
+        "technical": _default(TechnicalFeatures, "feature_version"),
+        "fundamental": _default(FundamentalFeatures, "feature_version"),
+        "sentiment": _default(SentimentFeatures, "feature_version"),
+        "model": _default(ModelFeatures, "feature_version"),
+        "agents": _default(AgentResult, "agent_version"),
+        "forecast": _default(ForecastResult, "model_version"),
+        "sentiment_model": settings.sentiment_model_version,
+    }
+
+def versions_digest(versions: Optional[Dict[str, str]] = None) -> str:
+    payload = json.dumps(versions or feature_versions(), sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:10]
+
+def sample_indices(n_bars: int, horizon_days: int, warmup: int = WARMUP_BARS, step: int = SAMPLE_STEP) -> np.ndarray:
+    return np.arange(warmup, max(warmup, n_bars - horizon_days), step)
+
+def forward_returns(close: np.ndarray, idx: np.ndarray, horizon_days: int) -> np.ndarray:
+    return (close[idx + horizon_days] - close[idx]) / close[idx]
+
+def feature_matrix(
+    candles: CandleFrame, fund: Union[FundamentalsSnapshot, FundamentalsHistory], idx: np.ndarray,
+    weighted_sentiment: np.ndarray,
+    indicators: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+) -> np.ndarray:
+    # The meta-learner inputs (FEATURE_ORDER columns) at bars idx, given the weighted
+    # news sentiment at those bars. `indicators` is (rsi, macd, macd_signal) at idx when
+    # the caller already has them (a resumed backtest streams them from its state).
+    as_of = candles.ts[idx]
+    if indicators is None:
+        series = technical_series(candles)
+        indicators = series.rsi[idx], series.macd[idx], series.macd_signal[idx]
+    rsi, macd, macd_signal = indicators
+    t_score, t_conf = technical_agent_scores(rsi, macd, macd_signal)
+
+    if isinstance(fund, FundamentalsHistory):
+        # point in time: each row sees the latest filing at its date; the agent runs
+        # once per filing, not per row, on a snapshot as of the first row using it
+        pos = fund.index_at(as_of)
+        uniq, first, inv = np.unique(pos, return_index=True, return_inverse=True)
+        feats = [build_fundamental(fund.snapshot(int(i), from_ns(as_of[j]))) for i, j in zip(uniq, first)]
+        res = [fundamental_agent(f) for f in feats]
+        ffeat = [feats[j] for j in inv]
+        f_score = np.array([r.score for r in res], dtype=np.float64)[inv]
+        f_conf = np.array([r.confidence for r in res], dtype=np.float64)[inv]
+    else:
+        ffeat = build_fundamental(fund)
+        f_res = fundamental_agent(ffeat)
+        f_score, f_conf = np.full(len(idx), f_res.score), np.full(len(idx), f_res.confidence)
+
+    s_score, s_conf = sentiment_agent_scores(weighted_sentiment)
+    m_exp, m_conf = price_model_scores(model_feature_hashes(rsi, macd, ffeat, weighted_sentiment))
+
+    cols = {
+        "t_score": t_score, "t_conf": t_conf,
+        "f_score": f_score, "f_conf": f_conf,
+        "s_score": s_score, "s_conf": s_conf,
+        "m_exp": m_exp, "m_conf": m_conf,
+    }
+    return np.column_stack([cols[k] for k in FEATURE_ORDER]) if len(idx) else np.empty((0, len(FEATURE_ORDER)))
+
+def build_dataset(
+    candles: CandleFrame, fund: Union[FundamentalsSnapshot, FundamentalsHistory], news: NewsHistory, horizon_days: int,
+    warmup: int = WARMUP_BARS, step: int = SAMPLE_STEP,
+) -> MetaDataset:
+    idx = sample_indices(len(candles), horizon_days, warmup, step)
+    as_of = candles.ts[idx]
+    _, weighted, _ = news.sentiment_many(as_of, NEWS_WINDOW_DAYS)
+    X = feature_matrix(candles, fund, idx, weighted)
+    fwd = forward_returns(candles.close, idx, horizon_days)
+    keep = ~np.isnan(fwd)
+    return MetaDataset(candles.symbol, as_of[keep], X[keep], (fwd[keep] > 0).astype(np.int64), fwd[keep])
+
+async def load_sources(symbol: str, start: datetime, end: datetime):
+    # -> (candles, fundamentals, news) covering every sample of [start, end]
+    candles = await get_timeseries(symbol, start - timedelta(days=60), end + timedelta(days=1))
+    if not len(candles):
+        raise ValueError(f"No candles for {symbol}")
+    first, last = candles.ts_at(0), candles.ts_at(-1)
+    fund, news = await asyncio.gather(
+        get_fundamentals_history(symbol),
+        get_news_history(symbol, first - timedelta(days=NEWS_WINDOW_DAYS), last),
+    )
+    return candles, fund, news
+
+async def build_symbol_dataset(symbol: str, start: datetime, end: datetime, horizon_days: int) -> MetaDataset:
+    candles, fund, news = await load_sources(symbol, start, end)
+    if len(candles) < 100:
+        raise ValueError("Not enough candles")
+    return build_dataset(candles, fund, news, horizon_days)
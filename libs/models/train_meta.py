@@ -8,33 +8,39 @@ import pickle
 
 # jpr 091025
 import argparse
+import asyncio
 
 import numpy as np
-import pandas as pd
-from sklearn.metrics import roc_auc_score
-from lightgbm import LGBMClassifier
 
-from libs.data.adapters import get_timeseries, get_fundamentals, get_news
-from libs.features.engineering import build_technical, build_fundamental, build_sentiment, build_model_features
+from libs.data.adapters import get_fundamentals, get_news
+from libs.features.engineering import build_technical, build_fundamental, build_sentiment, build_model_features, technical_series
+from libs.features.indicators import IndicatorSeries
+from libs.models.dataset import FEATURE_ORDER, MetaDataset, build_symbol_dataset
+from libs.models.universe import generate_universe, read_universe
 from apps.agents.technical import technical_agent
 from apps.agents.fundamental import fundamental_agent
 from apps.agents.sentiment import sentiment_agent
 from apps.agents.price_model import price_model_agent
-from libs.schemas.models import EnsembleInput
-from libs.utils.config import settings
+from libs.schemas.frame import CandleFrame
+from libs.utils.http import clients
+from libs.utils.limits import Priority, max_sharers, request_priority
 
-def compute_forward_return(candles: List, as_of_idx: int, horizon_days: int) -> float:
+def compute_forward_return(candles: CandleFrame, as_of_idx: int, horizon_days: int) -> float:
     # candles must be daily sorted ascending. Use close->close return horizon_days ahead.
     if as_of_idx + horizon_days >= len(candles):
         return np.nan
-    p0 = candles[as_of_idx].close
-    p1 = candles[as_of_idx + horizon_days].close
+    p0 = candles.close[as_of_idx]
+    p1 = candles.close[as_of_idx + horizon_days]
     return (p1 - p0) / p0
 
-def to_feature_row(symbol: str, as_of_idx: int, candles: List, horizon_days: int, as_of: datetime):
-    # Build all features and agent outputs at time index
+def to_feature_row(symbol: str, as_of_idx: int, candles: CandleFrame, horizon_days: int, as_of: datetime, series: IndicatorSeries | None = None):
+    # Build all features and agent outputs at time index. Row-at-a-time reference for
+    # libs.models.dataset, which builds the whole matrix at once.
     sub_candles = candles[:as_of_idx+1]
-    tech = build_technical(sub_candles)
+    if series is None:
+        series = technical_series(candles)
+    # Indicators are causal, so the full-history series at as_of_idx equals the sliced one
+    tech = build_technical(candles, series, as_of_idx)
     fund = await_or_sync(get_fundamentals(symbol, as_of))
     sent_news = await_or_sync(get_news(symbol, as_of - timedelta(days=7), as_of))
     sent = build_sentiment(sent_news, as_of)
@@ -71,45 +77,77 @@ def await_or_sync(coro):
     else:
         return loop.run_until_complete(coro)
 
+async def _build(symbol: str, start: datetime, end: datetime, horizon: int) -> MetaDataset:
+    try:
+        return await build_symbol_dataset(symbol, start, end, horizon)
+    finally:
+        # Release the pooled provider connections opened on this loop
+        await clients.aclose()
+
+def _symbols(args) -> List[str]:
+    if args.universe_file:
+        return read_universe(args.universe_file)
+    if args.symbols:
+        return list(dict.fromkeys(s.strip().upper() for s in args.symbols.split(",") if s.strip()))
+    return [args.symbol]
+
+def _scaling(symbols: List[str], start: datetime, end: datetime, horizon: int, max_workers: int) -> None:
+    # Rebuild the universe from scratch at 1, 2, 4, ... workers and report the speedup;
+    # generate_universe caps the pool at the providers' smallest in-flight limit
+    import tempfile
+    max_workers = min(max_workers, max_sharers())
+    counts = sorted({min(2 ** i, max_workers) for i in range(max_workers.bit_length() + 1)})
+    base = None
+    for n in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            _, report = generate_universe(symbols, start, end, horizon, tmp, workers=n, log=lambda _: None)
+        base = base or report["wall_s"]
+        print(f"workers={n:>3}  wall={report['wall_s']:8.2f}s  speedup={base / report['wall_s']:5.2f}x")
+
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--symbol", type=str, required=True)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--symbol", type=str)
+    group.add_argument("--symbols", type=str, help="comma separated")
+    group.add_argument("--universe-file", type=str, help="one symbol per line, # comments")
     parser.add_argument("--start", type=str, required=True, help="YYYY-MM-DD")
     parser.add_argument("--end", type=str, required=True, help="YYYY-MM-DD")
     parser.add_argument("--horizon", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--partials-dir", type=str, default="data/meta_partials",
+                        help="per-symbol datasets; existing ones are reused on rerun")
+    parser.add_argument("--scaling", action="store_true", help="report build time vs worker count and exit")
     parser.add_argument("--outfile", type=str, default="models/meta_lgbm.pkl")
     args = parser.parse_args()
 
     os.makedirs("models", exist_ok=True)
+    # Training fetches are bulk traffic for the provider limiters
+    request_priority.set(Priority.BULK)
 
     start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc)
     end = datetime.fromisoformat(args.end).replace(tzinfo=timezone.utc)
-    symbol = args.symbol
+    symbols = _symbols(args)
     horizon = args.horizon
 
-    candles = await_or_sync(get_timeseries(symbol, start - timedelta(days=60), end + timedelta(days=1)))
-    if len(candles) < 100:
-        raise ValueError("Not enough candles")
-
-    X_rows = []
-    y = []
-    dates = []
-    # Use every 5 trading days as an observation
-    for i in range(40, len(candles) - horizon, 5):
-        as_of = candles[i].ts
-        feats = to_feature_row(symbol, i, candles, horizon, as_of)
-        fwd = compute_forward_return(candles, i, horizon)
-        if np.isnan(fwd):
-            continue
-        X_rows.append(list(feats.values()))
-        y.append(1 if fwd > 0 else 0)
-        dates.append(as_of)
-
-    X = np.array(X_rows)
-    y = np.array(y)
+    if args.scaling:
+        _scaling(symbols, start, end, horizon, args.workers)
+        return
+    if args.symbol:
+        ds = asyncio.run(_build(args.symbol, start, end, horizon))
+    else:
+        ds, report = generate_universe(symbols, start, end, horizon, args.partials_dir, workers=args.workers)
+        print(f"built {report['built']}, resumed {report['resumed']}, failed {len(report['failed'])} "
+              f"-> {report['rows']} rows in {report['wall_s']:.1f}s ({report['speedup']:.1f}x parallel)")
+        for sym, err in report["failed"].items():
+            print(f"  {sym}: {err}")
+    X, y = ds.X, ds.y
     if len(y) < 50:
         raise ValueError("Not enough training samples")
 
+    # heavy, and only needed once the dataset is built
+    from sklearn.metrics import roc_auc_score
+    from lightgbm import LGBMClassifier
+
     # Train/valid split (time-based)
     split = int(len(y) * 0.8)
     Xtr, Xva = X[:split], X[split:]
@@ -130,9 +168,10 @@ def main():
     print(f"Validation AUC: {auc:.3f}")
 
     meta_spec = {
-        "feature_order": ["t_score", "t_conf", "f_score", "f_conf", "s_score", "s_conf", "m_exp", "m_conf"],
+        "feature_order": FEATURE_ORDER,
         "horizon": horizon,
-        "symbol": symbol,
+        "symbol": symbols[0] if len(symbols) == 1 else None,
+        "symbols": symbols,
         "auc": float(auc)
     }
     with open(args.outfile, "wb") as f:
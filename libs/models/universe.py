@@ -0,0 +1,140 @@
+from __future__ import annotations
+import asyncio
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from libs.models.dataset import FEATURE_ORDER, MetaDataset, build_symbol_dataset, versions_digest
+from libs.utils.http import clients
+from libs.utils.limits import Priority, max_sharers, request_priority, share_quotas
+
+# Training data for a symbol universe, one symbol per task on a process pool.
+#
+# - Every worker gets 1/workers of each provider quota (and of the in-flight caps), so
+#   the pool as a whole stays within the limits of the shared API keys. A worker keeps
+#   at least one call in flight, so there are never more workers than the smallest
+#   in-flight cap (max_sharers).
+# - Each finished symbol is written to its own partial file in `out_dir` (atomically).
+#   A rerun skips symbols whose partial exists, so an interrupted run resumes where it
+#   stopped. Partial names carry a digest of the feature and agent versions, so after a
+#   version change nothing is resumed from rows built by the old code.
+# - The partials are merged into one time-ordered set (ties broken by symbol).
+
+def read_universe(path: str) -> List[str]:
+    # one symbol per line; blank lines and "#" comments are ignored
+    out = []
+    for line in Path(path).read_text().splitlines():
+        sym = line.split("#", 1)[0].strip()
+        if sym:
+            out.append(sym.upper())
+    return list(dict.fromkeys(out))
+
+def partial_path(
+    out_dir: str, symbol: str, start: datetime, end: datetime, horizon_days: int, versions: Optional[str] = None,
+) -> Path:
+    versions = versions or versions_digest()
+    return Path(out_dir) / f"{symbol}_{start:%Y%m%d}_{end:%Y%m%d}_h{horizon_days}_{versions}.npz"
+
+def save_partial(ds: MetaDataset, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, symbol=np.array(ds.symbol), ts=ds.ts, X=ds.X, y=ds.y, fwd=ds.fwd)
+    os.replace(tmp, path)
+
+def load_partial(path: Path) -> MetaDataset:
+    with np.load(path) as z:
+        return MetaDataset(str(z["symbol"]), z["ts"], z["X"], z["y"], z["fwd"])
+
+def merge_datasets(parts: Sequence[MetaDataset]) -> MetaDataset:
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return MetaDataset(
+            "", np.empty(0, np.int64), np.empty((0, len(FEATURE_ORDER))),
+            np.empty(0, np.int64), np.empty(0), np.empty(0, str),
+        )
+    symbols = np.concatenate([np.full(len(p), p.symbol) for p in parts])
+    ts = np.concatenate([p.ts for p in parts])
+    order = np.lexsort((symbols, ts))
+    return MetaDataset(
+        ",".join(p.symbol for p in parts), ts[order],
+        np.concatenate([p.X for p in parts])[order], np.concatenate([p.y for p in parts])[order],
+        np.concatenate([p.fwd for p in parts])[order], symbols[order],
+    )
+
+def _init_worker(workers: int, extra: Optional[Callable[[], None]]) -> None:
+    share_quotas(1.0 / workers)
+    if extra is not None:
+        extra()
+
+async def _build(symbol: str, start: datetime, end: datetime, horizon_days: int) -> MetaDataset:
+    request_priority.set(Priority.BULK)
+    try:
+        return await build_symbol_dataset(symbol, start, end, horizon_days)
+    finally:
+        await clients.aclose()
+
+def _build_one(symbol: str, start: datetime, end: datetime, horizon_days: int, out_dir: str) -> Tuple[str, str, int, float]:
+    # -> (symbol, status, rows, seconds); runs in a worker process
+    path = partial_path(out_dir, symbol, start, end, horizon_days)
+    if path.exists():
+        return symbol, "resumed", len(load_partial(path)), 0.0
+    t0 = time.perf_counter()
+    try:
+        ds = asyncio.run(_build(symbol, start, end, horizon_days))
+    except Exception as e:
+        return symbol, f"error: {e}", 0, time.perf_counter() - t0
+    save_partial(ds, path)
+    return symbol, "built", len(ds), time.perf_counter() - t0
+
+def generate_universe(
+    symbols: Sequence[str],
+    start: datetime,
+    end: datetime,
+    horizon_days: int,
+    out_dir: str,
+    workers: Optional[int] = None,
+    worker_init: Optional[Callable[[], None]] = None,
+    log: Callable[[str], None] = print,
+) -> Tuple[MetaDataset, Dict]:
+    """Build (or resume) every symbol's partial dataset on a process pool and merge them.
+
+    Returns the merged time-ordered dataset and a report with per-status counts, wall
+    time and the summed per-symbol build time (their ratio is the parallel speedup).
+    """
+    asked = workers or os.cpu_count() or 1
+    workers = max(1, min(asked, len(symbols) or 1, max_sharers()))
+    if workers < min(asked, len(symbols) or 1):
+        log(f"workers capped at {workers} by the providers' in-flight limits")
+    t0 = time.perf_counter()
+    results: Dict[str, Tuple[str, int, float]] = {}
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=mp.get_context("spawn"),
+        initializer=_init_worker, initargs=(workers, worker_init),
+    ) as pool:
+        futures = [pool.submit(_build_one, s, start, end, horizon_days, out_dir) for s in symbols]
+        for i, fut in enumerate(as_completed(futures), 1):
+            symbol, status, rows, seconds = fut.result()
+            results[symbol] = (status, rows, seconds)
+            log(f"[{i}/{len(symbols)}] {symbol}: {status} ({rows} rows, {seconds:.1f}s)")
+    wall = time.perf_counter() - t0
+
+    ok = [s for s in symbols if not results[s][0].startswith("error")]
+    merged = merge_datasets([load_partial(partial_path(out_dir, s, start, end, horizon_days)) for s in ok])
+    busy = sum(sec for _, _, sec in results.values())
+    report = {
+        "workers": workers,
+        "symbols": len(symbols),
+        "built": sum(1 for st, _, _ in results.values() if st == "built"),
+        "resumed": sum(1 for st, _, _ in results.values() if st == "resumed"),
+        "failed": {s: st for s, (st, _, _) in results.items() if st.startswith("error")},
+        "rows": len(merged),
+        "wall_s": round(wall, 3),
+        "symbol_s": round(busy, 3),
+        "speedup": round(busy / wall, 2) if wall > 0 else 0.0,
+    }
+    return merged, report
@@ -0,0 +1,168 @@
+from __future__ import annotations
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+import numpy as np
+
+# Dynamic micro-batching in front of the sentiment model.
+#
+# Concurrent callers' texts are queued. A dispatcher waits for a free worker, then
+# closes a batch when it holds `max_batch` texts or `max_wait_ms` after its oldest text
+# arrived, whichever comes first. While every worker is busy texts keep accumulating,
+# so batches grow with load. Each batch is sorted by approximate token count so the
+# model pads as little as possible, run as one call, and the scores are routed back to
+# the callers in their original order.
+
+Scores = List[Tuple[float, float]]
+
+def approx_tokens(text: str) -> int:
+    # word-piece count is roughly 1.3x the word count; only the ordering matters here
+    return len(text.split())
+
+class _Entry:
+    __slots__ = ("texts", "future", "enqueued")
+
+    def __init__(self, texts: List[str], future: asyncio.Future):
+        self.texts = texts
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+class MicroBatcher:
+    def __init__(
+        self,
+        run: Callable[[List[str]], Awaitable[Scores]],
+        max_batch: int = 32,
+        max_wait_ms: float = 10.0,
+        max_in_flight: int = 1,
+        size_of: Callable[[str], int] = approx_tokens,
+    ):
+        self.run = run
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_in_flight = max(1, max_in_flight)
+        self.size_of = size_of
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Deque[_Entry] = deque()
+        self._queued = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._free: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        # running batches; the loop keeps only weak references to tasks
+        self._batches: Set[asyncio.Task] = set()
+        self._waits: Deque[float] = deque(maxlen=2048)
+        self.counters: Dict[str, Any] = {"batches": 0, "texts": 0, "max_batch_seen": 0, "full": 0, "timed_out": 0}
+
+    def _ensure(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # first use, or a new event loop: the old loop's primitives are unusable
+            self._loop = loop
+            self._queue.clear()
+            self._queued = 0
+            self._wake = asyncio.Event()
+            self._free = asyncio.Semaphore(self.max_in_flight)
+            self._dispatcher = None
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def submit(self, texts: List[str]) -> Scores:
+        if not texts:
+            return []
+        self._ensure()
+        futures = []
+        for i in range(0, len(texts), self.max_batch):
+            fut = self._loop.create_future()
+            self._queue.append(_Entry(texts[i:i + self.max_batch], fut))
+            self._queued += len(texts[i:i + self.max_batch])
+            futures.append(fut)
+        self._wake.set()
+        out: Scores = []
+        for part in await asyncio.gather(*futures):
+            out.extend(part)
+        return out
+
+    def close(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+
+    async def _dispatch(self) -> None:
+        while True:
+            await self._free.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._free.release()
+                raise
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _collect(self) -> List[_Entry]:
+        while not self._queue:
+            self._wake.clear()
+            await self._wake.wait()
+        deadline = self._queue[0].enqueued + self.max_wait
+        while self._queued < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        self.counters["full" if self._queued >= self.max_batch else "timed_out"] += 1
+        batch, n = [], 0
+        while self._queue and n + len(self._queue[0].texts) <= self.max_batch:
+            entry = self._queue.popleft()
+            n += len(entry.texts)
+            batch.append(entry)
+        self._queued -= n
+        return batch
+
+    async def _run_batch(self, batch: List[_Entry]) -> None:
+        try:
+            started = time.perf_counter()
+            live = [e for e in batch if not e.future.done()]  # drop cancelled callers
+            texts = [t for e in live for t in e.texts]
+            if not texts:
+                return
+            for e in live:
+                self._waits.append(started - e.enqueued)
+            order = np.argsort([self.size_of(t) for t in texts], kind="stable")
+            self.counters["batches"] += 1
+            self.counters["texts"] += len(texts)
+            self.counters["max_batch_seen"] = max(self.counters["max_batch_seen"], len(texts))
+            try:
+                sorted_scores = await self.run([texts[i] for i in order])
+            except Exception as e:
+                for entry in live:
+                    if not entry.future.done():
+                        entry.future.set_exception(e)
+                return
+            scores: Scores = [None] * len(texts)  # type: ignore[list-item]
+            for pos, i in enumerate(order):
+                scores[i] = sorted_scores[pos]
+            start = 0
+            for entry in live:
+                end = start + len(entry.texts)
+                if not entry.future.done():
+                    entry.future.set_result(scores[start:end])
+                start = end
+        finally:
+            self._free.release()
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.counters["batches"]
+        waits = np.array(self._waits) * 1000.0 if self._waits else np.zeros(1)
+        return {
+            **self.counters,
+            "mean_batch": self.counters["texts"] / batches if batches else 0.0,
+            "queued": self._queued,
+            "queue_wait_ms_p50": float(np.percentile(waits, 50)),
+            "queue_wait_ms_p99": float(np.percentile(waits, 99)),
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
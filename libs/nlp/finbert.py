@@ -1,18 +1,26 @@
 from __future__ import annotations
-from typing import List
+from typing import List, Tuple
 from transformers import AutoTokenizer, AutoModelForSequenceClassification, TextClassificationPipeline
 import torch
 from libs.schemas.models import NewsItem
+from libs.nlp.service import apply_scores, article_text
+from libs.utils.config import settings
 
 _MODEL_NAME = "ProsusAI/finbert"
 
 class FinBertSentiment:
-    def __init__(self, device: str | None = None):
+    def __init__(self, device: str | None = None, batch_size: int | None = None, threads: int | None = None):
+        threads = settings.sentiment_threads if threads is None else threads
+        if threads:
+            torch.set_num_threads(threads)
         self.tokenizer = AutoTokenizer.from_pretrained(_MODEL_NAME)
         self.model = AutoModelForSequenceClassification.from_pretrained(_MODEL_NAME)
         if device is None:
             device = "cuda" if torch.cuda.is_available() else "cpu"
         self.device = 0 if device == "cuda" else -1
+        # The service hands over length-sorted micro-batches, so each padded sub-batch
+        # of this size holds texts of similar length
+        self.batch_size = batch_size or settings.sentiment_model_batch
         self.pipeline = TextClassificationPipeline(
             model=self.model,
             tokenizer=self.tokenizer,
@@ -20,23 +28,24 @@ class FinBertSentiment:
             device=self.device
         )
 
-    def score_articles(self, items: List[NewsItem]) -> List[NewsItem]:
-        texts = [(n.title or "") + " " + (n.summary or "") for n in items]
+    def score_texts(self, texts: List[str]) -> List[Tuple[float, float]]:
+        # -> (signed score in [-1, 1], confidence) per text
         if not texts:
-            return items
+            return []
         # Batch processing
-        preds = self.pipeline(texts, batch_size=16, truncation=True, max_length=256)
+        preds = self.pipeline(texts, batch_size=self.batch_size, truncation=True, max_length=256)
         # Each pred is list of dicts for labels: ['positive','neutral','negative']
-        for n, scores in zip(items, preds):
+        out = []
+        for scores in preds:
             score_map = {s["label"].lower(): float(s["score"]) for s in scores}
             # Convert to a single signed score in [-1,1]
             pos = score_map.get("positive", 0.0)
             neg = score_map.get("negative", 0.0)
-            sent_score = pos - neg
-            conf = max(pos, neg, score_map.get("neutral", 0.0))
-            n.sentiment_score = sent_score
-            n.sentiment_confidence = conf
-        return items
+            out.append((pos - neg, max(pos, neg, score_map.get("neutral", 0.0))))
+        return out
+
+    def score_articles(self, items: List[NewsItem]) -> List[NewsItem]:
+        return apply_scores(items, self.score_texts([article_text(n) for n in items]))
 
 # Singleton-ish helper
 _finbert_instance: FinBertSentiment | None = None
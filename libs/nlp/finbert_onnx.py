@@ -0,0 +1,119 @@
+from __future__ import annotations
+import argparse
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Tuple
+import numpy as np
+from libs.utils.config import settings
+
+# FinBERT on ONNX Runtime for CPU-only nodes.
+#
+# The model is exported once from the PyTorch checkpoint (dynamic batch and sequence
+# axes) into `model_dir`, optionally with a dynamically int8-quantized copy next to it.
+# Inference tokenizes each sub-batch padded to its own longest text only, so length
+# sorted batches from the sentiment service carry little padding. Only onnxruntime and
+# the tokenizer are needed at run time; torch is needed for the export alone.
+#
+# Workers of a process pool may all find the model missing and export at once: each
+# exports into its own temporary directory and moves the files into place with
+# os.replace, the .onnx files last, so a model file is only ever seen whole and with its
+# tokenizer and config next to it.
+
+_MODEL_NAME = "ProsusAI/finbert"
+_MAX_LENGTH = 256
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+
+def export_onnx(model_dir: str, quantize: bool = True, opset: int = 14) -> Path:
+    final = Path(model_dir)
+    final.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f".{final.name}.", dir=final.parent))
+    try:
+        _export_into(tmp, quantize, opset)
+        models = {FP32_FILE, INT8_FILE}
+        for f in sorted(tmp.iterdir(), key=lambda f: (f.name in models, f.name == INT8_FILE)):
+            os.replace(f, final / f.name)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return final
+
+def _export_into(out: Path, quantize: bool, opset: int) -> None:
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(_MODEL_NAME)
+    model = AutoModelForSequenceClassification.from_pretrained(_MODEL_NAME).eval()
+    tokenizer.save_pretrained(out)
+    model.config.save_pretrained(out)
+    model.config.return_dict = False  # export a plain logits tensor
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    axes = {n: {0: "batch", 1: "sequence"} for n in names}
+    axes["logits"] = {0: "batch"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model, tuple(sample[n] for n in names), str(out / FP32_FILE),
+            input_names=names, output_names=["logits"], dynamic_axes=axes, opset_version=opset,
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(out / FP32_FILE), str(out / INT8_FILE), weight_type=QuantType.QInt8)
+
+class OnnxFinBertSentiment:
+    def __init__(
+        self,
+        model_dir: str | None = None,
+        quantized: bool = False,
+        threads: int | None = None,
+        batch_size: int | None = None,
+    ):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        model_dir = model_dir or settings.sentiment_onnx_dir
+        path = Path(model_dir) / (INT8_FILE if quantized else FP32_FILE)
+        if not path.exists():
+            export_onnx(model_dir, quantize=quantized)
+        opts = ort.SessionOptions()
+        threads = settings.sentiment_threads if threads is None else threads
+        if threads:
+            opts.intra_op_num_threads = threads
+            opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+        self.inputs = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        labels = AutoConfig.from_pretrained(model_dir).id2label
+        self.labels = [labels[i].lower() for i in range(len(labels))]
+        self.batch_size = batch_size or settings.sentiment_model_batch
+
+    def score_texts(self, texts: List[str]) -> List[Tuple[float, float]]:
+        # -> (signed score in [-1, 1], confidence) per text, same as the torch backend
+        out: List[Tuple[float, float]] = []
+        pos, neg = self.labels.index("positive"), self.labels.index("negative")
+        for i in range(0, len(texts), self.batch_size):
+            enc = self.tokenizer(
+                texts[i:i + self.batch_size], padding="longest", truncation=True,
+                max_length=_MAX_LENGTH, return_tensors="np",
+            )
+            feed = {k: v.astype(np.int64) for k, v in enc.items() if k in self.inputs}
+            logits = self.session.run(["logits"], feed)[0]
+            z = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs = z / z.sum(axis=1, keepdims=True)
+            out.extend(zip((probs[:, pos] - probs[:, neg]).tolist(), probs.max(axis=1).tolist()))
+        return out
+
+    def score_articles(self, items):
+        from libs.nlp.service import apply_scores, article_text
+        return apply_scores(items, self.score_texts([article_text(n) for n in items]))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export FinBERT to ONNX (and int8)")
+    parser.add_argument("--out", default=settings.sentiment_onnx_dir)
+    parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+    path = export_onnx(args.out, quantize=not args.no_quantize)
+    print(f"exported to {path}: {sorted(os.listdir(path))}")
@@ -0,0 +1,47 @@
+from __future__ import annotations
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from libs.utils.redis_cache import RedisCache
+
+# Per-article sentiment scores, content addressed: the key is a hash of the normalized
+# article text (what the model actually sees) plus the model version. The same article
+# fetched for another symbol or another news window maps to the same key, and bumping
+# the model version makes every old score unreachable instead of silently reused.
+
+Score = Tuple[float, float]
+
+_WS = re.compile(r"\s+")
+
+def normalize(text: str) -> str:
+    return _WS.sub(" ", text).strip().lower()
+
+class ArticleScoreCache:
+    def __init__(self, redis: RedisCache, model_version: str):
+        self.redis = redis
+        self.model_version = model_version
+        self.counters: Dict[str, int] = {"articles": 0, "cached": 0, "deduped": 0, "scored": 0, "errors": 0}
+
+    def key(self, text: str) -> str:
+        h = hashlib.sha256(normalize(text).encode()).hexdigest()
+        return f"sent:{self.model_version}:{h}"
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[Score]]:
+        try:
+            found = await self.redis.mget(list(keys))
+        except Exception:
+            # a cache outage means re-scoring, not failing the request
+            self.counters["errors"] += 1
+            return [None] * len(keys)
+        return [(v["s"], v["c"]) if v else None for v in found]
+
+    async def put_many(self, scores: Dict[str, Score]) -> None:
+        try:
+            await self.redis.mset({k: {"s": s, "c": c} for k, (s, c) in scores.items()})
+        except Exception:
+            self.counters["errors"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        n = self.counters["articles"]
+        avoided = self.counters["cached"] + self.counters["deduped"]
+        return {**self.counters, "model_version": self.model_version, "rescore_avoided_rate": avoided / n if n else 0.0}
@@ -0,0 +1,240 @@
+from __future__ import annotations
+import asyncio
+import multiprocessing as mp
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from libs.schemas.models import NewsItem
+from libs.nlp.batcher import MicroBatcher
+from libs.nlp.score_cache import ArticleScoreCache
+from libs.utils.config import settings
+from libs.utils.redis_cache import RedisCache
+
+# Sentiment scoring off the event loop.
+#
+# - Each worker (thread or process) loads its own model once, in the pool initializer.
+# - At most `max_queue` jobs are submitted or running; further callers wait for a slot
+#   and give up with SentimentUnavailable after `timeout_s`.
+# - A job not finished within `timeout_s` also raises SentimentUnavailable. A running
+#   forward pass cannot be interrupted, so its slot is only freed once it completes.
+# - With max_batch > 1, texts from concurrent callers are merged into shared passes by a
+#   MicroBatcher (libs/nlp/batcher.py), one batch in flight per worker.
+# - With a score cache, texts already scored by this model version are answered from it
+#   and only the rest reach the pool.
+#
+# Threads are the default since the forward pass releases the GIL. Processes keep the
+# tokenizer and any Python-side work off the server process too, at the cost of a model
+# copy per worker and pickling texts and scores.
+
+Scores = List[Tuple[float, float]]
+
+class SentimentUnavailable(RuntimeError):
+    pass
+
+_worker = threading.local()
+
+def _init_worker(factory: Callable[[], Any]) -> None:
+    _worker.model = factory()
+
+def _score_texts(texts: List[str]) -> Scores:
+    return _worker.model.score_texts(texts)
+
+def _noop() -> None:
+    return None
+
+def article_text(n: NewsItem) -> str:
+    return (n.title or "") + " " + (n.summary or "")
+
+def apply_scores(items: List[NewsItem], scores: Scores) -> List[NewsItem]:
+    for n, (sent_score, conf) in zip(items, scores):
+        n.sentiment_score = sent_score
+        n.sentiment_confidence = conf
+    return items
+
+def finbert_factory():
+    # sentiment_backend: "torch" (eager pipeline), "onnx" or "onnx-int8" (ONNX Runtime)
+    backend = settings.sentiment_backend
+    if backend in ("onnx", "onnx-int8"):
+        from libs.nlp.finbert_onnx import OnnxFinBertSentiment
+        return OnnxFinBertSentiment(quantized=backend == "onnx-int8")
+    if backend != "torch":
+        raise ValueError(f"unknown sentiment_backend {backend!r}")
+    from libs.nlp.finbert import FinBertSentiment
+    return FinBertSentiment()
+
+class SentimentService:
+    def __init__(
+        self,
+        factory: Callable[[], Any] = finbert_factory,
+        workers: int = 1,
+        executor: str = "thread",
+        max_queue: int = 32,
+        timeout_s: float = 20.0,
+        score_cache: Optional[ArticleScoreCache] = None,
+        max_batch: int = 1,
+        max_wait_ms: float = 0.0,
+    ):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"executor must be 'thread' or 'process', got {executor!r}")
+        self.factory = factory
+        self.workers = workers
+        self.kind = executor
+        self.max_queue = max_queue
+        self.timeout_s = timeout_s
+        self.score_cache = score_cache
+        # max_batch > 1 merges concurrent callers' texts into shared forward passes
+        self.batcher = MicroBatcher(self._run, max_batch, max_wait_ms, max_in_flight=workers) if max_batch > 1 else None
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._slot_freed: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.counters: Dict[str, int] = {"submitted": 0, "completed": 0, "failed": 0, "timeouts": 0, "rejected": 0}
+
+    def _executor(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=mp.get_context("spawn"),
+                    initializer=_init_worker, initargs=(self.factory,),
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="sentiment",
+                    initializer=_init_worker, initargs=(self.factory,),
+                )
+        return self._pool
+
+    def start(self) -> List[Future]:
+        # Spin up every worker now so the first request doesn't pay for model loading
+        pool = self._executor()
+        return [pool.submit(_noop) for _ in range(self.workers)]
+
+    def close(self) -> None:
+        if self.batcher is not None:
+            self.batcher.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _event(self) -> asyncio.Event:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._slot_freed = loop, asyncio.Event()
+        return self._slot_freed
+
+    def _release(self, _fut: Future) -> None:
+        # runs in the worker's completion thread
+        with self._lock:
+            self._pending -= 1
+        loop, event = self._loop, self._slot_freed
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass
+
+    async def _acquire(self) -> None:
+        event = self._event()
+        deadline = asyncio.get_running_loop().time() + self.timeout_s
+        while True:
+            with self._lock:
+                if self._pending < self.max_queue:
+                    self._pending += 1
+                    return
+            event.clear()
+            remaining = deadline - asyncio.get_running_loop().time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                self.counters["rejected"] += 1
+                raise SentimentUnavailable(f"sentiment queue full ({self.max_queue} jobs)") from None
+
+    async def score_texts(self, texts: List[str]) -> Scores:
+        if not texts:
+            return []
+        cache = self.score_cache
+        if cache is None:
+            return await self._infer(texts)
+        # Only texts with no cached score for this model version go to the pool, and
+        # each distinct text once
+        keys = [cache.key(t) for t in texts]
+        found = await cache.get_many(keys)
+        todo: Dict[str, str] = {}
+        for k, t, f in zip(keys, texts, found):
+            if f is None and k not in todo:
+                todo[k] = t
+        fresh = dict(zip(todo, await self._infer(list(todo.values())))) if todo else {}
+        if fresh:
+            await cache.put_many(fresh)
+        cached = sum(f is not None for f in found)
+        cache.counters["articles"] += len(texts)
+        cache.counters["cached"] += cached
+        cache.counters["scored"] += len(todo)
+        cache.counters["deduped"] += len(texts) - cached - len(todo)
+        return [f if f is not None else fresh[k] for k, f in zip(keys, found)]
+
+    async def _infer(self, texts: List[str]) -> Scores:
+        if self.batcher is None:
+            return await self._run(texts)
+        try:
+            # the budget covers waiting for a batch slot as well as the pass itself
+            return await asyncio.wait_for(self.batcher.submit(texts), self.timeout_s)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise SentimentUnavailable(f"sentiment scoring exceeded {self.timeout_s}s") from None
+
+    async def _run(self, texts: List[str]) -> Scores:
+        await self._acquire()
+        try:
+            fut = self._executor().submit(_score_texts, list(texts))
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        fut.add_done_callback(self._release)
+        self.counters["submitted"] += 1
+        try:
+            scores = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)), self.timeout_s)
+        except asyncio.TimeoutError:
+            fut.cancel()  # only takes effect if it never started
+            self.counters["timeouts"] += 1
+            raise SentimentUnavailable(f"sentiment scoring exceeded {self.timeout_s}s") from None
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        self.counters["completed"] += 1
+        return scores
+
+    async def score_articles(self, items: List[NewsItem]) -> List[NewsItem]:
+        return apply_scores(items, await self.score_texts([article_text(n) for n in items]))
+
+    def stats(self) -> Dict[str, Any]:
+        out = {**self.counters, "pending": self._pending, "workers": self.workers, "executor": self.kind}
+        if self.score_cache is not None:
+            out["cache"] = self.score_cache.stats()
+        if self.batcher is not None:
+            out["batching"] = self.batcher.stats()
+        return out
+
+_service: Optional[SentimentService] = None
+
+def get_sentiment_service() -> SentimentService:
+    global _service
+    if _service is None:
+        _service = SentimentService(
+            workers=settings.sentiment_workers,
+            executor=settings.sentiment_executor,
+            max_queue=settings.sentiment_max_queue,
+            timeout_s=settings.sentiment_timeout_s,
+            # int8 scores differ slightly from fp32 ones, so the backend is part of the version
+            score_cache=ArticleScoreCache(
+                RedisCache(ttl=settings.sentiment_cache_ttl_s),
+                f"{settings.sentiment_model_version}:{settings.sentiment_backend}",
+            ),
+            max_batch=settings.sentiment_max_batch,
+            max_wait_ms=settings.sentiment_max_wait_ms,
+        )
+    return _service
@@ -0,0 +1,180 @@
+from __future__ import annotations
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Union
+import numpy as np
+from libs.schemas.models import Candle
+
+# Columnar OHLCV container. The symbol/interval/source are stored once; timestamps are
+# int64 nanoseconds since the Unix epoch (UTC) and prices/volume are float64 arrays.
+# Slicing (by position or by date) returns views, never copies.
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def to_ns(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    d = dt - EPOCH
+    return (d.days * 86400 + d.seconds) * 1_000_000_000 + d.microseconds * 1000
+
+def from_ns(ns: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(ns) // 1000)
+
+
+class CandleFrame:
+    __slots__ = ("symbol", "interval", "source", "ts", "open", "high", "low", "close", "volume")
+
+    def __init__(
+        self,
+        symbol: str,
+        ts: np.ndarray,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+        interval: str = "1d",
+        source: str = "alpha_vantage",
+    ):
+        self.symbol = symbol
+        self.interval = interval
+        self.source = source
+        self.ts = np.asarray(ts, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+        n = len(self.ts)
+        if any(len(getattr(self, c)) != n for c in COLUMNS):
+            raise ValueError("CandleFrame columns must have equal length")
+
+    @classmethod
+    def empty(cls, symbol: str, interval: str = "1d", source: str = "alpha_vantage") -> "CandleFrame":
+        z = np.empty(0)
+        return cls(symbol, np.empty(0, dtype=np.int64), z, z, z, z, z, interval=interval, source=source)
+
+    def _with(self, sl) -> "CandleFrame":
+        return CandleFrame(
+            self.symbol, self.ts[sl], self.open[sl], self.high[sl], self.low[sl], self.close[sl], self.volume[sl],
+            interval=self.interval, source=self.source,
+        )
+
+    def copy(self) -> "CandleFrame":
+        return CandleFrame(
+            self.symbol, self.ts.copy(), *(getattr(self, c).copy() for c in COLUMNS),
+            interval=self.interval, source=self.source,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __getitem__(self, key: Union[int, slice]):
+        if isinstance(key, slice):
+            return self._with(key)
+        return self.candle(key)
+
+    def __iter__(self) -> Iterator[Candle]:
+        for i in range(len(self)):
+            yield self.candle(i)
+
+    def __repr__(self) -> str:
+        span = f"{self.ts_at(0).date()}..{self.ts_at(-1).date()}" if len(self) else "empty"
+        return f"CandleFrame({self.symbol!r}, {self.interval}, n={len(self)}, {span})"
+
+    def candle(self, i: int) -> Candle:
+        return Candle(
+            symbol=self.symbol,
+            ts=from_ns(self.ts[i]),
+            open=float(self.open[i]),
+            high=float(self.high[i]),
+            low=float(self.low[i]),
+            close=float(self.close[i]),
+            volume=float(self.volume[i]),
+            interval=self.interval,
+            source=self.source,
+        )
+
+    def ts_at(self, i: int) -> datetime:
+        return from_ns(self.ts[i])
+
+    @property
+    def first_ts(self) -> Optional[datetime]:
+        return from_ns(self.ts[0]) if len(self) else None
+
+    @property
+    def last_ts(self) -> Optional[datetime]:
+        return from_ns(self.ts[-1]) if len(self) else None
+
+    def index_at(self, as_of: datetime) -> int:
+        # Position of the last bar at or before as_of, -1 if there is none
+        return int(np.searchsorted(self.ts, to_ns(as_of), side="right")) - 1
+
+    def between(self, start: Optional[datetime], end: Optional[datetime]) -> "CandleFrame":
+        # Inclusive date range as a view
+        lo = 0 if start is None else int(np.searchsorted(self.ts, to_ns(start), side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.ts, to_ns(end), side="right"))
+        return self._with(slice(lo, hi))
+
+    def merge(self, other: "CandleFrame") -> "CandleFrame":
+        # Union by timestamp; rows from `other` win on duplicates
+        if not len(other):
+            return self
+        if not len(self):
+            return other
+        if other.ts[0] > self.ts[-1]:
+            keep = np.ones(len(self), dtype=bool)
+        else:
+            keep = ~np.isin(self.ts, other.ts)
+        ts = np.concatenate([self.ts[keep], other.ts])
+        order = np.argsort(ts, kind="stable")
+        cols = {c: np.concatenate([getattr(self, c)[keep], getattr(other, c)])[order] for c in COLUMNS}
+        return CandleFrame(self.symbol, ts[order], interval=self.interval, source=self.source, **cols)
+
+    @classmethod
+    def from_candles(cls, candles: List[Candle]) -> "CandleFrame":
+        if not candles:
+            raise ValueError("No candles provided")
+        first = candles[0]
+        return cls(
+            first.symbol,
+            np.fromiter((to_ns(c.ts) for c in candles), dtype=np.int64, count=len(candles)),
+            *(np.fromiter((getattr(c, col) for c in candles), dtype=np.float64, count=len(candles)) for col in COLUMNS),
+            interval=first.interval,
+            source=first.source,
+        )
+
+    def to_candles(self) -> List[Candle]:
+        return list(self)
+
+    @classmethod
+    def from_pandas(cls, df, symbol: str, interval: str = "1d", source: str = "alpha_vantage") -> "CandleFrame":
+        # df: DatetimeIndex (UTC) with open/high/low/close/volume columns
+        idx = df.index
+        if idx.tz is None:
+            idx = idx.tz_localize("UTC")
+        ts = idx.tz_convert("UTC").as_unit("ns").asi8
+        cols = {c: df[c].to_numpy(dtype=np.float64) for c in COLUMNS}
+        return cls(symbol, ts, interval=interval, source=source, **cols)
+
+    def to_pandas(self):
+        import pandas as pd
+        index = pd.DatetimeIndex(self.ts.view("datetime64[ns]")).tz_localize("UTC")
+        return pd.DataFrame({c: getattr(self, c) for c in COLUMNS}, index=index)
+
+    def to_dict(self, arrays: bool = False) -> Dict[str, Any]:
+        # arrays=True keeps the numpy columns (for the binary cache codec), otherwise lists
+        conv = (lambda a: a) if arrays else (lambda a: a.tolist())
+        out: Dict[str, Any] = {"symbol": self.symbol, "interval": self.interval, "source": self.source, "ts": conv(self.ts)}
+        for c in COLUMNS:
+            out[c] = conv(getattr(self, c))
+        return out
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "CandleFrame":
+        # np.asarray: decoded cache columns are used in place
+        return cls(
+            d["symbol"], np.asarray(d["ts"], dtype=np.int64), *(np.asarray(d[c], dtype=np.float64) for c in COLUMNS),
+            interval=d.get("interval", "1d"), source=d.get("source", "alpha_vantage"),
+        )
@@ -0,0 +1,86 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, List
+import numpy as np
+from libs.schemas.frame import from_ns, to_ns
+from libs.schemas.models import FundamentalsSnapshot
+
+# Point-in-time fundamentals history: one row per quarterly filing, sorted by the date
+# the filing became public (not the fiscal period end), so an as-of lookup never sees a
+# statement that was filed after it. Values are float64 columns with NaN for missing.
+
+FIELDS = ("pe", "roe", "debt_to_equity", "revenue_ttm", "eps_ttm", "profit_margin", "growth_rev_yoy")
+
+class FundamentalsHistory:
+    __slots__ = ("symbol", "source", "filed", "period", "cols")
+
+    def __init__(
+        self,
+        symbol: str,
+        filed: np.ndarray,
+        period: np.ndarray,
+        cols: Dict[str, np.ndarray],
+        source: str = "fmp",
+    ):
+        self.symbol = symbol
+        self.source = source
+        self.filed = np.asarray(filed, dtype=np.int64)
+        self.period = np.asarray(period, dtype=np.int64)
+        self.cols = {f: np.asarray(cols[f], dtype=np.float64) for f in FIELDS}
+        if len(self.period) != len(self.filed) or any(len(c) != len(self.filed) for c in self.cols.values()):
+            raise ValueError("FundamentalsHistory columns must have equal length")
+        if len(self.filed) > 1 and np.any(np.diff(self.filed) < 0):
+            raise ValueError("FundamentalsHistory must be sorted by filing date")
+
+    @classmethod
+    def empty(cls, symbol: str, source: str = "fmp") -> "FundamentalsHistory":
+        z = np.empty(0)
+        return cls(symbol, np.empty(0, np.int64), np.empty(0, np.int64), {f: z for f in FIELDS}, source)
+
+    @classmethod
+    def from_rows(cls, symbol: str, rows: List[Dict[str, Any]], source: str = "fmp") -> "FundamentalsHistory":
+        # rows: {"filed": datetime, "period": datetime, <FIELDS>: float | None}, any order
+        rows = sorted(rows, key=lambda r: (r["filed"], r["period"]))
+        cols = {f: np.array([np.nan if r.get(f) is None else r[f] for r in rows], dtype=np.float64) for f in FIELDS}
+        return cls(
+            symbol,
+            np.array([to_ns(r["filed"]) for r in rows], dtype=np.int64),
+            np.array([to_ns(r["period"]) for r in rows], dtype=np.int64),
+            cols, source,
+        )
+
+    def __len__(self) -> int:
+        return len(self.filed)
+
+    def __repr__(self) -> str:
+        span = f"{from_ns(self.filed[0]).date()}..{from_ns(self.filed[-1]).date()}" if len(self) else "empty"
+        return f"FundamentalsHistory({self.symbol!r}, n={len(self)}, {span})"
+
+    def index_at(self, ts_ns: np.ndarray) -> np.ndarray:
+        # Row of the latest filing at or before each timestamp, -1 where there is none
+        return np.searchsorted(self.filed, np.asarray(ts_ns, dtype=np.int64), side="right") - 1
+
+    def snapshot(self, i: int, as_of: datetime) -> FundamentalsSnapshot:
+        if i < 0:
+            return FundamentalsSnapshot(symbol=self.symbol, as_of=as_of, source=self.source)
+        vals = {f: (None if np.isnan(v) else float(v)) for f, v in ((f, self.cols[f][i]) for f in FIELDS)}
+        period = from_ns(self.period[i])
+        return FundamentalsSnapshot(
+            symbol=self.symbol, as_of=period, source=self.source,
+            filing_recency_days=max(0, (as_of - period).days), **vals,
+        )
+
+    def at(self, as_of: datetime) -> FundamentalsSnapshot:
+        # What was known at as_of: the latest statement filed by then
+        return self.snapshot(int(self.index_at(to_ns(as_of))), as_of)
+
+    def to_dict(self, arrays: bool = False) -> Dict[str, Any]:
+        conv = (lambda a: a) if arrays else (lambda a: a.tolist())
+        out: Dict[str, Any] = {"symbol": self.symbol, "source": self.source, "filed": conv(self.filed), "period": conv(self.period)}
+        for f in FIELDS:
+            out[f] = conv(self.cols[f])
+        return out
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "FundamentalsHistory":
+        return cls(d["symbol"], d["filed"], d["period"], {f: d[f] for f in FIELDS}, d.get("source", "fmp"))
@@ -5,6 +5,7 @@ from datetime import datetime
 
 
 Signal = Literal["buy", "hold", "sell"]
+Interval = Literal["1min", "5min", "15min", "1h", "1d"]
 
 class Candle(BaseModel):
     symbol: str
@@ -14,7 +15,7 @@ class Candle(BaseModel):
     low: float
     close: float
     volume: float
-    interval: Literal["1min", "5min", "15min", "1h", "1d"] = "1d"
+    interval: Interval = "1d"
     source: str = "alpha_vantage"
 
 class FundamentalsSnapshot(BaseModel):
@@ -53,7 +54,7 @@ class TechnicalFeatures(BaseModel):
     atr: Optional[float] = None
     sma_20: Optional[float] = None
     ema_50: Optional[float] = None
-    feature_version: str = "tech_v1"
+    feature_version: str = "tech_v2"
 
 class FundamentalFeatures(BaseModel):
     symbol: str
@@ -120,4 +121,8 @@ class EnsembleDecision(BaseModel):
     size: float = Field(..., ge=0.0, le=1.0)  # position fraction
     rationale: Optional[str] = None
     versions: Dict[str, str] = {}
-    inputs_hash: Optional[str] = None
\ No newline at end of file
+    inputs_hash: Optional[str] = None
+
+class BatchAnalyzeRequest(BaseModel):
+    symbols: List[str] = Field(..., min_length=1)
+    horizons: List[int] = [5]
@@ -1,11 +1,54 @@
+import asyncio
+import sys
 import time
 import hashlib
-from typing import Any, Dict, Tuple
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+def approx_size(value: Any, _depth: int = 0) -> int:
+    # Rough byte estimate for budgeting; exact accounting is not the goal
+    if _depth > 4:
+        return sys.getsizeof(value)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(approx_size(v, _depth + 1) for v in value)
+    if hasattr(value, "__slots__"):
+        return sys.getsizeof(value) + sum(approx_size(getattr(value, s, None), _depth + 1) for s in value.__slots__)
+    return sys.getsizeof(value)
 
 class InMemoryTTLCache:
-    def __init__(self, ttl_seconds: int = 300):
+    """Bounded TTL cache with LRU eviction.
+
+    Entries are evicted least-recently-used first once `max_entries` or the approximate
+    `max_bytes` budget is exceeded, and expired entries are swept every `sweep_interval_s`.
+    With `stale_ttl_seconds` > 0, `get_or_load` serves an entry that is up to that much past
+    its TTL immediately and refreshes it in the background.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 300,
+        max_entries: int = 10_000,
+        max_bytes: Optional[int] = None,
+        stale_ttl_seconds: int = 0,
+        sweep_interval_s: float = 60.0,
+    ):
         self.ttl = ttl_seconds
-        self.store: Dict[str, Tuple[float, Any]] = {}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl_seconds
+        self.sweep_interval = sweep_interval_s
+        self.store: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self.bytes = 0
+        self.counters: Dict[str, int] = {"hits": 0, "misses": 0, "stale_hits": 0, "evictions": 0, "expired": 0, "refreshes": 0}
+        self._last_sweep = self._now()
+        self._refreshing: Set[str] = set()
+        # the loop keeps only weak references to tasks: hold background refreshes here
+        self._tasks: Set[asyncio.Task] = set()
 
     def _now(self) -> float:
         return time.time()
@@ -13,20 +56,93 @@ class InMemoryTTLCache:
     def _expired(self, ts: float) -> bool:
         return (self._now() - ts) > self.ttl
 
-    def get(self, key: str):
+    def _dead(self, ts: float) -> bool:
+        return (self._now() - ts) > self.ttl + self.stale_ttl
+
+    def _drop(self, key: str) -> None:
+        item = self.store.pop(key, None)
+        if item is not None:
+            self.bytes -= item[2]
+
+    def _maybe_sweep(self) -> None:
+        now = self._now()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        for key in [k for k, (ts, _, _) in self.store.items() if self._dead(ts)]:
+            self._drop(key)
+            self.counters["expired"] += 1
+
+    def _lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        # -> (value, fresh); value None means miss
+        self._maybe_sweep()
         item = self.store.get(key)
         if not item:
+            return None, False
+        ts, value, _ = item
+        if self._dead(ts):
+            self._drop(key)
+            self.counters["expired"] += 1
+            return None, False
+        self.store.move_to_end(key)
+        return value, not self._expired(ts)
+
+    def get(self, key: str):
+        value, fresh = self._lookup(key)
+        if value is None or not fresh:
+            self.counters["misses"] += 1
             return None
-        ts, value = item
-        if self._expired(ts):
-            self.store.pop(key, None)
-            return None
+        self.counters["hits"] += 1
         return value
 
     def set(self, key: str, value: Any):
-        self.store[key] = (self._now(), value)
+        self._drop(key)
+        size = approx_size(value)
+        self.store[key] = (self._now(), value, size)
+        self.bytes += size
+        while self.store and (
+            len(self.store) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self.store))
+            if oldest == key and len(self.store) == 1:
+                break
+            self._drop(oldest)
+            self.counters["evictions"] += 1
+        self._maybe_sweep()
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value, fresh = self._lookup(key)
+        if value is not None and fresh:
+            self.counters["hits"] += 1
+            return value
+        if value is not None:
+            # stale but within the grace window: answer now, refresh behind the caller
+            self.counters["stale_hits"] += 1
+            if key not in self._refreshing:
+                self._refreshing.add(key)
+                task = asyncio.get_running_loop().create_task(self._refresh(key, loader))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return value
+        self.counters["misses"] += 1
+        value = await loader()
+        self.set(key, value)
+        return value
+
+    async def _refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            self.set(key, await loader())
+            self.counters["refreshes"] += 1
+        except Exception:
+            # keep serving the stale value until it ages out
+            pass
+        finally:
+            self._refreshing.discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "entries": len(self.store), "bytes": self.bytes}
 
 def hash_dict(d: Dict) -> str:
     m = hashlib.sha256()
     m.update(repr(sorted(d.items())).encode())
-    return m.hexdigest()
\ No newline at end of file
+    return m.hexdigest()
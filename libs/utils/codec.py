@@ -0,0 +1,142 @@
+from __future__ import annotations
+import json
+import struct
+import zlib
+from typing import Any, List, Tuple
+import numpy as np
+
+# Compact binary encoding for cache payloads.
+#
+#   MAGIC | compression (1 byte) | body
+#   body  = u32 header length | header | array buffers
+#
+# The header is the value with every numpy array replaced by a reference to its dtype,
+# shape, encoding and position in the buffer section (msgpack when installed, JSON
+# otherwise). Arrays are written as little-endian columns:
+#   - int64 columns (timestamps) are delta encoded,
+#   - float64 columns that are exact decimals (quotes with <= 4 places, share volumes) are
+#     stored as delta encoded scaled integers; the round trip is verified, so lossless,
+#   - every 8-byte column is byte-shuffled so compression sees the slowly changing high
+#     bytes together,
+# then the body is compressed with zstd or lz4 when available and zlib otherwise.
+
+MAGIC = b"MB\x01"
+_ND = "__nd__"
+
+try:
+    import msgpack  # type: ignore
+except ImportError:  # pragma: no cover - optional
+    msgpack = None
+
+try:
+    import zstandard  # type: ignore
+    _zc, _zd = zstandard.ZstdCompressor(level=3), zstandard.ZstdDecompressor()
+except ImportError:  # pragma: no cover - optional
+    zstandard = None
+
+try:
+    import lz4.frame as lz4f  # type: ignore
+except ImportError:  # pragma: no cover - optional
+    lz4f = None
+
+_NONE, _ZLIB, _ZSTD, _LZ4 = 0, 1, 2, 3
+_HDR_JSON, _HDR_MSGPACK = 0, 1
+
+def _compress(body: bytes) -> Tuple[int, bytes]:
+    if zstandard is not None:
+        return _ZSTD, _zc.compress(body)
+    if lz4f is not None:
+        return _LZ4, lz4f.compress(body)
+    return _ZLIB, zlib.compress(body, 1)
+
+def _decompress(kind: int, body: bytes) -> bytes:
+    if kind == _NONE:
+        return body
+    if kind == _ZLIB:
+        return zlib.decompress(body)
+    if kind == _ZSTD:
+        return _zd.decompress(body)
+    if kind == _LZ4:
+        return lz4f.decompress(body)
+    raise ValueError(f"Unknown compression {kind}")
+
+_RAW, _DELTA, _DECIMAL = 0, 1, 2
+_DECIMAL_PLACES = (0, 2, 4)
+
+def _shuffle(a: np.ndarray) -> bytes:
+    return a.view(np.uint8).reshape(-1, a.itemsize).T.tobytes()
+
+def _unshuffle(buf, dtype: np.dtype, n: int) -> np.ndarray:
+    return np.frombuffer(buf, dtype=np.uint8).reshape(dtype.itemsize, n).T.copy().view(dtype).reshape(n)
+
+def _encode_array(arr: np.ndarray) -> Tuple[int, int, bytes]:
+    flat = arr.reshape(-1)
+    if flat.size and arr.dtype == np.int64:
+        return _DELTA, 0, _shuffle(np.diff(flat, prepend=np.int64(0)))
+    if flat.size and arr.dtype == np.float64 and np.isfinite(flat).all():
+        for places in _DECIMAL_PLACES:
+            scale = 10.0 ** places
+            q = np.round(flat * scale)
+            if np.abs(q).max() < 2 ** 53 and np.array_equal(q / scale, flat):
+                return _DECIMAL, places, _shuffle(np.diff(q.astype(np.int64), prepend=np.int64(0)))
+    return _RAW, 0, arr.tobytes()
+
+def _decode_array(enc: int, places: int, dtype: np.dtype, shape, buf) -> np.ndarray:
+    if enc == _RAW:
+        return np.frombuffer(buf, dtype=dtype).reshape(shape)
+    n = int(np.prod(shape))
+    ints = np.cumsum(_unshuffle(buf, np.dtype("<i8"), n))
+    if enc == _DELTA:
+        return ints.reshape(shape)
+    return (ints / (10.0 ** places)).reshape(shape)
+
+def _strip(value: Any, buffers: List[bytes], offset: List[int]) -> Any:
+    if isinstance(value, np.ndarray):
+        arr = np.ascontiguousarray(value)
+        if arr.dtype.byteorder == ">":
+            arr = arr.astype(arr.dtype.newbyteorder("<"))
+        enc, places, data = _encode_array(arr)
+        ref = {_ND: [arr.dtype.str, list(arr.shape), offset[0], len(data), enc, places]}
+        buffers.append(data)
+        offset[0] += len(data)
+        return ref
+    if isinstance(value, dict):
+        return {k: _strip(v, buffers, offset) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_strip(v, buffers, offset) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _restore(value: Any, data: memoryview) -> Any:
+    if isinstance(value, dict):
+        ref = value.get(_ND)
+        if ref is not None and len(value) == 1:
+            dtype, shape, off, n, enc, places = ref
+            return _decode_array(enc, places, np.dtype(dtype), tuple(shape), data[off:off + n])
+        return {k: _restore(v, data) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_restore(v, data) for v in value]
+    return value
+
+def encode(value: Any, compress: bool = True) -> bytes:
+    buffers: List[bytes] = []
+    header_obj = _strip(value, buffers, [0])
+    if msgpack is not None:
+        fmt, header = _HDR_MSGPACK, msgpack.packb(header_obj, use_bin_type=True)
+    else:
+        fmt, header = _HDR_JSON, json.dumps(header_obj, separators=(",", ":")).encode()
+    body = struct.pack("<BI", fmt, len(header)) + header + b"".join(buffers)
+    kind, body = _compress(body) if compress else (_NONE, body)
+    return MAGIC + bytes([kind]) + body
+
+def decode(raw: bytes) -> Any:
+    if not raw.startswith(MAGIC):
+        # values written before the binary codec
+        return json.loads(raw)
+    body = _decompress(raw[len(MAGIC)], raw[len(MAGIC) + 1:])
+    fmt, hlen = struct.unpack_from("<BI", body)
+    start = struct.calcsize("<BI")
+    header = body[start:start + hlen]
+    header_obj = msgpack.unpackb(header, raw=False) if fmt == _HDR_MSGPACK else json.loads(header)
+    return _restore(header_obj, memoryview(body)[start + hlen:])
@@ -7,22 +7,92 @@ class Settings(BaseSettings):
     news_api_key: str = Field(default="", alias="NEWS_API_KEY")
     fmp_api_key: str = Field(default="", alias="FMP_API_KEY")
 
+    # Provider quotas (0 = unlimited) and in-flight caps
+    alpha_vantage_per_minute: int = 75
+    alpha_vantage_per_day: int = 0
+    alpha_vantage_concurrency: int = 2
+    newsapi_per_minute: int = 60
+    newsapi_per_day: int = 1000
+    newsapi_concurrency: int = 5
+    fmp_per_minute: int = 300
+    fmp_per_day: int = 0
+    fmp_concurrency: int = 3
+
     # Orchestrator
     request_timeout_s: int = 8
     cache_ttl_s: int = 300
+    cache_max_entries: int = 5000
+    cache_max_bytes: int = 256 * 1024 * 1024
+    cache_stale_s: int = 0  # stale-while-revalidate window, 0 disables
+    cache_sweep_interval_s: float = 60.0
     max_retries: int = 2
+    warm_up_on_start: bool = False  # load sentiment/meta models at startup, not first use
+    batch_concurrency: int = 16  # symbols analyzed at once in POST /analyze/batch
+    batch_chunk_size: int = 50  # symbols per batched cache lookup / FinBERT pass
+    batch_max_symbols: int = 1000
+
+    # Pooled HTTP clients (one per provider origin)
+    http_max_connections: int = 20
+    http_max_keepalive: int = 10
+    http_keepalive_expiry_s: float = 30.0
+    http2: bool = False
+    indicator_state_ttl_s: int = 7 * 24 * 3600
+    indicator_state_max_entries: int = 5000  # live states kept in process
 
     # Backtest
     slippage_bps: float = 5.0
     fee_bps: float = 1.0
+    # Persisted runs, resumed when the same configuration is rerun with a later end
+    backtest_state_dir: str = "data/backtests"
 
     # Models
     meta_model_path: str = "models/meta_lgbm.pkl"
+    # meta-ensemble prob_up cutoffs for buy / sell signals
+    ensemble_buy_threshold: float = 0.55
+    ensemble_sell_threshold: float = 0.45
     use_remote_price_model: bool = False
     price_model_url: str = "http://localhost:9000/predict"
 
-    # Redis
+    # Sentiment inference pool ("thread" or "process"), one model per worker
+    sentiment_executor: str = "thread"
+    sentiment_workers: int = 1
+    sentiment_max_queue: int = 32  # jobs submitted or running before callers wait
+    sentiment_timeout_s: float = 20.0
+    # Cross-request micro-batching: a pass runs once max_batch texts are queued or the
+    # oldest has waited max_wait_ms
+    sentiment_max_batch: int = 64
+    sentiment_max_wait_ms: float = 10.0
+    sentiment_model_batch: int = 16  # padded sub-batch size inside one model call
+    sentiment_backend: str = "torch"  # "torch", "onnx" or "onnx-int8"
+    sentiment_onnx_dir: str = "models/finbert-onnx"
+    sentiment_threads: int = 0  # intra-op threads per worker, 0 = runtime default
+    # Per-article scores are cached under this version; bump it when the model changes
+    sentiment_model_version: str = "finbert-prosus-v1"
+    sentiment_cache_ttl_s: int = 90 * 24 * 3600
+
+    # Local OHLCV history store
+    ohlcv_store_dir: str = "data/ohlcv"
+    ohlcv_refresh_s: int = 6 * 3600
+    ts_cache_ttl_s: int = 24 * 3600
+    # Intraday history is stored as 1min bars (fetched a month at a time); 5min/15min/1h
+    # and intraday-derived 1d bars are resampled from it on read
+    intraday_refresh_s: int = 60
+    intraday_extended_hours: bool = False
+    intraday_lookback_days: int = 30  # history behind an intraday /analyze request
+    market_tz: str = "America/New_York"  # exchange clock: provider timestamps, day boundaries
+    # Quarterly fundamentals history per symbol, re-fetched once a day for new filings
+    fmp_history_quarters: int = 80
+    fund_history_ttl_s: int = 24 * 3600
+    # Local news archive; windows past its end are re-fetched after news_refresh_s
+    news_archive_dir: str = "data/news"
+    news_refresh_s: int = 15 * 60
+    news_max_pages: int = 4  # provider pages per missing range
+
+    # Redis (L2) and the in-process L1 in front of it
     redis_url: str = "redis://localhost:6379/0"
+    l1_cache_ttl_s: int = 30
+    l1_cache_max_entries: int = 2000
+    l1_cache_max_bytes: int = 128 * 1024 * 1024
 
     # Providers base URLs
     fmp_base: str = "https://financialmodelingprep.com/api/v3"
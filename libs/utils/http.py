@@ -1,12 +1,108 @@
 from __future__ import annotations
 import asyncio
-from typing import Any, Dict, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from urllib.parse import urlsplit
 import httpx
 import random
+from libs.utils.config import settings
+from libs.utils.limits import RateLimiter
 
 class HttpError(Exception):
     pass
 
+class ClientRegistry:
+    # One long-lived AsyncClient per provider origin (scheme://host:port), so connections
+    # and TLS sessions are reused across calls. Clients belong to the event loop that
+    # created them; if a different loop asks (e.g. a script calling asyncio.run twice),
+    # the registry starts over for that loop. The old clients are closed, not dropped:
+    # on their own loop if it still runs, otherwise when that loop shut down (a task
+    # parked on each loop closes them as asyncio.run cancels what is left).
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closer: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _http2(self) -> bool:
+        if not settings.http2:
+            return False
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._bind(loop)
+        origin = self._origin(url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=settings.request_timeout_s,
+                http2=self._http2(),
+                limits=httpx.Limits(
+                    max_connections=settings.http_max_connections,
+                    max_keepalive_connections=settings.http_max_keepalive,
+                    keepalive_expiry=settings.http_keepalive_expiry_s,
+                ),
+            )
+            self._clients[origin] = client
+        return client
+
+    def _bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        old, old_loop = list(self._clients.values()), self._loop
+        if old and old_loop is not None and old_loop.is_running():
+            for c in old:
+                asyncio.run_coroutine_threadsafe(c.aclose(), old_loop)
+        self._clients, self._loop = {}, loop
+        self._closer = loop.create_task(self._close_with(loop))
+
+    async def _close_with(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            await loop.create_future()  # pending until the loop winds down
+        finally:
+            if self._loop is loop:
+                await self.aclose()
+
+    def open(self, *urls: str) -> None:
+        for url in urls:
+            self.get(url)
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for c in clients:
+            await c.aclose()
+
+clients = ClientRegistry()
+
+@asynccontextmanager
+async def http_clients(*urls: str) -> AsyncIterator[ClientRegistry]:
+    # Explicit lifetime for CLI scripts; the orchestrator uses the FastAPI lifespan
+    clients.open(*urls)
+    try:
+        yield clients
+    finally:
+        await clients.aclose()
+
+def provider_urls() -> list[str]:
+    urls = [settings.alphavantage_base, settings.fmp_base, settings.newsapi_base]
+    if settings.use_remote_price_model:
+        urls.append(settings.price_model_url)
+    return urls
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    try:
+        return float(resp.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
 async def get_json(
     url: str,
     params: Optional[Dict[str, Any]] = None,
@@ -15,24 +111,67 @@ async def get_json(
     max_retries: int = 3,
     backoff_base: float = 0.5,
     backoff_jitter: float = 0.2,
+    limiter: Optional[RateLimiter] = None,
+) -> Any:
+    return await _get(url, params, headers, timeout, max_retries, backoff_base, backoff_jitter, limiter, lambda r: r.json())
+
+async def get_text(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 30.0,
+    max_retries: int = 3,
+    backoff_base: float = 0.5,
+    backoff_jitter: float = 0.2,
+    limiter: Optional[RateLimiter] = None,
+) -> str:
+    # Same retries and limiter handling as get_json, for CSV endpoints
+    return await _get(url, params, headers, timeout, max_retries, backoff_base, backoff_jitter, limiter, lambda r: r.text)
+
+async def _get(
+    url: str,
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+    timeout: float,
+    max_retries: int,
+    backoff_base: float,
+    backoff_jitter: float,
+    limiter: Optional[RateLimiter],
+    decode: Callable[[httpx.Response], Any],
 ) -> Any:
     attempt = 0
     last_exc: Exception | None = None
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        while attempt <= max_retries:
-            try:
-                resp = await client.get(url, params=params, headers=headers)
-                if resp.status_code == 429:
+    client = clients.get(url)
+    while attempt <= max_retries:
+        try:
+            if limiter is not None:
+                async with limiter.slot():
+                    resp = await client.get(url, params=params, headers=headers, timeout=timeout)
+            else:
+                resp = await client.get(url, params=params, headers=headers, timeout=timeout)
+            if resp.status_code == 429:
+                if limiter is not None:
+                    # The limiter slows the provider down (AIMD); only honour Retry-After here
+                    limiter.on_throttled()
+                    wait = _retry_after(resp) or 0.0
+                else:
                     # Too many requests: exponential backoff
                     wait = backoff_base * (2 ** attempt) + random.uniform(0, backoff_jitter)
-                    await asyncio.sleep(wait)
-                    attempt += 1
-                    continue
-                resp.raise_for_status()
-                return resp.json()
-            except Exception as e:
-                last_exc = e
-                wait = backoff_base * (2 ** attempt) + random.uniform(0, backoff_jitter)
                 await asyncio.sleep(wait)
                 attempt += 1
-        raise HttpError(f"Failed GET {url}: {last_exc}")
\ No newline at end of file
+                continue
+            resp.raise_for_status()
+            if limiter is not None:
+                limiter.on_success()
+            return decode(resp)
+        except Exception as e:
+            last_exc = e
+            wait = backoff_base * (2 ** attempt) + random.uniform(0, backoff_jitter)
+            await asyncio.sleep(wait)
+            attempt += 1
+    raise HttpError(f"Failed GET {url}: {last_exc}")
+
+async def post_json(url: str, payload: Any, timeout: float = 30.0) -> Any:
+    resp = await clients.get(url).post(url, json=payload, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
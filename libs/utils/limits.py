@@ -1,10 +1,206 @@
+from __future__ import annotations
 import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from libs.utils.config import settings
 
-# Tune these for your rate limits and traffic
-ALPHA_VANTAGE_CONCURRENCY = 2     # AV free tier is very tight
-NEWSAPI_CONCURRENCY = 5
-FMP_CONCURRENCY = 3
+# Per-provider rate limiting. Each provider has a per-minute and an optional per-day
+# token bucket plus a cap on in-flight calls. Waiters are served by priority (interactive
+# before bulk) and FIFO within a priority. On a 429 the effective per-minute rate is
+# halved (multiplicative decrease); every successful call adds a little back (additive
+# increase) until the configured quota is reached again.
 
-alpha_semaphore = asyncio.Semaphore(ALPHA_VANTAGE_CONCURRENCY)
-news_semaphore = asyncio.Semaphore(NEWSAPI_CONCURRENCY)
-fmp_semaphore = asyncio.Semaphore(FMP_CONCURRENCY)
\ No newline at end of file
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BULK = 1
+
+# Callers mark whole code paths (backtests, training) instead of threading a parameter
+request_priority: ContextVar[Priority] = ContextVar("request_priority", default=Priority.INTERACTIVE)
+
+@contextmanager
+def priority(p: Priority) -> Iterator[None]:
+    token = request_priority.set(p)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class _Bucket:
+    __slots__ = ("capacity", "rate", "tokens", "ts")
+
+    def __init__(self, capacity: float, per_seconds: float):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds
+        self.tokens = capacity
+        self.ts = time.monotonic()
+
+    def refill(self, now: float, factor: float = 1.0) -> None:
+        # a throttle lowers the rate, never the burst below one call: below a full token
+        # the bucket could never grant again
+        cap = max(1.0, self.capacity * factor)
+        self.tokens = min(cap, self.tokens + (now - self.ts) * self.rate * factor)
+        self.ts = now
+
+    def wait_time(self, factor: float = 1.0) -> float:
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / (self.rate * factor)
+
+
+class RateLimiter:
+    AIMD_DECREASE = 0.5
+    AIMD_INCREASE = 0.05
+    MIN_FACTOR = 0.05
+
+    def __init__(self, name: str, per_minute: int, per_day: int = 0, max_concurrency: int = 1):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.minute = _Bucket(per_minute, 60.0) if per_minute > 0 else None
+        self.day = _Bucket(per_day, 86400.0) if per_day > 0 else None
+        self.factor = 1.0
+        self.in_flight = 0
+        self.throttled = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self) -> None:
+        # State tied to a loop is dropped when a different loop shows up (asyncio.run per script step)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._waiters = []
+            self._wakeup = asyncio.Event()
+            self._dispatcher = None
+            self.in_flight = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.minute:
+            self.minute.refill(now, self.factor)
+        if self.day:
+            self.day.refill(now)
+
+    def _wait_time(self) -> float:
+        waits = [0.0]
+        if self.minute:
+            waits.append(self.minute.wait_time(self.factor))
+        if self.day:
+            waits.append(self.day.wait_time())
+        return max(waits)
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            prio, seq, fut = self._waiters[0]
+            if fut.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_flight >= self.max_concurrency:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            self._refill()
+            wait = self._wait_time()
+            if wait > 0:
+                # a release or a higher priority arrival re-evaluates early
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._waiters)
+            if self.minute:
+                self.minute.tokens -= 1
+            if self.day:
+                self.day.tokens -= 1
+            self.in_flight += 1
+            fut.set_result(None)
+
+    async def acquire(self, prio: Optional[Priority] = None) -> None:
+        self._bind_loop()
+        prio = request_priority.get() if prio is None else prio
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(prio), next(self._seq), fut))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        else:
+            self._wakeup.set()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # granted just as we were cancelled: give the slot back
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @asynccontextmanager
+    async def slot(self, prio: Optional[Priority] = None) -> AsyncIterator[None]:
+        await self.acquire(prio)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_throttled(self) -> None:
+        self.throttled += 1
+        self.factor = max(self.MIN_FACTOR, self.factor * self.AIMD_DECREASE)
+        if self.minute:
+            # the provider says we're over; don't spend what we think is left
+            self.minute.tokens = min(self.minute.tokens, 0.0)
+
+    def on_success(self) -> None:
+        if self.factor < 1.0:
+            self.factor = min(1.0, self.factor + self.AIMD_INCREASE)
+
+    def share(self, fraction: float) -> None:
+        # Keep `fraction` of the quota, for when several processes draw on one API key
+        for bucket in (self.minute, self.day):
+            if bucket is not None:
+                # burst of at least one call, or the bucket could never fill to a token
+                bucket.capacity = max(1.0, bucket.capacity * fraction)
+                bucket.rate *= fraction
+                bucket.tokens = min(bucket.tokens, bucket.capacity)
+        self.max_concurrency = max(1, int(self.max_concurrency * fraction))
+
+    def stats(self) -> Dict[str, float]:
+        self._refill()
+        queued = sum(1 for _, _, f in self._waiters if not f.done())
+        return {
+            "queue_depth": queued,
+            "in_flight": self.in_flight,
+            "tokens_minute": round(self.minute.tokens, 3) if self.minute else None,
+            "tokens_day": round(self.day.tokens, 3) if self.day else None,
+            "rate_factor": round(self.factor, 3),
+            "throttled": self.throttled,
+        }
+
+
+alpha_limiter = RateLimiter(
+    "alpha_vantage", settings.alpha_vantage_per_minute, settings.alpha_vantage_per_day, settings.alpha_vantage_concurrency
+)
+news_limiter = RateLimiter("newsapi", settings.newsapi_per_minute, settings.newsapi_per_day, settings.newsapi_concurrency)
+fmp_limiter = RateLimiter("fmp", settings.fmp_per_minute, settings.fmp_per_day, settings.fmp_concurrency)
+
+def limiter_stats() -> Dict[str, Dict[str, float]]:
+    return {l.name: l.stats() for l in (alpha_limiter, news_limiter, fmp_limiter)}
+
+def max_sharers() -> int:
+    # Processes that can split the keys and still make one call each: the pool would
+    # otherwise run over the smallest in-flight cap, since every sharer keeps at least one
+    return max(1, min(l.max_concurrency for l in (alpha_limiter, news_limiter, fmp_limiter)))
+
+def share_quotas(fraction: float) -> None:
+    for l in (alpha_limiter, news_limiter, fmp_limiter):
+        l.share(fraction)
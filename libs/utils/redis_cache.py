@@ -1,18 +1,27 @@
 import json
 import redis.asyncio as redis
 import hashlib
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional, Sequence
 from libs.utils.config import settings
+from libs.utils.cache import InMemoryTTLCache
+from libs.utils.codec import encode, decode
 
 class RedisCache:
-    def __init__(self, ttl: int = 300):
+    # Two tiers: a small in-process L1 (bounded LRU/TTL) in front of Redis as L2. Values
+    # are stored in Redis with the binary codec (numpy arrays as raw columns, compressed).
+    def __init__(self, ttl: int = 300, l1: Optional[InMemoryTTLCache] = None):
         self.ttl = ttl
         self._pool = None
+        self.l1 = l1 if l1 is not None else InMemoryTTLCache(
+            ttl_seconds=min(ttl, settings.l1_cache_ttl_s),
+            max_entries=settings.l1_cache_max_entries,
+            max_bytes=settings.l1_cache_max_bytes,
+        )
 
     async def _conn(self):
         if self._pool is None:
             redis_url = getattr(settings, "redis_url", "redis://localhost:6379/0")
-            self._pool = redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+            self._pool = redis.from_url(redis_url, decode_responses=False)
         return self._pool
 
     @staticmethod
@@ -21,10 +30,42 @@ class RedisCache:
         return f"{prefix}:{h}"
 
     async def get(self, key: str) -> Optional[dict]:
+        value = self.l1.get(key)
+        if value is not None:
+            return value
         conn = await self._conn()
         out = await conn.get(key)
-        return json.loads(out) if out else None
+        if out is None:
+            return None
+        value = decode(out)
+        self.l1.set(key, value)
+        return value
 
-    async def set(self, key: str, value: dict):
+    async def set(self, key: str, value: dict, ttl: Optional[int] = None):
+        self.l1.set(key, value)
         conn = await self._conn()
-        await conn.set(key, json.dumps(value), ex=self.ttl)
\ No newline at end of file
+        await conn.set(key, encode(value), ex=ttl or self.ttl)
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[dict]]:
+        # L1 first, then every remaining key in a single MGET round trip
+        out: List[Optional[dict]] = [self.l1.get(k) for k in keys]
+        missing = [i for i, v in enumerate(out) if v is None]
+        if missing:
+            conn = await self._conn()
+            raws = await conn.mget([keys[i] for i in missing])
+            for i, raw in zip(missing, raws):
+                if raw is not None:
+                    out[i] = decode(raw)
+                    self.l1.set(keys[i], out[i])
+        return out
+
+    async def mset(self, items: Dict[str, dict], ttl: Optional[int] = None):
+        # One pipelined round trip; SET ... EX per key keeps individual TTLs
+        if not items:
+            return
+        conn = await self._conn()
+        pipe = conn.pipeline(transaction=False)
+        for key, value in items.items():
+            self.l1.set(key, value)
+            pipe.set(key, encode(value), ex=ttl or self.ttl)
+        await pipe.execute()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+# Request coalescing: concurrent calls with the same key share one in-flight task.
+#
+# - The first caller starts the task; later callers await the same task.
+# - Every caller gets the result or the exception of that one task.
+# - A caller being cancelled only detaches that caller (the task is shielded); the task
+#   itself is cancelled once no caller is left waiting for it.
+# - The key is forgotten as soon as the task finishes, so results are never cached here.
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.stats: Dict[str, int] = {"leaders": 0, "joined": 0}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        call = self._calls.get(key)
+        if call is None or call.task.get_loop() is not loop:
+            call = _Call(loop.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _t, key=key, call=call: self._forget(key, call))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["joined"] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Nobody may be left to observe a failure (all callers cancelled)
+        if not call.task.cancelled():
+            call.task.exception()
@@ -0,0 +1,6 @@
+import pytest
+
+@pytest.fixture
+def anyio_backend():
+    # The code base is asyncio-only (asyncio tasks, locks and loops)
+    return "asyncio"
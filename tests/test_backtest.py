@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from backtester import engine
+from backtester.state import BacktestStateStore
+from libs.data.news_archive import NewsHistory
+from libs.ensemble.meta import FEATURE_ORDER, meta_ensemble_batch, meta_probabilities, signal_arrays
+from libs.schemas.frame import CandleFrame, to_ns
+from libs.schemas.fundamentals import FundamentalsHistory
+from libs.utils.config import settings
+from libs.schemas.models import AgentResult, EnsembleInput, ForecastResult, NewsItem
+
+T0 = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+def _candles(n=800, seed=5):
+    rnd = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rnd.normal(0.0003, 0.015, n))
+    open_ = close * (1 + rnd.normal(0, 0.003, n))
+    ts = np.array([to_ns(T0 + timedelta(days=i)) for i in range(n)])
+    return CandleFrame("TEST", ts, open_, np.maximum(open_, close) * 1.01, np.minimum(open_, close) * 0.99, close, np.full(n, 1e6))
+
+def _news(n=2000, days=800, seed=6):
+    rnd = np.random.default_rng(seed)
+    items = [NewsItem(symbol="TEST", title=f"n{i}", published_at=T0 + timedelta(seconds=int(rnd.integers(0, days * 86400))),
+                      sentiment_score=float(rnd.uniform(-1, 1))) for i in range(n)]
+    return NewsHistory("TEST", sorted(items, key=lambda n: n.published_at))
+
+def _input(row):
+    f = dict(zip(FEATURE_ORDER, row.tolist()))
+    agent = lambda s, c: AgentResult(symbol="TEST", as_of=T0, signal="hold", score=s, confidence=c)
+    return EnsembleInput(
+        technical=agent(f["t_score"], f["t_conf"]), fundamental=agent(f["f_score"], f["f_conf"]),
+        sentiment=agent(f["s_score"], f["s_conf"]),
+        forecast=ForecastResult(symbol="TEST", as_of=T0, horizon_days=5, p10=0, p50=0, p90=0,
+                                exp_return=f["m_exp"], direction="flat", confidence=f["m_conf"]),
+    )
+
+def test_array_decisions_match_meta_ensemble():
+    rnd = np.random.default_rng(1)
+    X = np.column_stack([rnd.uniform(-1, 1, 300), rnd.uniform(0, 1, 300)] * 3 + [rnd.normal(0, 0.3, 300), rnd.uniform(0, 1, 300)])
+    prob, unc, _ = meta_probabilities(X)
+    signal, size = signal_arrays(prob)
+    decisions = meta_ensemble_batch([_input(r) for r in X])
+    assert prob == pytest.approx([d.prob_up for d in decisions], abs=1e-12)
+    assert unc == pytest.approx([d.uncertainty for d in decisions], abs=1e-12)
+    assert signal.tolist() == [{"buy": 1, "sell": -1, "hold": 0}[d.signal] for d in decisions]
+    assert size == pytest.approx([d.size for d in decisions], abs=1e-12)
+    assert {"buy", "sell", "hold"} == {d.signal for d in decisions}
+
+def test_simulate_fills_costs_and_holding():
+    c = _candles(30)
+    idx = np.array([10, 15, 20])
+    target = np.array([1.0, 0.5, 0.0])
+    position, returns = engine.simulate(c.open, c.close, idx, target, horizon_days=3, last=27, slippage_bps=5, fee_bps=1)
+    assert position.tolist() == [0, 1, 1, 1, 0, 0, 0.5, 0.5, 0.5, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+    o = c.open
+    assert returns[1] == pytest.approx(o[12] / o[11] - 1 - 6e-4)  # entry pays 6 bps
+    assert returns[2] == pytest.approx(o[13] / o[12] - 1)
+    assert returns[7] == pytest.approx(0.5 * (o[18] / o[17] - 1))
+    assert returns[4] == pytest.approx(-6e-4)  # exit at the next open
+
+    free, _ = engine.simulate(c.open, c.close, idx, target, horizon_days=3, last=27, slippage_bps=0, fee_bps=0)
+    assert np.array_equal(free, position)
+
+def test_backtest_end_to_end():
+    c, news = _candles(), _news()
+    fund = FundamentalsHistory.from_rows("TEST", [
+        {"filed": T0 + timedelta(days=91 * q + 40), "period": T0 + timedelta(days=91 * q), "pe": 12.0, "roe": 0.2}
+        for q in range(8)
+    ])
+    start, end = T0 + timedelta(days=100), T0 + timedelta(days=790)
+    res = engine.backtest_arrays(c, fund, news, start, end, horizon_days=5)
+    m = res.metrics()
+    assert res.rebalance_ts[0] == to_ns(start) and len(res.rebalance_ts) == 139
+    assert res.ts[-1] == to_ns(end) and len(res.equity) == m["bars"] == 691
+    assert np.allclose(res.equity, np.cumprod(1 + res.returns))
+    assert -1 < m["max_drawdown"] <= 0 and m["turnover"] > 0 and m["trades"] > 0
+
+    costly = engine.backtest_arrays(c, fund, news, start, end, horizon_days=5, slippage_bps=50, fee_bps=50)
+    assert costly.metrics()["final_equity"] < m["final_equity"]
+    assert np.array_equal(costly.position, res.position)
+
+def test_resumed_run_matches_full_recompute(tmp_path, monkeypatch):
+    c, news = _candles(), _news()
+    fund = FundamentalsHistory.from_rows("TEST", [
+        {"filed": T0 + timedelta(days=91 * q + 40), "period": T0 + timedelta(days=91 * q), "pe": 12.0, "roe": 0.2}
+        for q in range(8)
+    ])
+    store = BacktestStateStore(str(tmp_path))
+    start = T0 + timedelta(days=100)
+    args = (c, fund, news, start)
+
+    first, status = engine.backtest_incremental(*args, T0 + timedelta(days=600), horizon_days=10, store=store)
+    assert status == "fresh"
+
+    rows = []
+    features = engine.decision_features
+    monkeypatch.setattr(engine, "decision_features", lambda c, f, n, idx, *a: rows.append(len(idx)) or features(c, f, n, idx, *a))
+    end = T0 + timedelta(days=790)
+    res, status = engine.backtest_incremental(*args, end, horizon_days=10, store=store)
+    monkeypatch.undo()
+    full = engine.backtest_arrays(*args, end, horizon_days=10)
+    assert status == "resumed" and rows == [len(full.rebalance_ts) - len(first.rebalance_ts)]
+    assert np.array_equal(res.position, full.position) and np.array_equal(res.prob_up, full.prob_up)
+    assert np.allclose(res.returns, full.returns, atol=1e-15) and np.allclose(res.equity, full.equity, rtol=1e-12)
+    assert res.metrics()["sharpe"] == pytest.approx(full.metrics()["sharpe"], abs=1e-9)
+
+    assert engine.backtest_incremental(*args, end, horizon_days=10, store=store)[1] == "cached"
+    assert engine.backtest_incremental(*args, end, horizon_days=5, store=store)[1] == "fresh"
+
+def test_stored_run_invalidated_by_versions_and_prices(tmp_path, monkeypatch):
+    c, news = _candles(), _news()
+    fund = FundamentalsHistory.from_rows("TEST", [])
+    store = BacktestStateStore(str(tmp_path))
+    start, end = T0 + timedelta(days=100), T0 + timedelta(days=700)
+    assert engine.backtest_incremental(c, fund, news, start, end, store=store)[1] == "fresh"
+    assert engine.backtest_incremental(c, fund, news, start, end, store=store)[1] == "cached"
+
+    monkeypatch.setattr(settings, "sentiment_model_version", "finbert-v2")
+    assert engine.backtest_incremental(c, fund, news, start, end, store=store)[1] == "fresh"
+
+    close = c.close.copy()
+    close[:300] *= 0.5  # split-adjusted history
+    adjusted = CandleFrame(c.symbol, c.ts, c.open, c.high, c.low, close, c.volume)
+    res, status = engine.backtest_incremental(adjusted, fund, news, start, end, store=store)
+    assert status == "invalidated"
+    assert np.array_equal(res.returns, engine.backtest_arrays(adjusted, fund, news, start, end).returns)
+
+def test_stored_run_invalidated_by_late_news_and_filings(tmp_path, monkeypatch):
+    c, news = _candles(), _news()
+    fund = FundamentalsHistory.from_rows("TEST", [])
+    store = BacktestStateStore(str(tmp_path))
+    start, end = T0 + timedelta(days=100), T0 + timedelta(days=600)
+    engine.backtest_incremental(c, fund, news, start, end, store=store)
+
+    # an article for day 300 archived after the run, then a filing found late
+    late = news.merge([NewsItem(symbol="TEST", title="late", published_at=T0 + timedelta(days=300), sentiment_score=-1.0)])
+    res, status = engine.backtest_incremental(c, fund, late, start, end, store=store)
+    assert status == "invalidated"
+    assert np.array_equal(res.prob_up, engine.backtest_arrays(c, fund, late, start, end).prob_up)
+    filed = FundamentalsHistory.from_rows("TEST", [
+        {"filed": T0 + timedelta(days=250), "period": T0 + timedelta(days=200), "pe": 40.0, "roe": -0.1},
+    ])
+    assert engine.backtest_incremental(c, filed, late, start, end, store=store)[1] == "invalidated"
+    # news past the stored end leaves the stored decisions valid
+    later = late.merge([NewsItem(symbol="TEST", title="later", published_at=T0 + timedelta(days=700))])
+    assert engine.backtest_incremental(c, filed, later, start, end, store=store)[1] == "cached"
+
+    assert len(list(tmp_path.glob("TEST_*.npz"))) == 1
+    monkeypatch.setattr(settings, "sentiment_model_version", "finbert-v2")
+    engine.backtest_incremental(c, filed, later, start, end, store=store)
+    assert len(list(tmp_path.glob("TEST_*.npz"))) == 1  # the superseded state was pruned
@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from apps.orchestrator import main
+from libs.ensemble import meta
+from libs.ensemble.meta import meta_ensemble, meta_ensemble_batch
+from libs.schemas.frame import CandleFrame
+from libs.schemas.models import AgentResult, EnsembleInput, ForecastResult
+from libs.features.engineering import build_technical
+from libs.utils.cache import InMemoryTTLCache
+
+T0 = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+def _history(end, n=300):
+    close = 100 + np.cumsum(np.sin(np.arange(n) / 7.0))
+    ts = np.array([int((end - timedelta(days=n - 1 - i)).timestamp() * 1e9) for i in range(n)])
+    return CandleFrame("X", ts, close, close + 1, close - 1, close, np.full(n, 1e6))
+
+class NoRedis:
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, ttl=None):
+        pass
+
+@pytest.fixture
+def fake(monkeypatch):
+    calls = {"batches": []}
+
+    async def get_timeseries(symbol, start, end, interval="1d"):
+        if symbol == "BAD":
+            raise RuntimeError("no data")
+        return _history(end)
+
+    async def warm(symbols, interval="1d"):
+        calls["warm"] = list(symbols)
+
+    async def fundamentals(symbols, as_of):
+        return {}
+
+    async def news(symbols, start, end):
+        # the provider is down for NONEWS: its entry is the exception
+        return {s: RuntimeError("newsapi 503") if s == "NONEWS" else [] for s in symbols}
+
+    real_batch = main.meta_ensemble_batch
+
+    def batch(inputs):
+        calls["batches"].append(len(inputs))
+        return real_batch(inputs)
+
+    monkeypatch.setattr(main, "get_timeseries", get_timeseries)
+    monkeypatch.setattr(main, "warm_timeseries", warm)
+    monkeypatch.setattr(main, "get_fundamentals_many", fundamentals)
+    monkeypatch.setattr(main, "get_news_many", news)
+    monkeypatch.setattr(main, "meta_ensemble_batch", batch)
+    monkeypatch.setattr(main, "state_cache", NoRedis())
+    monkeypatch.setattr(main, "indicator_states", InMemoryTTLCache())
+    monkeypatch.setattr(main.cache, "store", type(main.cache.store)())
+    return calls
+
+@pytest.mark.anyio
+async def test_batch_streams_one_record_per_symbol(fake):
+    symbols = ["AAA", "BBB", "BAD", "AAA", "CCC", "NONEWS"]
+    records = [r async for r in main.analyze_batch_stream(symbols, [5, 20])]
+    by_symbol = {r["symbol"]: r for r in records}
+    assert len(records) == 5 and set(by_symbol) == {"AAA", "BBB", "BAD", "CCC", "NONEWS"}
+    assert by_symbol["BAD"]["error"] == "no data"
+    assert by_symbol["NONEWS"]["error"] == "news fetch failed: newsapi 503"
+    res = by_symbol["AAA"]["results"]
+    assert [r["decision"]["horizon_days"] for r in res] == [5, 20]
+    assert sum(fake["batches"]) == 6
+    assert fake["warm"] == ["AAA", "BBB", "BAD", "CCC", "NONEWS"]
+
+    # the second pass is served from the analysis cache
+    again = [r async for r in main.analyze_batch_stream(["AAA", "CCC"], [5, 20])]
+    assert [r["results"] for r in again] == [by_symbol["AAA"]["results"], by_symbol["CCC"]["results"]]
+    assert sum(fake["batches"]) == 6
+
+@pytest.mark.anyio
+async def test_live_indicators_follow_revised_bars(fake):
+    end = datetime(2024, 6, 3, tzinfo=timezone.utc)
+    h = _history(end)
+    same = lambda a, b: a.as_of == b.as_of and a.model_dump(exclude={"as_of"}) == pytest.approx(b.model_dump(exclude={"as_of"}), rel=1e-9)
+    await main._live_technical("X", h[:-1])
+    assert same(await main._live_technical("X", h), build_technical(h))
+
+    # the day's bar moves while the session runs, then the history is split-adjusted
+    revised = h.copy()
+    revised.close[-1] *= 1.02
+    assert same(await main._live_technical("X", revised), build_technical(revised))
+    adjusted = CandleFrame("X", h.ts, h.open / 2, h.high / 2, h.low / 2, h.close / 2, h.volume)
+    assert same(await main._live_technical("X", adjusted), build_technical(adjusted))
+
+    # a symbol with no bars fails like the historical path, not on the missing first bar
+    with pytest.raises(ValueError, match="No candles"):
+        await main._live_technical("X", CandleFrame.empty("X"))
+
+@pytest.mark.anyio
+async def test_meta_ensemble_batch_matches_single_rows(fake):
+    inputs = []
+    for symbol in ("AAA", "BBB"):
+        candles = _history(main.datetime.now(main.timezone.utc))
+        inputs += await main._ensemble_inputs(
+            symbol, [5, 10], candles.ts_at(-1), False, candles,
+            main.FundamentalsSnapshot(symbol=symbol, as_of=candles.ts_at(-1)), [],
+        )
+    assert meta_ensemble_batch(inputs) == [meta_ensemble(i) for i in inputs]
+
+def test_baseline_blend_pinned_to_the_scalar_formula():
+    # prob_up = sigmoid(5x), uncertainty = max(0, 1 - |x|) with
+    # x = 0.3 t*tc + 0.3 f*fc + 0.2 s*sc + 0.4 m * 2mc; values from the scalar baseline
+    rows = [
+        (0.5, 0.8, 0.2, 0.5, -0.4, 0.6, 0.03, 0.7),
+        (-0.6, 0.9, -0.3, 0.5, -0.2, 0.5, -0.02, 0.6),
+        (0.1, 0.5, 0.0, 0.5, 0.05, 0.4, 0.0, 0.5),
+    ]
+    agent = lambda s, c: AgentResult(symbol="X", as_of=T0, signal="hold", score=s, confidence=c)
+    inputs = [
+        EnsembleInput(
+            technical=agent(t, tc), fundamental=agent(f, fc), sentiment=agent(s, sc),
+            forecast=ForecastResult(symbol="X", as_of=T0, horizon_days=5, p10=0, p50=0, p90=0,
+                                    exp_return=m, direction="flat", confidence=mc),
+        )
+        for t, tc, f, fc, s, sc, m, mc in rows
+    ]
+    out = meta_ensemble_batch(inputs, buy=0.55, sell=0.45)
+    assert [d.prob_up for d in out] == pytest.approx([0.6442824041997938, 0.23451321706067382, 0.523732154126561], abs=1e-15)
+    assert [d.uncertainty for d in out] == pytest.approx([0.8812, 0.7634, 0.981], abs=1e-15)
+    assert [d.signal for d in out] == ["buy", "sell", "hold"]
+    assert [d.size for d in out] == pytest.approx([0.28856480839958754, 0.0, 0.0], abs=1e-15)
+    assert all(d.versions["ensemble"] == "meta_stub_v1" for d in out)
+
+@pytest.mark.anyio
+async def test_meta_ensemble_batch_matrix_and_arrays(fake, monkeypatch):
+    candles = _history(main.datetime.now(main.timezone.utc))
+    inputs = await main._ensemble_inputs(
+        "AAA", [5, 10, 20], candles.ts_at(-1), False, candles,
+        main.FundamentalsSnapshot(symbol="AAA", as_of=candles.ts_at(-1)), [],
+    )
+    decisions = meta_ensemble_batch(inputs)
+    batch = meta.meta_batch(meta.inputs_matrix(inputs))
+    assert isinstance(batch, meta.EnsembleBatch) and len(batch) == 3
+    assert batch.prob_up.tolist() == [d.prob_up for d in decisions]
+    assert batch.signals() == [d.signal for d in decisions]
+    assert batch.inputs_hashes() == [d.inputs_hash for d in decisions]
+
+    assert meta_ensemble_batch([]) == [] and len(meta.meta_batch(np.empty((0, 8)))) == 0
+
+    calls = []
+
+    class Model:
+        def predict_proba(self, X):
+            calls.append(X.copy())
+            p = 1 / (1 + np.exp(-X[:, 0]))  # first spec column
+            return np.column_stack([1 - p, p])
+
+    spec = {"feature_order": ["m_exp"] + [k for k in meta.FEATURE_ORDER if k != "m_exp"]}
+    monkeypatch.setattr(meta, "_cached_model", Model())
+    monkeypatch.setattr(meta, "_cached_spec", spec)
+    X = np.random.default_rng(0).normal(size=(1000, 8))
+    out = meta.meta_batch(X, buy=0.6, sell=0.4)
+    assert len(calls) == 1 and calls[0].shape == (1000, 8)
+    assert np.allclose(out.prob_up, 1 / (1 + np.exp(-X[:, meta.FEATURE_ORDER.index("m_exp")])))
+    assert out.use_model and set(out.signals()) == {"buy", "sell", "hold"}
+    assert np.all(out.size[out.signal == 0] == 0) and np.all(out.prob_up[out.signal == 1] > 0.6)
@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from libs.nlp.batcher import MicroBatcher
+
+class Recorder:
+    def __init__(self, delay=0.01, fail=False):
+        self.calls = []
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return [(float(len(t.split())), 1.0) for t in texts]
+
+@pytest.mark.anyio
+async def test_concurrent_callers_share_sorted_batches():
+    run = Recorder()
+    mb = MicroBatcher(run, max_batch=8, max_wait_ms=50)
+    texts = [["w " * (i % 5 + 1) + f"t{i}", "x"] for i in range(12)]
+    results = await asyncio.gather(*(mb.submit(t) for t in texts))
+    for t, r in zip(texts, results):
+        assert r == [(float(len(s.split())), 1.0) for s in t]
+    assert [len(c) for c in run.calls] == [8, 8, 8]
+    for call in run.calls:
+        lengths = [len(s.split()) for s in call]
+        assert lengths == sorted(lengths)
+    stats = mb.stats()
+    assert stats["batches"] == 3 and stats["mean_batch"] == 8 and stats["full"] == 3
+    mb.close()
+
+@pytest.mark.anyio
+async def test_partial_batch_goes_out_after_max_wait_and_errors_route_back():
+    run = Recorder(fail=True)
+    mb = MicroBatcher(run, max_batch=64, max_wait_ms=20)
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    results = await asyncio.gather(mb.submit(["a"]), mb.submit(["b", "c"]), return_exceptions=True)
+    assert loop.time() - t0 >= 0.02
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert run.calls == [["a", "b", "c"]] and mb.stats()["timed_out"] == 1
+    mb.close()
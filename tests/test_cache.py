@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from libs.utils.cache import InMemoryTTLCache
+
+class Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+def _cache(clock, **kw):
+    class FakeTimeCache(InMemoryTTLCache):
+        def _now(self):
+            return clock.t
+    return FakeTimeCache(**kw)
+
+def test_lru_eviction_by_entries_and_bytes():
+    clock = Clock()
+    c = _cache(clock, ttl_seconds=60, max_entries=3)
+    for k in "abc":
+        c.set(k, k)
+    c.get("a")  # a becomes most recent
+    c.set("d", "d")
+    assert c.get("b") is None and c.get("a") == "a"
+    assert c.stats()["evictions"] == 1
+
+    c = _cache(clock, ttl_seconds=60, max_bytes=3000)
+    for i in range(10):
+        c.set(str(i), b"x" * 1000)
+    assert c.stats()["bytes"] <= 3000 and c.get("9") is not None
+
+def test_sweep_drops_expired_without_reads():
+    clock = Clock()
+    c = _cache(clock, ttl_seconds=10, sweep_interval_s=5)
+    for i in range(100):
+        c.set(str(i), i)
+    clock.t += 20
+    c.set("new", 1)
+    assert c.stats()["entries"] == 1 and c.stats()["expired"] == 100
+
+@pytest.mark.anyio
+async def test_stale_while_revalidate():
+    clock = Clock()
+    c = _cache(clock, ttl_seconds=10, stale_ttl_seconds=30)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return len(calls)
+
+    assert await c.get_or_load("k", loader) == 1
+    clock.t += 15  # stale, within the grace window
+    assert await c.get_or_load("k", loader) == 1
+    assert len(c._tasks) == 1  # the refresh is held until it finishes
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert not c._tasks
+    assert await c.get_or_load("k", loader) == 2
+    clock.t += 100  # past the grace window: a plain miss
+    assert await c.get_or_load("k", loader) == 3
+    s = c.stats()
+    assert (s["hits"], s["stale_hits"], s["misses"], s["refreshes"]) == (1, 1, 2, 1)
@@ -0,0 +1,23 @@
+import json
+import numpy as np
+from libs.utils.codec import encode, decode
+
+def test_roundtrip_with_arrays():
+    value = {
+        "start": 1, "end": 2,
+        "frame": {
+            "symbol": "AAPL",
+            "ts": np.arange(5, dtype=np.int64) * 86_400_000_000_000,
+            "close": np.array([101.25, 101.5, 99.99, 100.0, 102.13]),
+            "raw": np.linspace(1, 2, 5) / 3,
+        },
+        "items": [{"title": "x", "score": None}],
+    }
+    out = decode(encode(value))
+    assert out["start"] == 1 and out["items"] == [{"title": "x", "score": None}]
+    assert out["frame"]["ts"].dtype == np.int64
+    for k in ("ts", "close", "raw"):
+        assert np.array_equal(out["frame"][k], value["frame"][k])
+
+def test_reads_legacy_json_values():
+    assert decode(json.dumps({"a": [1, 2]}).encode()) == {"a": [1, 2]}
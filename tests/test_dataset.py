@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from apps.agents.price_model import price_model_scores
+from libs.data.news_archive import NewsHistory
+from libs.features.engineering import build_fundamental, model_feature_hashes
+from libs.models import dataset, train_meta
+from libs.schemas.frame import CandleFrame, to_ns
+from libs.schemas.fundamentals import FundamentalsHistory
+from libs.schemas.models import FundamentalsSnapshot, NewsItem
+
+T0 = datetime(2021, 1, 4, tzinfo=timezone.utc)
+
+def _sources(n_bars=400, n_news=600):
+    rnd = np.random.default_rng(7)
+    close = 50 * np.cumprod(1 + rnd.normal(0, 0.015, n_bars))
+    ts = np.array([to_ns(T0 + timedelta(days=i)) for i in range(n_bars)])
+    candles = CandleFrame("TEST", ts, close, close * 1.01, close * 0.99, close, np.full(n_bars, 1e6))
+    news = [
+        NewsItem(
+            symbol="TEST", title=f"n{i}",
+            published_at=T0 + timedelta(seconds=int(rnd.integers(0, n_bars * 86400))),
+            sentiment_score=float(rnd.uniform(-1, 1)) if i % 9 else None,
+        )
+        for i in range(n_news)
+    ]
+    fund = FundamentalsSnapshot(symbol="TEST", as_of=T0, pe=15.0, roe=0.2, debt_to_equity=1.0)
+    return candles, fund, news
+
+@pytest.fixture
+def fake(monkeypatch):
+    candles, fund, news = _sources()
+
+    async def get_fundamentals(symbol, as_of):
+        return fund
+
+    async def get_news(symbol, start, end):
+        # provider order, newest first
+        return sorted((n for n in news if start <= n.published_at <= end), key=lambda n: n.published_at, reverse=True)
+
+    async def get_news_history(symbol, start, end):
+        return NewsHistory(symbol, (await get_news(symbol, start, end))[::-1])
+
+    monkeypatch.setattr(train_meta, "get_fundamentals", get_fundamentals)
+    monkeypatch.setattr(train_meta, "get_news", get_news)
+    monkeypatch.setattr(dataset, "get_news_history", get_news_history)
+    return candles, fund, get_news_history
+
+MODEL = [dataset.FEATURE_ORDER.index(k) for k in ("m_exp", "m_conf")]
+OTHER = [i for i in range(len(dataset.FEATURE_ORDER)) if i not in MODEL]
+
+def _assert_rows_match(X, rows):
+    # The archive's prefix sums round the weighted sentiment differently in the last
+    # bits, which reseeds the hash-seeded stub forecast; everything else agrees
+    np.testing.assert_allclose(X[:, OTHER], np.array(rows)[:, OTHER], rtol=1e-12, atol=1e-12)
+
+def test_vectorized_dataset_matches_row_by_row(fake):
+    candles, fund, get_news_history = fake
+    horizon = 5
+    news = train_meta.await_or_sync(get_news_history("TEST", T0 - timedelta(days=7), candles.ts_at(-1)))
+    ds = dataset.build_dataset(candles, fund, news, horizon)
+
+    series = train_meta.technical_series(candles)
+    rows, labels, dates = [], [], []
+    for i in range(40, len(candles) - horizon, 5):
+        as_of = candles.ts_at(i)
+        feats = train_meta.to_feature_row("TEST", i, candles, horizon, as_of, series)
+        rows.append([feats[k] for k in dataset.FEATURE_ORDER])
+        labels.append(1 if train_meta.compute_forward_return(candles, i, horizon) > 0 else 0)
+        dates.append(to_ns(as_of))
+
+    assert list(ds.ts) == dates
+    assert ds.y.tolist() == labels
+    _assert_rows_match(ds.X, rows)
+    assert ds.X[:, dataset.FEATURE_ORDER.index("s_score")].any()
+    # the forecast columns: the stub model on the row's features, with the archive's sentiment
+    idx = dataset.sample_indices(len(candles), horizon)
+    _, weighted, _ = news.sentiment_many(ds.ts, dataset.NEWS_WINDOW_DAYS)
+    hashes = model_feature_hashes(series.rsi[idx], series.macd[idx], build_fundamental(fund), weighted)
+    assert np.array_equal(ds.X[:, MODEL], np.column_stack(price_model_scores(hashes)))
+
+def test_point_in_time_fundamentals_match_row_by_row(fake, monkeypatch):
+    candles, _, get_news_history = fake
+    horizon = 5
+    # quarterly filings with alternating quality, the first one after the first samples
+    rows = [
+        {"filed": T0 + timedelta(days=60 + 91 * q), "period": T0 + timedelta(days=91 * q),
+         "pe": 12.0 if q % 2 else 40.0, "roe": 0.2 if q % 2 else 0.02, "debt_to_equity": 0.5}
+        for q in range(4)
+    ]
+    history = FundamentalsHistory.from_rows("TEST", rows)
+
+    async def get_fundamentals(symbol, as_of):
+        return history.at(as_of)
+
+    monkeypatch.setattr(train_meta, "get_fundamentals", get_fundamentals)
+    news = train_meta.await_or_sync(get_news_history("TEST", T0 - timedelta(days=7), candles.ts_at(-1)))
+    ds = dataset.build_dataset(candles, history, news, horizon)
+
+    series = train_meta.technical_series(candles)
+    expected = [
+        [train_meta.to_feature_row("TEST", i, candles, horizon, candles.ts_at(i), series)[k] for k in dataset.FEATURE_ORDER]
+        for i in range(40, len(candles) - horizon, 5)
+    ]
+    _assert_rows_match(ds.X, expected)
+    assert len(np.unique(ds.X[:, dataset.FEATURE_ORDER.index("f_score")])) == 3  # none, rich, cheap
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+transformers = pytest.importorskip("transformers")
+
+TEXTS = [
+    "Company beats earnings expectations and raises full-year guidance",
+    "Shares plunge after regulator opens fraud investigation",
+    "The annual shareholder meeting will be held in May",
+    "Margins contracted as input costs rose sharply, offsetting revenue growth",
+]
+
+@pytest.fixture(scope="module")
+def onnx_dir(tmp_path_factory):
+    try:
+        transformers.AutoTokenizer.from_pretrained("ProsusAI/finbert", local_files_only=True)
+    except Exception:
+        pytest.skip("FinBERT weights not in the local HF cache")
+    from libs.nlp.finbert_onnx import export_onnx
+    return str(export_onnx(str(tmp_path_factory.mktemp("finbert-onnx")), quantize=True))
+
+def test_onnx_backends_match_torch(onnx_dir):
+    from libs.nlp.finbert import FinBertSentiment
+    from libs.nlp.finbert_onnx import OnnxFinBertSentiment
+
+    ref = np.array(FinBertSentiment(device="cpu").score_texts(TEXTS))
+    fp32 = np.array(OnnxFinBertSentiment(onnx_dir, quantized=False, threads=1).score_texts(TEXTS))
+    int8 = np.array(OnnxFinBertSentiment(onnx_dir, quantized=True, threads=1).score_texts(TEXTS))
+    np.testing.assert_allclose(fp32, ref, atol=1e-3)
+    # dynamic quantization moves probabilities a little but keeps the verdict
+    assert np.abs(int8 - ref).max() < 0.15
+    assert (np.sign(np.round(int8[:, 0], 1)) == np.sign(np.round(ref[:, 0], 1))).all()
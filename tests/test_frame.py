@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from libs.schemas.models import Candle
+from libs.schemas.frame import CandleFrame
+
+def _frame(n: int = 50):
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    candles = [
+        Candle(symbol="TEST", ts=t0 + timedelta(days=i), open=i, high=i + 1, low=i - 1, close=i + 0.5, volume=100 + i)
+        for i in range(n)
+    ]
+    return CandleFrame.from_candles(candles), candles
+
+def test_roundtrips():
+    frame, candles = _frame()
+    assert frame.to_candles() == candles
+    assert CandleFrame.from_dict(frame.to_dict()).to_candles() == candles
+    back = CandleFrame.from_pandas(frame.to_pandas(), "TEST")
+    assert np.array_equal(back.ts, frame.ts) and np.array_equal(back.close, frame.close)
+
+def test_between_is_inclusive_view():
+    frame, candles = _frame()
+    sub = frame.between(candles[10].ts, candles[19].ts)
+    assert len(sub) == 10
+    assert sub.ts_at(0) == candles[10].ts and sub.ts_at(-1) == candles[19].ts
+    assert np.shares_memory(sub.close, frame.close)
+    assert frame.index_at(candles[5].ts + timedelta(hours=12)) == 5
+    assert frame.index_at(candles[0].ts - timedelta(days=1)) == -1
+
+def test_merge_prefers_newer_rows():
+    frame, _ = _frame()
+    tail = frame[45:]
+    tail.close = tail.close + 1000
+    merged = frame[:48].merge(tail)
+    assert len(merged) == 50
+    assert merged.close[-1] == frame.close[-1] + 1000
+    assert merged.close[44] == frame.close[44]
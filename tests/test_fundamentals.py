@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+from libs.data import fmp
+from libs.schemas.fundamentals import FundamentalsHistory
+
+def _quarter(date, filed, revenue, net_income):
+    return {"date": date, "fillingDate": filed, "revenue": revenue, "netIncome": net_income, "eps": net_income / 100}
+
+INCOME = [  # newest first, as FMP returns it
+    _quarter("2023-03-31", "2023-05-02", 130.0, 13.0),
+    _quarter("2022-12-31", "2023-02-01", 120.0, 12.0),
+    _quarter("2022-09-30", "2022-10-28", 110.0, 11.0),
+    _quarter("2022-06-30", "2022-07-29", 105.0, 10.0),
+    {"date": "2022-03-31", "revenue": 100.0, "netIncome": 10.0, "eps": 0.1},  # no filing date
+]
+BALANCE = [{"date": q["date"], "totalStockholdersEquity": 230.0, "totalDebt": 115.0} for q in INCOME]
+METRICS = [{"date": "2023-03-31", "marketCap": 920.0, "debtToEquity": 0.4}]
+
+def test_history_from_statements():
+    h = fmp.history_from_statements("ACME", INCOME, BALANCE, METRICS)
+    assert len(h) == 5
+    assert np.all(np.diff(h.filed) > 0)
+    first = h.at(datetime(2022, 6, 1, tzinfo=timezone.utc))
+    assert first.as_of == datetime(2022, 3, 31, tzinfo=timezone.utc)  # filed 45 days after period end
+    assert first.revenue_ttm is None and first.profit_margin == pytest.approx(0.1)
+
+    last = h.at(datetime(2023, 6, 1, tzinfo=timezone.utc))
+    assert last.revenue_ttm == pytest.approx(465.0)
+    assert last.eps_ttm == pytest.approx(0.46)
+    assert last.pe == pytest.approx(20.0)  # marketCap / TTM net income
+    assert last.roe == pytest.approx(0.2)
+    assert last.debt_to_equity == pytest.approx(0.4)
+    assert last.growth_rev_yoy == pytest.approx(0.3)
+    assert last.filing_recency_days == 62
+
+def test_ttm_unknown_when_a_quarter_lacks_the_field():
+    gap = [dict(q) for q in INCOME]
+    gap[2]["netIncome"] = None
+    del gap[1]["eps"]
+    last = fmp.history_from_statements("ACME", gap, BALANCE, METRICS).at(datetime(2023, 6, 1, tzinfo=timezone.utc))
+    assert last.revenue_ttm == pytest.approx(465.0)
+    assert last.eps_ttm is None and last.pe is None and last.roe is None
+
+def test_as_of_never_sees_later_filings():
+    h = fmp.history_from_statements("ACME", INCOME, BALANCE, METRICS)
+    # period ended, statement not yet filed: still the previous quarter
+    snap = h.at(datetime(2023, 4, 15, tzinfo=timezone.utc))
+    assert snap.as_of == datetime(2022, 12, 31, tzinfo=timezone.utc)
+    assert h.at(datetime(2023, 5, 2, tzinfo=timezone.utc)).as_of == datetime(2023, 3, 31, tzinfo=timezone.utc)
+    before = h.at(datetime(2020, 1, 1, tzinfo=timezone.utc))
+    assert before.pe is None and before.roe is None
+
+def test_roundtrip():
+    h = fmp.history_from_statements("ACME", INCOME, BALANCE, METRICS)
+    back = FundamentalsHistory.from_dict(h.to_dict())
+    when = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    assert back.at(when) == h.at(when)
+    assert set(FundamentalsHistory.empty("X").at(when).model_dump(exclude_none=True)) == {"symbol", "as_of", "source"}
+
+@pytest.mark.anyio
+async def test_history_endpoints_fetched_concurrently(monkeypatch):
+    inflight, peak = 0, 0
+
+    async def get(url, params):
+        nonlocal inflight, peak
+        inflight += 1
+        peak = max(peak, inflight)
+        await asyncio.sleep(0.01)
+        inflight -= 1
+        assert params["period"] == "quarter"
+        return {"income-statement": INCOME, "balance-sheet-statement": BALANCE, "key-metrics": METRICS}[url.split("/")[-2]]
+
+    monkeypatch.setattr(fmp, "_get", get)
+    h = await fmp.get_fundamentals_history("ACME")
+    assert peak == 3 and len(h) == 5
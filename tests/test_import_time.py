@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+from bench_import_time import check
+
+def test_entry_points_import_fast_and_without_ml_dependencies():
+    # generous default so slow CI machines don't flake; the heavy-module check is exact
+    budget = float(os.environ.get("IMPORT_BUDGET_MS", "4000"))
+    assert check(budget, runs=2, verbose=False) == []
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+import math
+import numpy as np
+from libs.schemas.models import Candle
+from libs.features.indicators import rsi, ema
+from libs.features.engineering import build_technical, technical_series
+
+def _candles(n: int = 120, seed: int = 7):
+    rnd = np.random.default_rng(seed)
+    closes = 100 * np.cumprod(1 + rnd.normal(0, 0.01, n))
+    t0 = datetime(2023, 1, 2, tzinfo=timezone.utc)
+    return [
+        Candle(symbol="TEST", ts=t0 + timedelta(days=i), open=c, high=c * 1.01, low=c * 0.99, close=c, volume=1e6)
+        for i, c in enumerate(closes)
+    ]
+
+def test_rsi_matches_wilder_reference():
+    closes = np.array([c.close for c in _candles()])
+    out = rsi(closes)
+    diffs = np.diff(closes)
+    g = np.clip(diffs, 0, None)
+    l = np.clip(-diffs, 0, None)
+    ag, al = g[:14].mean(), l[:14].mean()
+    ref = [100 - 100 / (1 + ag / al)]
+    for i in range(14, len(diffs)):
+        ag = (ag * 13 + g[i]) / 14
+        al = (al * 13 + l[i]) / 14
+        ref.append(100 - 100 / (1 + ag / al))
+    assert np.isnan(out[:14]).all()
+    assert np.allclose(out[14:], ref)
+
+def test_ema_is_recursive_with_sma_seed():
+    vals = np.arange(1.0, 11.0)
+    out = ema(vals, 3)
+    assert np.isnan(out[:2]).all()
+    assert out[2] == 2.0
+    assert math.isclose(out[3], 2.0 + 0.5 * (4.0 - 2.0))
+
+def test_build_technical_lookup_matches_slice():
+    candles = _candles()
+    series = technical_series(candles)
+    for i in (10, 40, 80, len(candles) - 1):
+        a = build_technical(candles, series, i)
+        b = build_technical(candles[:i + 1])
+        assert a.as_of == candles[i].ts
+        assert a.model_dump() == b.model_dump()
+
+def test_all_fields_populated_with_enough_history():
+    tech = build_technical(_candles())
+    for name in ("rsi", "macd", "macd_signal", "bb_upper", "bb_lower", "atr", "sma_20", "ema_50"):
+        assert getattr(tech, name) is not None
+    early = build_technical(_candles()[:10])
+    assert early.rsi is None and early.sma_20 is None
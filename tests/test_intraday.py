@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+import pytest
+from apps.orchestrator import main
+from libs.data import adapters, alpha_vantage
+from libs.data.intraday import Resampler, bucket_start, ingest_bars_file, months_to_fetch, read_bars_csv, resample
+from libs.data.store import OHLCVStore
+from libs.features.engineering import build_technical
+from libs.features.incremental import IndicatorState
+from libs.features.indicators import compute_indicators
+from libs.schemas.frame import CandleFrame, to_ns
+
+NY = "America/New_York"
+
+def _session_index(start: str, days: int) -> pd.DatetimeIndex:
+    # regular-session 1min bars (09:30-15:59 New York) on business days
+    out = []
+    for d in pd.bdate_range(start, periods=days):
+        out.append(pd.date_range(d + pd.Timedelta("9h30min"), d + pd.Timedelta("15h59min"), freq="1min", tz=NY))
+    return out[0].append(out[1:])
+
+def _bars(start="2024-03-06", days=6, seed=0) -> pd.DataFrame:
+    # spans the March DST change
+    idx = _session_index(start, days)
+    rnd = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rnd.normal(0, 0.001, len(idx)))
+    open_ = close * (1 + rnd.normal(0, 0.0005, len(idx)))
+    return pd.DataFrame({
+        "open": open_, "high": np.maximum(open_, close) * 1.001, "low": np.minimum(open_, close) * 0.999,
+        "close": close, "volume": rnd.integers(100, 10_000, len(idx)).astype(float),
+    }, index=idx.tz_convert("UTC"))
+
+def _frame(df: pd.DataFrame) -> CandleFrame:
+    return CandleFrame.from_pandas(df, "TEST", interval="1min", source="file")
+
+@pytest.mark.parametrize("interval,rule", [("5min", "5min"), ("15min", "15min"), ("1h", "1h"), ("1d", "1D")])
+def test_resample_matches_pandas(interval, rule):
+    df = _bars()
+    out = resample(_frame(df), interval, NY)
+    src = df.tz_convert(NY) if interval == "1d" else df
+    ref = src.resample(rule).agg({"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}).dropna()
+    labels = ref.index.tz_localize(None).tz_localize("UTC") if interval == "1d" else ref.index
+    assert out.ts.tolist() == labels.as_unit("ns").asi8.tolist()
+    for c in ("open", "high", "low", "close", "volume"):
+        assert np.array_equal(getattr(out, c), ref[c].to_numpy())
+    if interval == "1d":
+        assert len(out) == 6 and np.all(out.ts % (86400 * 10**9) == 0)
+
+def test_daily_buckets_follow_local_dates_around_dst_changes():
+    # extended-hours bars around both 2024 changes, in and out of the changeover hour
+    ts = pd.DatetimeIndex([
+        "2024-03-10 04:30", "2024-03-10 06:30", "2024-03-10 07:30", "2024-03-11 03:59", "2024-03-11 04:00",
+        "2024-11-03 03:59", "2024-11-03 04:30", "2024-11-03 05:30", "2024-11-03 06:30", "2024-11-04 04:59",
+    ], tz="UTC")
+    local = ts.tz_convert(NY).tz_localize(None).normalize().tz_localize("UTC")
+    assert bucket_start(ts.as_unit("ns").asi8, "1d", NY).tolist() == local.as_unit("ns").asi8.tolist()
+
+def test_streaming_resampler_and_indicators_match_batch():
+    frame = _frame(_bars(days=10))
+    batch = resample(frame, "15min")
+    r, st, got = Resampler("15min"), IndicatorState("TEST"), []
+    bounds = np.r_[0, np.sort(np.random.default_rng(3).choice(len(frame), 12, replace=False)), len(frame)]
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        done = r.push(frame[a:b])
+        if len(done):
+            st.catch_up(done)
+            got.append(done)
+    tail = r.flush()
+    st.catch_up(tail)
+    streamed = CandleFrame.empty("TEST", "15min")
+    for part in got + [tail]:
+        streamed = streamed.merge(part)
+    assert np.array_equal(streamed.ts, batch.ts) and np.array_equal(streamed.close, batch.close)
+    ref = compute_indicators(batch.close, batch.high, batch.low)
+    assert st.values()["rsi"] == ref.rsi[-1] and st.values()["macd_signal"] == ref.macd_signal[-1]
+
+def test_csv_feed_chunks_local_time_into_store(tmp_path):
+    df = _bars(days=3)
+    local = df.tz_convert(NY).iloc[::-1]  # newest first, exchange clock, like Alpha Vantage
+    path = tmp_path / "feed.csv"
+    local.assign(timestamp=local.index.strftime("%Y-%m-%d %H:%M:%S")).to_csv(
+        path, index=False, columns=["timestamp", "open", "high", "low", "close", "volume"])
+    chunks = list(read_bars_csv(path, "TEST", tz=NY, chunk_rows=500))
+    assert len(chunks) == -(-len(df) // 500) and all(np.all(np.diff(c.ts) > 0) for c in chunks)
+
+    store = OHLCVStore(str(tmp_path / "ohlcv"))
+    stored = ingest_bars_file(path, "TEST", store, tz=NY, chunk_rows=500)
+    assert stored.ts.tolist() == df.index.as_unit("ns").asi8.tolist()
+    assert np.allclose(stored.close, df["close"].to_numpy())
+    assert store.meta("TEST", "1min")["months"] == ["2024-03", "2024-03"]
+    assert isinstance(store.load("TEST", "1min").close.base, np.memmap)
+
+def test_months_to_fetch():
+    now = datetime(2024, 6, 15, tzinfo=timezone.utc)
+    day = lambda m, d: datetime(2024, m, d, tzinfo=timezone.utc)
+    assert months_to_fetch(None, day(1, 20), day(3, 2), now) == ["2024-01", "2024-02", "2024-03"]
+    meta = {"months": ["2024-03", "2024-05"], "last_ts": to_ns(day(5, 31)), "fetched_at": now.timestamp() - 3600}
+    assert months_to_fetch(meta, day(3, 10), day(5, 20), now) == []
+    assert months_to_fetch(meta, day(1, 10), day(3, 20), now) == ["2024-01", "2024-02"]
+    assert months_to_fetch(meta, day(4, 1), day(7, 1), now) == ["2024-05", "2024-06"]
+    assert months_to_fetch({**meta, "fetched_at": now.timestamp()}, day(4, 1), day(7, 1), now) == []
+
+@pytest.mark.anyio
+async def test_get_timeseries_intraday_fetches_months_and_resamples(tmp_path, monkeypatch):
+    df = pd.concat([_bars("2024-02-26", 4, seed=1), _bars("2024-03-04", 5, seed=2)])
+    calls = []
+
+    async def fake_month(symbol, month, interval="1min"):
+        calls.append(month)
+        part = df[df.index.tz_convert(NY).strftime("%Y-%m") == month]
+        return CandleFrame.from_pandas(part, symbol, interval="1min", source="alpha_vantage")
+
+    store = OHLCVStore(str(tmp_path))
+    monkeypatch.setattr(alpha_vantage, "fetch_intraday_month", fake_month)
+    monkeypatch.setattr(adapters, "get_store", lambda: store)
+    start, end = datetime(2024, 3, 4, 15, 10, tzinfo=timezone.utc), datetime(2024, 3, 8, 21, tzinfo=timezone.utc)
+
+    hourly = await adapters.get_timeseries("TEST", start, end, "1h")
+    assert calls == ["2024-03"]
+    ref = df[(df.index >= "2024-03-04 16:00") & (df.index <= end)].resample("1h").agg({"high": "max", "close": "last"}).dropna()
+    assert np.array_equal(hourly.close, ref["close"].to_numpy()) and np.array_equal(hourly.high, ref["high"].to_numpy())
+    assert hourly.interval == "1h" and hourly.ts_at(0) == datetime(2024, 3, 4, 16, tzinfo=timezone.utc)
+
+    await adapters.get_timeseries("TEST", start, end, "5min")
+    assert calls == ["2024-03"]  # served from the store
+    minutes = await adapters.get_timeseries("TEST", datetime(2024, 2, 27, tzinfo=timezone.utc), end, "1min")
+    assert calls == ["2024-03", "2024-02"] and len(minutes) == len(df) - 390
+    with pytest.raises(ValueError):
+        await adapters.get_timeseries("TEST", start, end, "2h")
+
+@pytest.mark.anyio
+async def test_analyze_symbol_on_intraday_bars(tmp_path, monkeypatch):
+    df = _bars("2024-02-26", 10)
+
+    async def fake_month(symbol, month, interval="1min"):
+        part = df[df.index.tz_convert(NY).strftime("%Y-%m") == month]
+        return CandleFrame.from_pandas(part, symbol, interval="1min", source="alpha_vantage")
+
+    store = OHLCVStore(str(tmp_path))
+    monkeypatch.setattr(alpha_vantage, "fetch_intraday_month", fake_month)
+    monkeypatch.setattr(adapters, "get_store", lambda: store)
+    monkeypatch.setattr(main.cache, "store", type(main.cache.store)())
+    as_of = datetime(2024, 3, 8, 18, 7, tzinfo=timezone.utc)
+    res = await main.analyze_symbol("TEST", as_of=as_of, interval="15min")
+    bars = resample(store.read("TEST", as_of - timedelta(days=30), as_of, "1min"), "15min", NY)
+    tech = build_technical(bars)
+    assert tech.as_of == datetime(2024, 3, 8, 18, 0, tzinfo=timezone.utc)
+    assert res["agents"]["technical"] == main.technical_agent(tech).dict()
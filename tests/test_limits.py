@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from libs.utils.limits import RateLimiter, Priority
+
+@pytest.mark.anyio
+async def test_interactive_served_before_bulk():
+    lim = RateLimiter("test", per_minute=600, max_concurrency=1)  # one token every 0.1s
+    lim.minute.tokens = 0
+    order = []
+
+    async def call(name, prio):
+        async with lim.slot(prio):
+            order.append(name)
+
+    tasks = [asyncio.create_task(call(f"bulk{i}", Priority.BULK)) for i in range(3)]
+    await asyncio.sleep(0.01)
+    tasks.append(asyncio.create_task(call("interactive", Priority.INTERACTIVE)))
+    await asyncio.sleep(0.01)
+    assert lim.stats()["queue_depth"] == 4
+    await asyncio.gather(*tasks)
+    assert order[0] == "interactive"
+    assert order[1:] == ["bulk0", "bulk1", "bulk2"]
+
+@pytest.mark.anyio
+async def test_aimd_and_quota():
+    lim = RateLimiter("test", per_minute=60, per_day=2, max_concurrency=5)
+    await lim.acquire(); lim.release()
+    await lim.acquire(); lim.release()
+    assert lim.stats()["tokens_day"] < 1
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(lim.acquire(), timeout=0.05)
+    assert lim.stats()["queue_depth"] == 0
+    lim.on_throttled()
+    assert lim.factor == 0.5
+    lim.on_success()
+    assert lim.factor == pytest.approx(0.55)
+
+@pytest.mark.anyio
+async def test_throttled_small_bucket_still_grants():
+    lim = RateLimiter("test", per_minute=5)
+    for _ in range(3):
+        lim.on_throttled()
+    assert lim.factor == 0.125
+    lim.minute.ts -= 3600  # a long quiet spell, more than enough for a token at the lowered rate
+    await asyncio.wait_for(lim.acquire(), timeout=1.0)
+    lim.release()
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from libs.data import adapters
+from libs.data.news_archive import NewsArchive, NewsHistory
+from libs.features.engineering import build_sentiment
+from libs.schemas.frame import to_ns
+from libs.schemas.models import NewsItem
+from libs.utils.config import settings
+
+T0 = datetime(2019, 1, 1, tzinfo=timezone.utc)
+
+def _items(n, days, seed=3):
+    rnd = np.random.default_rng(seed)
+    items = [
+        NewsItem(symbol="X", title=f"t{i}", url=f"u{i}",
+                 published_at=T0 + timedelta(seconds=int(rnd.integers(0, days * 86400))),
+                 sentiment_score=float(rnd.uniform(-1, 1)) if i % 4 else None)
+        for i in range(n)
+    ]
+    return sorted(items, key=lambda n: n.published_at)
+
+def test_sentiment_matches_build_sentiment():
+    # six years: windows inside and across the prefix-sum block edges
+    h = NewsHistory("X", _items(5000, 6 * 365))
+    rnd = np.random.default_rng(0)
+    as_of = [T0 + timedelta(seconds=int(s)) for s in rnd.integers(0, 6 * 365 * 86400, 400)]
+    avg, wavg, volume = h.sentiment_many(np.array([to_ns(a) for a in as_of]))
+    for a, av, wv, vol in zip(as_of, avg, wavg, volume):
+        ref = build_sentiment(h.window(a - timedelta(days=7), a), a)
+        assert vol == ref.news_volume
+        assert av == pytest.approx(ref.avg_sentiment, abs=1e-12)
+        assert wv == pytest.approx(ref.weighted_sentiment, abs=1e-12)
+    assert h.sentiment_at(T0 - timedelta(days=1)).news_volume == 0
+
+def test_window_and_merge():
+    items = _items(200, 100)
+    h = NewsHistory("X", items[:150])
+    start, end = T0 + timedelta(days=10), T0 + timedelta(days=20)
+    got = h.window(start, end)
+    assert got == sorted((n for n in items[:150] if start <= n.published_at <= end), key=lambda n: n.published_at, reverse=True)
+
+    scored = items[0].model_copy(update={"sentiment_score": 0.5}) if items[0].sentiment_score is None else items[0]
+    merged = h.merge(items[100:] + [scored])
+    assert len(merged) == 200 and np.all(np.diff(merged.pub) >= 0)
+    assert h.merge(items[:10]) is h
+
+@pytest.fixture
+def provider(monkeypatch, tmp_path):
+    calls = []
+
+    async def news(symbol, start, end):
+        calls.append((start, end))
+        # newest first, one page at most
+        hits = [n for n in _items(300, 60) if start <= n.published_at <= end][::-1]
+        return [n.model_copy(update={"sentiment_score": None}) for n in hits[:50]]
+
+    class Service:
+        async def score_articles(self, items):
+            for n in items:
+                n.sentiment_score = 0.25
+            return items
+
+    archive = NewsArchive(str(tmp_path))
+    monkeypatch.setattr(settings, "news_api_key", "test")
+    monkeypatch.setattr(adapters, "get_news_newsapi", news)
+    monkeypatch.setattr(adapters, "get_sentiment_service", lambda: Service())
+    monkeypatch.setattr(adapters, "get_news_archive", lambda: archive)
+    return calls, archive
+
+@pytest.mark.anyio
+async def test_archive_fetches_only_missing_ranges(provider):
+    calls, archive = provider
+    a, b = T0 + timedelta(days=30), T0 + timedelta(days=37)
+    first = await adapters.get_news("X", a, b)
+    assert len(calls) == 1 and first and all(n.sentiment_score == 0.25 for n in first)
+
+    inner = await adapters.get_news("X", a + timedelta(days=2), b)
+    assert len(calls) == 1 and inner == [n for n in first if n.published_at >= a + timedelta(days=2)]
+
+    await adapters.get_news("X", a - timedelta(days=3), b)
+    assert calls[1] == (a - timedelta(days=3), a)
+    meta = archive.meta("X")
+    assert (meta["start"], meta["end"]) == (to_ns(a - timedelta(days=3)), to_ns(b))
+
+    # a full page pages back from its oldest article
+    many = await adapters.get_news_many(["X"], T0, a - timedelta(days=3))
+    assert len(calls) > 3
+    assert len(many["X"]) > 50
+
+@pytest.mark.anyio
+async def test_archive_refreshes_past_end_after_interval(provider, monkeypatch):
+    calls, archive = provider
+    a, b = T0 + timedelta(days=30), T0 + timedelta(days=37)
+    await adapters.get_news("X", a, b)
+    await adapters.get_news("X", a, b + timedelta(days=1))
+    assert len(calls) == 1  # fetched moments ago
+    monkeypatch.setattr(settings, "news_refresh_s", -1)
+    await adapters.get_news("X", a, b + timedelta(days=1))
+    assert calls[-1] == (b, b + timedelta(days=1))
+
+@pytest.fixture
+def daily(monkeypatch, tmp_path):
+    # one article a day at midnight; the provider returns up to a page, newest first
+    day = lambda i: T0 + timedelta(days=i)
+    items = [NewsItem(symbol="X", title=f"d{i}", url=f"d{i}", published_at=day(i)) for i in range(40)]
+
+    async def news(symbol, start, end):
+        return [n.model_copy() for n in items if start <= n.published_at <= end][::-1][:adapters.NEWS_PAGE_SIZE]
+
+    class Service:
+        async def score_articles(self, items):
+            return items
+
+    archive = NewsArchive(str(tmp_path))
+    monkeypatch.setattr(settings, "news_api_key", "test")
+    monkeypatch.setattr(adapters, "get_news_newsapi", news)
+    monkeypatch.setattr(adapters, "get_sentiment_service", lambda: Service())
+    monkeypatch.setattr(adapters, "get_news_archive", lambda: archive)
+    return day, archive
+
+@pytest.mark.anyio
+async def test_head_fetch_does_not_cover_the_skipped_tail(daily, monkeypatch):
+    day, archive = daily
+    await adapters.get_news("X", day(10), day(15))
+    await adapters.get_news("X", day(5), day(20))  # tail skipped: fetched moments ago
+    meta = archive.meta("X")
+    assert (meta["start"], meta["end"]) == (to_ns(day(5)), to_ns(day(15)))
+    monkeypatch.setattr(settings, "news_refresh_s", -1)
+    assert len(await adapters.get_news("X", day(5), day(25))) == 21
+
+@pytest.mark.anyio
+async def test_page_limit_covers_only_the_articles_received(daily, monkeypatch):
+    day, archive = daily
+    monkeypatch.setattr(adapters, "NEWS_PAGE_SIZE", 3)
+    monkeypatch.setattr(settings, "news_max_pages", 2)
+    # pages overlap on their boundary article: d20..d18, then d18..d16
+    assert len(await adapters.get_news("X", day(0), day(20))) == 5
+    assert archive.meta("X")["start"] == to_ns(day(16))
+    assert len(await adapters.get_news("X", day(0), day(20))) == 9
+    assert archive.meta("X")["start"] == to_ns(day(12))
+
+@pytest.mark.anyio
+async def test_provider_failure_is_not_an_empty_archive(daily, monkeypatch):
+    day, archive = daily
+
+    async def down(symbol, start, end):
+        raise RuntimeError("newsapi 503")
+
+    monkeypatch.setattr(adapters, "get_news_newsapi", down)
+    many = await adapters.get_news_many(["X", "Y"], day(0), day(5))
+    assert isinstance(many["X"], RuntimeError) and isinstance(many["Y"], RuntimeError)
+    with pytest.raises(RuntimeError, match="503"):
+        await adapters.get_news_history("X", day(0), day(5))
+    assert archive.meta("X") is None  # nothing recorded as covered
@@ -0,0 +1,60 @@
+import pytest
+from libs.nlp.score_cache import ArticleScoreCache
+from libs.nlp.service import SentimentService
+from libs.utils.cache import InMemoryTTLCache
+from libs.utils.redis_cache import RedisCache
+
+class FakeConn:
+    def __init__(self):
+        self.data = {}
+
+    async def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    def pipeline(self, transaction=False):
+        conn, ops = self, []
+
+        class Pipe:
+            def set(self, key, value, ex=None):
+                ops.append((key, value))
+
+            async def execute(self):
+                conn.data.update(ops)
+
+        return Pipe()
+
+class CountingModel:
+    seen = []
+
+    def score_texts(self, texts):
+        CountingModel.seen.extend(texts)
+        return [(0.5, 0.9) if "beat" in t else (-0.5, 0.8) for t in texts]
+
+def _service(conn, version="v1"):
+    redis = RedisCache(l1=InMemoryTTLCache(ttl_seconds=0))  # L1 effectively off
+    redis._pool = conn
+    return SentimentService(factory=CountingModel, score_cache=ArticleScoreCache(redis, version))
+
+@pytest.mark.anyio
+async def test_only_unseen_articles_reach_the_model():
+    CountingModel.seen = []
+    conn = FakeConn()
+    svc = _service(conn)
+    first = await svc.score_texts(["Earnings beat", "Guidance cut", "earnings   BEAT "])
+    assert first == [(0.5, 0.9), (-0.5, 0.8), (0.5, 0.9)]
+    assert CountingModel.seen == ["Earnings beat", "Guidance cut"]
+
+    # the window moved: two known articles, one new
+    second = await svc.score_texts(["Guidance cut", "Earnings beat", "Layoffs announced"])
+    assert second == [(-0.5, 0.8), (0.5, 0.9), (-0.5, 0.8)]
+    assert CountingModel.seen[2:] == ["Layoffs announced"]
+    stats = svc.stats()["cache"]
+    assert (stats["articles"], stats["cached"], stats["deduped"], stats["scored"]) == (6, 2, 1, 3)
+    assert stats["rescore_avoided_rate"] == pytest.approx(0.5)
+
+    # a new model version does not reuse old scores
+    svc.close()
+    svc = _service(conn, version="v2")
+    await svc.score_texts(["Guidance cut"])
+    assert CountingModel.seen[-1] == "Guidance cut" and len(CountingModel.seen) == 4
+    svc.close()
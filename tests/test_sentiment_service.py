@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+import pytest
+from libs.nlp.service import SentimentService, SentimentUnavailable
+
+class SlowModel:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.thread = threading.get_ident()
+
+    def score_texts(self, texts):
+        time.sleep(self.delay)
+        return [(len(t) / 100.0, 0.9) for t in texts]
+
+@pytest.mark.anyio
+async def test_scoring_runs_off_the_event_loop():
+    svc = SentimentService(factory=lambda: SlowModel(0.2), workers=1)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    t = asyncio.create_task(ticker())
+    scores = await svc.score_texts(["good", "bad news"])
+    t.cancel()
+    svc.close()
+    assert scores == [(0.04, 0.9), (0.08, 0.9)]
+    assert ticks > 10  # the loop kept running during the 200 ms pass
+    assert svc.stats()["completed"] == 1 and svc.stats()["pending"] == 0
+
+@pytest.mark.anyio
+async def test_one_model_per_worker_loaded_once():
+    built = []
+
+    def factory():
+        built.append(threading.get_ident())
+        return SlowModel(0.01)
+
+    svc = SentimentService(factory=factory, workers=2)
+    await asyncio.gather(*(svc.score_texts(["x"]) for _ in range(10)))
+    svc.close()
+    assert 1 <= len(built) <= 2 and len(set(built)) == len(built)
+
+@pytest.mark.anyio
+async def test_timeouts_and_full_queue_raise_unavailable():
+    svc = SentimentService(factory=lambda: SlowModel(0.3), workers=1, max_queue=1, timeout_s=0.1)
+    results = await asyncio.gather(svc.score_texts(["a"]), svc.score_texts(["b"]), return_exceptions=True)
+    assert all(isinstance(r, SentimentUnavailable) for r in results)
+    assert svc.counters["timeouts"] == 1 and svc.counters["rejected"] == 1
+    await asyncio.sleep(0.3)
+    assert svc.stats()["pending"] == 0  # the slot comes back once the pass finishes
+    svc.close()
+
+def test_concurrent_onnx_exports_never_expose_a_partial_model(tmp_path, monkeypatch):
+    from libs.nlp import finbert_onnx
+
+    payload = b"x" * 200_000
+
+    def fake_export(out, quantize, opset):
+        (out / "config.json").write_text("{}")
+        with open(out / finbert_onnx.FP32_FILE, "wb") as f:
+            for i in range(0, len(payload), 10_000):
+                f.write(payload[i:i + 10_000])
+                f.flush()
+                time.sleep(0.001)
+
+    monkeypatch.setattr(finbert_onnx, "_export_into", fake_export)
+    model_dir = tmp_path / "finbert-onnx"
+    model = model_dir / finbert_onnx.FP32_FILE
+    seen, stop = [], threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            if model.exists():
+                seen.append((model.read_bytes() == payload, (model_dir / "config.json").exists()))
+
+    watcher = threading.Thread(target=reader)
+    watcher.start()
+    workers = [threading.Thread(target=finbert_onnx.export_onnx, args=(str(model_dir), False)) for _ in range(4)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    stop.set()
+    watcher.join()
+    assert seen and all(whole and config for whole, config in seen)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["finbert-onnx"]  # no temp dirs left
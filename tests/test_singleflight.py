@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from libs.utils.singleflight import SingleFlight
+
+@pytest.mark.anyio
+async def test_concurrent_calls_share_one_execution():
+    sf = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(sf.do("k", work) for _ in range(50)))
+    assert results == [1] * 50
+    assert calls == 1 and sf.in_flight() == 0
+    assert sf.stats == {"leaders": 1, "joined": 49}
+
+@pytest.mark.anyio
+async def test_errors_propagate_to_every_caller():
+    sf = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("provider down")
+
+    results = await asyncio.gather(*(sf.do("k", boom) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+@pytest.mark.anyio
+async def test_cancelling_one_caller_keeps_the_flight_alive():
+    sf = SingleFlight()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    first = asyncio.create_task(sf.do("k", slow))
+    second = asyncio.create_task(sf.do("k", slow))
+    await started.wait()
+    first.cancel()
+    assert await second == "ok"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+@pytest.mark.anyio
+async def test_last_caller_cancelling_cancels_the_work():
+    sf = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    task = asyncio.create_task(sf.do("k", slow))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    await asyncio.sleep(0)
+    assert sf.in_flight() == 0
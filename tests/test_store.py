@@ -0,0 +1,72 @@
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import pytest
+from libs.data import adapters, alpha_vantage
+from libs.data.store import OHLCVStore
+from libs.schemas.frame import CandleFrame
+
+def _df(start: str, n: int) -> pd.DataFrame:
+    idx = pd.date_range(start, periods=n, freq="D", tz="UTC")
+    vals = np.arange(n, dtype=float) + 100
+    return pd.DataFrame({"open": vals, "high": vals + 1, "low": vals - 1, "close": vals, "volume": vals * 10}, index=idx)
+
+def test_write_read_range(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    frame = CandleFrame.from_pandas(_df("2020-01-01", 500), "TEST")
+    store.write(frame, full=True)
+    sub = store.read("TEST", datetime(2020, 2, 1, tzinfo=timezone.utc), datetime(2020, 2, 10, tzinfo=timezone.utc))
+    assert len(sub) == 10
+    assert sub.ts_at(0) == datetime(2020, 2, 1, tzinfo=timezone.utc)
+    assert store.meta("TEST")["rows"] == 500 and store.meta("TEST")["full"]
+    mapped = store.load("TEST")
+    assert isinstance(mapped.close.base, np.memmap) and isinstance(mapped.ts.base, np.memmap)
+
+@pytest.mark.anyio
+async def test_update_uses_compact_after_full(tmp_path, monkeypatch):
+    calls = []
+    full = _df("2020-01-01", 300)
+    latest = _df("2020-10-01", 120)  # overlaps the stored tail
+
+    async def fake_fetch(symbol, outputsize="full"):
+        calls.append(outputsize)
+        return full if outputsize == "full" else latest.iloc[-100:]
+
+    monkeypatch.setattr(alpha_vantage, "fetch_alpha_vantage", fake_fetch)
+    store = OHLCVStore(str(tmp_path))
+    await alpha_vantage.update_daily_store("TEST", store)
+    merged = await alpha_vantage.update_daily_store("TEST", store)
+    assert calls == ["full", "compact"]
+    assert merged.last_ts == latest.index[-1].to_pydatetime()
+    assert np.all(np.diff(merged.ts) > 0)
+
+@pytest.mark.anyio
+async def test_update_refetches_full_when_compact_has_gap(tmp_path, monkeypatch):
+    calls = []
+
+    async def fake_fetch(symbol, outputsize="full"):
+        calls.append(outputsize)
+        return _df("2020-01-01", 50) if len(calls) == 1 else _df("2021-01-01", 100)
+
+    monkeypatch.setattr(alpha_vantage, "fetch_alpha_vantage", fake_fetch)
+    store = OHLCVStore(str(tmp_path))
+    await alpha_vantage.update_daily_store("TEST", store)
+    await alpha_vantage.update_daily_store("TEST", store)
+    assert calls == ["full", "compact", "full"]
+
+@pytest.mark.anyio
+async def test_read_refetches_after_empty_full_fetch(tmp_path, monkeypatch):
+    calls = []
+
+    async def fake_fetch(symbol, outputsize="full"):
+        calls.append(outputsize)
+        return _df("2020-01-01", 0) if len(calls) == 1 else _df("2020-01-01", 50)
+
+    monkeypatch.setattr(alpha_vantage, "fetch_alpha_vantage", fake_fetch)
+    store = OHLCVStore(str(tmp_path))
+    monkeypatch.setattr(adapters, "get_store", lambda: store)
+    start, end = datetime(2020, 1, 1, tzinfo=timezone.utc), datetime(2020, 3, 1, tzinfo=timezone.utc)
+    assert not len(await adapters._read_daily_history("TEST", start, end))
+    assert store.meta("TEST")["last_ts"] is None
+    assert len(await adapters._read_daily_history("TEST", start, end)) == 50
+    assert calls == ["full", "full"]
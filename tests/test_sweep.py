@@ -0,0 +1,58 @@
+import asyncio
+from datetime import timedelta
+import numpy as np
+import pytest
+from backtester import engine, sweep
+from libs.ensemble.meta import signal_arrays
+from libs.schemas.fundamentals import FundamentalsHistory
+from tests.test_backtest import T0, _candles, _news
+
+START, END = T0 + timedelta(days=100), T0 + timedelta(days=790)
+
+@pytest.fixture
+def staged(tmp_path, monkeypatch):
+    fund = FundamentalsHistory.from_rows("TEST", [
+        {"filed": T0 + timedelta(days=91 * q + 40), "period": T0 + timedelta(days=91 * q), "pe": 12.0, "roe": 0.2}
+        for q in range(8)
+    ])
+    sources = {"AAA": (_candles(seed=1), fund, _news(seed=2)), "BBB": (_candles(seed=3), fund, _news(seed=4))}
+
+    async def load_history(symbol, start, end):
+        if symbol not in sources:
+            raise ValueError(f"No candles for {symbol}")
+        return sources[symbol]
+
+    monkeypatch.setattr(engine, "load_history", load_history)
+    ready, failed = asyncio.run(sweep.prepare(["AAA", "BBB", "ZZZ"], START, END, tmp_path))
+    return tmp_path, ready, failed, sources
+
+def test_threshold_grid_keeps_sell_below_buy():
+    assert sweep.threshold_grid([0.5, 0.6], [0.45, 0.55]) == [(0.5, 0.45), (0.6, 0.45), (0.6, 0.55)]
+
+def test_signal_thresholds():
+    prob = np.array([0.3, 0.47, 0.5, 0.53, 0.7])
+    assert signal_arrays(prob)[0].tolist() == [-1, 0, 0, 0, 1]
+    assert signal_arrays(prob, 0.52, 0.48)[0].tolist() == [-1, -1, 0, 1, 1]
+    with pytest.raises(ValueError):
+        signal_arrays(prob, 0.4, 0.6)
+
+def test_symbol_grid_matches_single_backtests(staged):
+    root, ready, failed, sources = staged
+    assert set(ready) == {"AAA", "BBB"} and set(failed) == {"ZZZ"}
+    rows = sweep._run_symbol(str(root), "AAA", ready["AAA"], [5, 10], [(0.55, 0.45), (0.52, 0.5)], 5.0, 1.0)
+    assert len(rows) == 4
+    for r in rows:
+        res = engine.backtest_arrays(*sources["AAA"], START, END, r["horizon"], slippage_bps=5.0, fee_bps=1.0,
+                                     buy=r["buy"], sell=r["sell"])
+        assert r["sharpe"] == pytest.approx(res.metrics()["sharpe"], abs=1e-12)
+        assert r["final_equity"] == pytest.approx(res.metrics()["final_equity"], abs=1e-12)
+
+def test_pool_collects_one_table(staged):
+    root, ready, _, _ = staged
+    grid = [(0.55, 0.45), (0.6, 0.4)]
+    rows = sweep.run_grid(root, ready, [5, 20], grid, workers=2, slippage_bps=5.0, fee_bps=1.0)
+    local = [r for s in ready for r in sweep._run_symbol(str(root), s, ready[s], [5, 20], grid, 5.0, 1.0)]
+    assert rows == local and len(rows) == 8
+    summary = sweep.summarize(rows)
+    assert len(summary) == 4 and all(r["symbols"] == 2 for r in summary)
+    assert [r["sharpe"] for r in summary] == sorted((r["sharpe"] for r in summary), reverse=True)
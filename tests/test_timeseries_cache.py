@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from libs.data import adapters
+from libs.schemas.frame import CandleFrame, to_ns
+
+T0 = datetime(2020, 1, 1, tzinfo=timezone.utc)
+HISTORY = CandleFrame(
+    "TEST", np.array([to_ns(T0 + timedelta(days=i)) for i in range(1000)]),
+    *(np.arange(1000, dtype=float) for _ in range(5)),
+)
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl=None):
+        self.data[key] = value
+
+class Reads(list):
+    published = len(HISTORY)  # bars the provider has put out so far
+
+@pytest.fixture
+def fake(monkeypatch):
+    reads = Reads()
+
+    async def read(symbol, start, end):
+        reads.append((start, end))
+        return HISTORY[:reads.published].between(start, end).copy()
+
+    monkeypatch.setattr(adapters, "redis", FakeRedis())
+    monkeypatch.setattr(adapters, "_read_daily_history", read)
+    for k in adapters.ts_cache_stats:
+        monkeypatch.setitem(adapters.ts_cache_stats, k, 0)
+    return reads
+
+@pytest.mark.anyio
+async def test_subranges_hit_and_extensions_read_only_the_gap(fake):
+    day = lambda i: T0 + timedelta(days=i)
+    a = await adapters.get_timeseries("TEST", day(100), day(500) + timedelta(microseconds=17))
+    assert len(a) == 401
+    b = await adapters.get_timeseries("TEST", day(200), day(300))
+    assert len(b) == 101 and b.ts_at(0) == day(200)
+    c = await adapters.get_timeseries("TEST", day(400), day(600))
+    assert len(c) == 201
+    assert fake[-1][0] >= day(500)  # only the tail from the last cached bar was read
+    d = await adapters.get_timeseries("TEST", day(50), day(600))
+    assert len(d) == 551
+    assert adapters.ts_cache_stats == {"hit": 1, "miss": 1, "extend": 2}
+    assert len(fake) == 3
+
+@pytest.mark.anyio
+async def test_earlier_request_keeps_the_covered_end(fake):
+    day = lambda i: T0 + timedelta(days=i)
+    await adapters.get_timeseries("TEST", day(100), day(900))
+    e = await adapters.get_timeseries("TEST", day(50), day(200))
+    assert len(e) == 151 and fake[-1] == (day(50), day(100))
+    f = await adapters.get_timeseries("TEST", day(300), day(800))
+    assert len(f) == 501 and len(fake) == 2
+    assert adapters.ts_cache_stats == {"hit": 1, "miss": 1, "extend": 1}
+
+@pytest.mark.anyio
+async def test_bar_published_after_the_request_is_picked_up(fake):
+    day = lambda i: T0 + timedelta(days=i)
+    fake.published = 105  # the 09:00 request comes before day 105's bar is out
+    a = await adapters.get_timeseries("TEST", day(100), day(105) + timedelta(hours=9))
+    assert len(a) == 5
+    # nothing new yet: the re-read from the last bar is a hit, the entry is unchanged
+    await adapters.get_timeseries("TEST", day(100), day(105) + timedelta(hours=10))
+    assert adapters.ts_cache_stats == {"hit": 1, "miss": 1, "extend": 0}
+    fake.published = 107
+    b = await adapters.get_timeseries("TEST", day(100), day(106) + timedelta(hours=9))
+    assert len(b) == 7 and b.ts_at(5) == day(105)
+    assert adapters.ts_cache_stats["extend"] == 1
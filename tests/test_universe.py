@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+from libs.models import universe
+from libs.models.dataset import FEATURE_ORDER, MetaDataset
+from libs.utils.config import settings
+from libs.utils import limits
+from libs.utils.limits import RateLimiter
+
+START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+END = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+def _ds(symbol, ts):
+    n = len(ts)
+    X = np.arange(n * len(FEATURE_ORDER), dtype=float).reshape(n, len(FEATURE_ORDER))
+    return MetaDataset(symbol, np.asarray(ts, dtype=np.int64), X, np.arange(n) % 2, np.linspace(-0.1, 0.1, n))
+
+def test_partial_roundtrip_and_resume(tmp_path, monkeypatch):
+    calls = []
+
+    async def build(symbol, start, end, horizon):
+        calls.append(symbol)
+        if symbol == "BAD":
+            raise ValueError("Not enough candles")
+        return _ds(symbol, [3, 1, 2])
+
+    monkeypatch.setattr(universe, "build_symbol_dataset", build)
+    assert universe._build_one("AAA", START, END, 5, str(tmp_path))[1:3] == ("built", 3)
+    assert universe._build_one("AAA", START, END, 5, str(tmp_path))[1:3] == ("resumed", 3)
+    assert universe._build_one("BAD", START, END, 5, str(tmp_path))[1] == "error: Not enough candles"
+    assert calls == ["AAA", "BAD"]
+    assert not universe.partial_path(str(tmp_path), "BAD", START, END, 5).exists()
+
+    back = universe.load_partial(universe.partial_path(str(tmp_path), "AAA", START, END, 5))
+    ref = _ds("AAA", [3, 1, 2])
+    assert back.symbol == "AAA"
+    for col in ("ts", "X", "y", "fwd"):
+        np.testing.assert_array_equal(getattr(back, col), getattr(ref, col))
+
+def test_version_change_rebuilds_partials(tmp_path, monkeypatch):
+    calls = []
+
+    async def build(symbol, start, end, horizon):
+        calls.append(symbol)
+        return _ds(symbol, [1, 2])
+
+    monkeypatch.setattr(universe, "build_symbol_dataset", build)
+    assert universe._build_one("AAA", START, END, 5, str(tmp_path))[1] == "built"
+    monkeypatch.setattr(settings, "sentiment_model_version", "finbert-v2")
+    assert universe._build_one("AAA", START, END, 5, str(tmp_path))[1] == "built"
+    assert universe._build_one("AAA", START, END, 5, str(tmp_path))[1] == "resumed"
+    assert calls == ["AAA", "AAA"]
+
+def test_merge_is_time_ordered():
+    merged = universe.merge_datasets([_ds("BBB", [2, 5]), _ds("AAA", [5, 1, 3]), _ds("CCC", [])])
+    assert merged.ts.tolist() == [1, 2, 3, 5, 5]
+    assert merged.symbols.tolist() == ["AAA", "BBB", "AAA", "AAA", "BBB"]
+    assert merged.X.shape == (5, len(FEATURE_ORDER))
+    assert merged.X[0].tolist() == _ds("AAA", [5, 1, 3]).X[1].tolist()
+    assert len(universe.merge_datasets([])) == 0
+
+def test_read_universe(tmp_path):
+    f = tmp_path / "u.txt"
+    f.write_text("# large caps\naapl\nMSFT  # tech\n\nAAPL\n")
+    assert universe.read_universe(str(f)) == ["AAPL", "MSFT"]
+
+def test_limiter_share():
+    lim = RateLimiter("test", per_minute=60, per_day=1000, max_concurrency=8)
+    lim.share(0.25)
+    assert lim.minute.capacity == 15 and lim.minute.rate == pytest.approx(0.25)
+    assert lim.day.capacity == 250
+    assert lim.max_concurrency == 2
+    lim.share(0.01)
+    assert lim.minute.capacity == 1.0 and lim.max_concurrency == 1
+
+@pytest.mark.anyio
+async def test_shared_quota_survives_throttling(monkeypatch):
+    caps = {"alpha_limiter": 2, "news_limiter": 5, "fmp_limiter": 3}
+    for name, cap in caps.items():
+        monkeypatch.setattr(limits, name, RateLimiter(name, per_minute=8, max_concurrency=cap))
+    workers = limits.max_sharers()
+    assert workers == 2
+    limits.share_quotas(1 / workers)
+    # the pool's in-flight calls stay within every provider's cap
+    assert all(workers * getattr(limits, n).max_concurrency <= cap for n, cap in caps.items())
+
+    # a worker's share is a one-call bucket; a 429 must only slow it down
+    lim = limits.alpha_limiter
+    lim.share(1 / 8)
+    lim.on_throttled()
+    lim.minute.ts -= 3600
+    await asyncio.wait_for(lim.acquire(), timeout=1.0)